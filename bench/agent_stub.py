@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+agent_stub - Stand-in for the gemini / claude CLIs when benchmarking dispatch-agents
+Usage: python3 bench/agent_stub.py NAME [--delay SECONDS] [--lines N] [--exit CODE] [--ignore-term]
+Reads the prompt from stdin, prints N lines spread over --delay seconds, then exits.
+--ignore-term makes it survive SIGTERM, so timeouts have to escalate to SIGKILL.
+"""
+
+import argparse
+import signal
+import sys
+import time
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("name")
+    parser.add_argument("--delay", type=float, default=0.5)
+    parser.add_argument("--lines", type=int, default=3)
+    parser.add_argument("--exit", type=int, default=0)
+    parser.add_argument("--ignore-term", action="store_true")
+    args = parser.parse_args()
+
+    if args.ignore_term:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    prompt = sys.stdin.read()
+    lines = max(1, args.lines)
+    for i in range(lines):
+        time.sleep(args.delay / lines)
+        print(f"{args.name} {i + 1}/{lines}: {len(prompt)} chars received", flush=True)
+    if args.exit:
+        print(f"{args.name}: failing with exit {args.exit}", file=sys.stderr)
+    return args.exit
+
+
+if __name__ == "__main__":
+    sys.exit(main())
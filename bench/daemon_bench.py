@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+daemon_bench - Session startup and request latency: cold stdio server vs warm daemon
+Usage: python3 bench/daemon_bench.py [--sessions 5] [--requests 50] [--python python3]
+Needs the MCP SDK importable by --python.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+SERVER = REPO / "bin" / "rhncrs-mcp-server.py"
+SHIM = REPO / "bin" / "rhncrs-mcp"
+
+REQUESTS = [
+    ("tools/list", {}),
+    ("resources/read", {"uri": "rhncrs://vault/stats"}),
+    ("resources/read", {"uri": "rhncrs://collab/status"}),
+]
+
+
+class Session:
+    """Minimal newline-delimited JSON-RPC client over a subprocess's stdio"""
+
+    def __init__(self, argv, env):
+        self.proc = subprocess.Popen(argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     stderr=subprocess.DEVNULL, env=env)
+        self.next_id = 0
+
+    def send(self, method, params=None, notify=False):
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        if not notify:
+            self.next_id += 1
+            message["id"] = self.next_id
+        self.proc.stdin.write((json.dumps(message) + "\n").encode())
+        self.proc.stdin.flush()
+        if notify:
+            return None
+        while True:
+            line = self.proc.stdout.readline()
+            if not line:
+                raise RuntimeError(f"server exited during {method}")
+            reply = json.loads(line)
+            if reply.get("id") == self.next_id:
+                if "error" in reply:
+                    raise RuntimeError(f"{method}: {reply['error']}")
+                return reply["result"]
+
+    def initialize(self):
+        self.send("initialize", {
+            "protocolVersion": "2025-03-26",
+            "capabilities": {},
+            "clientInfo": {"name": "daemon_bench", "version": "1"},
+        })
+        self.send("notifications/initialized", notify=True)
+
+    def close(self):
+        self.proc.stdin.close()
+        try:
+            self.proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+
+def run_sessions(argv, env, sessions, requests):
+    startup, latency = [], []
+    for _ in range(sessions):
+        t0 = time.perf_counter()
+        session = Session(argv, env)
+        session.initialize()
+        startup.append((time.perf_counter() - t0) * 1000)
+        for i in range(requests):
+            method, params = REQUESTS[i % len(REQUESTS)]
+            t1 = time.perf_counter()
+            session.send(method, params)
+            latency.append((time.perf_counter() - t1) * 1000)
+        session.close()
+    return summarize(startup), summarize(latency)
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+    return {"n": len(samples), "mean_ms": round(statistics.mean(samples), 3),
+            "p50_ms": pick(0.50), "p95_ms": pick(0.95), "max_ms": round(ordered[-1], 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=50, help="Requests per session")
+    parser.add_argument("--python", default=sys.executable, help="Interpreter with the MCP SDK")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="rhncrs-daemon-") as tmp:
+        env = dict(os.environ, RHNCRS_STATE_DIR=tmp, RHNCRS_SOCKET=str(Path(tmp) / "mcp.sock"))
+        cold_start, cold_req = run_sessions([args.python, str(SERVER)], env, args.sessions, args.requests)
+
+        t0 = time.perf_counter()
+        daemon = subprocess.Popen([args.python, str(SERVER), "--socket", env["RHNCRS_SOCKET"]],
+                                  stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                  stderr=subprocess.DEVNULL, env=env)
+        while not Path(env["RHNCRS_SOCKET"]).exists():
+            if daemon.poll() is not None:
+                sys.exit("daemon failed to start")
+            time.sleep(0.01)
+        daemon_start_ms = round((time.perf_counter() - t0) * 1000, 3)
+        try:
+            warm_start, warm_req = run_sessions([args.python, str(SHIM)], env, args.sessions, args.requests)
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+    print(json.dumps({
+        "cold_stdio": {"session_start": cold_start, "request": cold_req},
+        "warm_daemon": {"daemon_start_ms": daemon_start_ms, "session_start": warm_start, "request": warm_req},
+        "session_start_speedup": round(cold_start["mean_ms"] / warm_start["mean_ms"], 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
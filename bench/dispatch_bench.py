@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+dispatch_bench - Wall time of routing one prompt to both agents: sequential vs dispatch-agents
+Usage: python3 bench/dispatch_bench.py [--gemini-delay 0.8] [--claude-delay 1.2] [--runs 3]
+Agents are bench/agent_stub.py processes (RHNCRS_GEMINI_CMD / RHNCRS_CLAUDE_CMD), so no
+real CLI is needed. Also checks the timeout (SIGTERM-proof stub) and failure paths and that
+every reply reached the active thread and the message log.
+"""
+
+import argparse
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+DISPATCH = REPO / "bin" / "dispatch-agents"
+ROUTE = REPO / "bin" / "route-message"
+STUB = Path(__file__).resolve().parent / "agent_stub.py"
+PROMPT = "Review the nightly sync script and list anything that could lose notes."
+
+
+def stub(name: str, *args: str) -> str:
+    return " ".join(shlex.quote(part) for part in (sys.executable, str(STUB), name, *args))
+
+
+def timed(argv, env, stdin=None) -> tuple:
+    start = time.perf_counter()
+    proc = subprocess.run(argv, env=env, input=stdin, capture_output=True, text=True)
+    return time.perf_counter() - start, proc
+
+
+def dispatch(env, *args: str) -> tuple:
+    elapsed, proc = timed([sys.executable, str(DISPATCH), "--quiet", "--format", "json", *args, "--", PROMPT], env)
+    return elapsed, proc.returncode, json.loads(proc.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--gemini-delay", type=float, default=0.8)
+    parser.add_argument("--claude-delay", type=float, default=1.2)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="rhncrs-dispatch-") as tmp:
+        env = dict(os.environ, COLLAB_DIR=tmp,
+                   RHNCRS_GEMINI_CMD=stub("gemini", "--delay", str(args.gemini_delay)),
+                   RHNCRS_CLAUDE_CMD=stub("claude", "--delay", str(args.claude_delay)))
+
+        sequential, concurrent, routed = [], [], []
+        for _ in range(args.runs):
+            # What the separate "invoke each recipient" step did: one agent after the other
+            start = time.perf_counter()
+            for agent in ("GEMINI", "CLAUDE"):
+                subprocess.run(shlex.split(env[f"RHNCRS_{agent}_CMD"]), input=PROMPT, capture_output=True, text=True)
+            sequential.append(time.perf_counter() - start)
+            elapsed, code, merged = dispatch(env)
+            assert code == 0 and merged["ok"], merged
+            concurrent.append(elapsed)
+            elapsed, proc = timed(["bash", str(ROUTE), "--dispatch", "--no-log", "--quiet", PROMPT], env)
+            assert proc.returncode == 0 and "### 🔷 Gemini" in proc.stdout and "### 🔶 Claude" in proc.stdout, proc
+            routed.append(elapsed)
+
+        timeout_env = dict(env, RHNCRS_CLAUDE_CMD=stub("claude", "--delay", "30", "--ignore-term"))
+        timeout_wall, timeout_code, timeout_merged = dispatch(timeout_env, "--agent-timeout", "claude=1")
+        fail_env = dict(env, RHNCRS_GEMINI_CMD=stub("gemini", "--delay", "0.1", "--exit", "3"))
+        _, fail_code, fail_merged = dispatch(fail_env)
+
+        log_lines = (Path(tmp) / "message-log.jsonl").read_text().splitlines()
+        thread_stats = json.loads(subprocess.run([sys.executable, str(REPO / "bin" / "collab-thread"), "stats"],
+                                                 env=env, capture_output=True, text=True).stdout)
+
+    by_agent = lambda merged: {r["agent"]: r["status"] for r in merged["results"]}
+    ms = lambda samples: round(statistics.median(samples) * 1000, 1)
+    print(json.dumps({
+        "delays_s": {"gemini": args.gemini_delay, "claude": args.claude_delay},
+        "sequential_ms": ms(sequential),
+        "dispatch_ms": ms(concurrent),
+        "route_message_dispatch_ms": ms(routed),
+        "speedup": round(statistics.median(sequential) / statistics.median(concurrent), 2),
+        "timeout": {"statuses": by_agent(timeout_merged), "exit_code": timeout_code,
+                    "wall_ms": round(timeout_wall * 1000, 1)},
+        "failure": {"statuses": by_agent(fail_merged), "exit_code": fail_code},
+        "logged_messages": len(log_lines),
+        "thread_messages": sum(s.get("messages") or 0 for s in thread_stats.get("segments", [])),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
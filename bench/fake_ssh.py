@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+fake_ssh - Local stand-in for ssh/scp that charges a handshake per new connection
+Usage: INFRA_SSH="python3 bench/fake_ssh.py" infra-collect --out DIR --host fake
+       python3 bench/fake_ssh.py --scp HOST:/remote/path LOCAL
+Runs the remote command locally with `sh -c`. Every invocation sleeps FAKE_SSH_HANDSHAKE
+seconds (default 0.25) unless it rides an open ControlMaster, which is modelled as a
+marker file at the ControlPath (created when ControlPersist is set, removed by -O exit).
+FAKE_SSH_LOG, if set, gets one line per invocation: "handshake" or "mux".
+"""
+
+import hashlib
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+VALUE_FLAGS = {"-o", "-O", "-p", "-i", "-l", "-F", "-S", "-J", "-P"}
+
+
+def parse(argv):
+    options, control, rest = {}, None, []
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg in VALUE_FLAGS and i + 1 < len(argv):
+            if arg == "-o":
+                key, _, value = argv[i + 1].partition("=")
+                options[key.lower()] = value
+            elif arg == "-O":
+                control = argv[i + 1]
+            i += 2
+        elif arg.startswith("-") and not rest:
+            i += 1
+        else:
+            rest = argv[i:]
+            break
+    return options, control, rest
+
+
+def log(event):
+    if os.environ.get("FAKE_SSH_LOG"):
+        with open(os.environ["FAKE_SSH_LOG"], "a") as f:
+            f.write(event + "\n")
+
+
+def control_socket(options, host):
+    path = options.get("controlpath")
+    return Path(path.replace("%C", hashlib.sha1(host.encode()).hexdigest())) if path else None
+
+
+def connect(options, host) -> None:
+    """Pay for a handshake unless a live master covers this host"""
+    socket = control_socket(options, host)
+    if socket and socket.exists() and options.get("controlmaster", "no") != "no":
+        log("mux")
+        return
+    log("handshake")
+    time.sleep(float(os.environ.get("FAKE_SSH_HANDSHAKE", "0.25")))
+    if socket and options.get("controlpersist"):
+        socket.parent.mkdir(parents=True, exist_ok=True)
+        socket.touch()
+
+
+def main() -> int:
+    argv = sys.argv[1:]
+    if argv and argv[0] == "--scp":
+        options, _, rest = parse(argv[1:])
+        source, dest = rest[-2], rest[-1]
+        connect(options, source.split(":", 1)[0])
+        with open(source.split(":", 1)[1], "rb") as src, open(dest, "wb") as out:
+            out.write(src.read())
+        return 0
+
+    options, control, rest = parse(argv)
+    if not rest:
+        print("usage: fake_ssh.py [options] host [command...]", file=sys.stderr)
+        return 255
+    host, command = rest[0], rest[1:]
+    socket = control_socket(options, host)
+    if control == "check":
+        return 0 if socket and socket.exists() else 255
+    if control == "exit":
+        if socket and socket.exists():
+            socket.unlink()
+        return 0
+
+    connect(options, host)
+    if not command:
+        return 0
+    return subprocess.run(["sh", "-c", " ".join(command)]).returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+infra_pull_bench - SSH handshakes, transfers and re-encryptions: per-step ssh/scp vs infra-collect
+Usage: python3 bench/infra_pull_bench.py [--projects 8] [--changed 1] [--handshake 0.25] [--runs 3]
+Both sides talk to bench/fake_ssh.py, which runs commands locally and sleeps --handshake
+seconds for every connection it has to set up, so the numbers model a VPS round trip
+without needing one. Point INFRA_SSH at a real `ssh -p PORT` and --host at a local sshd
+to measure the real thing. infra-collect runs cold (empty manifest), warm (nothing
+changed) and after --changed files were edited on the "VPS"; encryption is a stub that
+copies the file to <secrets>/<project>.env.enc and counts calls.
+"""
+
+import argparse
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+COLLECT = REPO / "bin" / "infra-collect"
+FAKE_SSH = Path(__file__).resolve().parent / "fake_ssh.py"
+
+LEGACY_STEPS = [
+    "echo 'SSH OK'",
+    "docker ps --format 'table {{.Names}}\\t{{.Image}}\\t{{.Status}}\\t{{.Ports}}' 2>/dev/null",
+    "systemctl list-units --type=service --state=running | grep -E '(docker|nginx|rhino|node)' 2>/dev/null",
+    "nginx -t 2>&1 && echo '---' && ls -la /etc/nginx/sites-enabled/ 2>/dev/null",
+]
+
+ENCRYPT_STUB = """#!/bin/sh
+echo "$1" >> "$BENCH_ENCRYPT_LOG"
+cp "$2" "$BENCH_SECRETS/$1.env.enc"
+"""
+
+
+def legacy_pull(ssh, host, root: Path, dest: Path) -> int:
+    """What infra-pull did before: one ssh per step, one scp per .env, re-encrypt them all"""
+    for step in LEGACY_STEPS:
+        subprocess.run(ssh + [host, step], capture_output=True)
+    found = subprocess.run(ssh + [host, f"find {shlex.quote(str(root))} -maxdepth 3 -name '.env' -type f"],
+                           capture_output=True, text=True).stdout.split()
+    for path in found:
+        subprocess.run(ssh + ["--scp", f"{host}:{path}", str(dest / f"{Path(path).parent.name}.env")], check=True)
+    return len(found)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--projects", type=int, default=8)
+    parser.add_argument("--changed", type=int, default=1)
+    parser.add_argument("--handshake", type=float, default=0.25)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--host", default="fake-vps")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="rhncrs-infra-") as tmp:
+        tmp = Path(tmp)
+        root, secrets = tmp / "root", tmp / "secrets"
+        secrets.mkdir()
+        for i in range(args.projects):
+            project = root / f"project{i:02d}"
+            project.mkdir(parents=True)
+            (project / ".env").write_text("".join(f"KEY_{k}=value-{i}-{k}\n" for k in range(40)))
+        (root / "project00" / "node_modules" / "x").mkdir(parents=True)
+        encrypt = tmp / "encrypt-stub"
+        encrypt.write_text(ENCRYPT_STUB)
+        encrypt.chmod(0o755)
+        ssh_log, encrypt_log = tmp / "ssh.log", tmp / "encrypt.log"
+        env = dict(os.environ, FAKE_SSH_HANDSHAKE=str(args.handshake), FAKE_SSH_LOG=str(ssh_log),
+                   INFRA_SSH=f"{sys.executable} {FAKE_SSH}", RHNCRS_STATE_DIR=str(tmp / "state"),
+                   BENCH_ENCRYPT_LOG=str(encrypt_log), BENCH_SECRETS=str(secrets))
+        os.environ.update(FAKE_SSH_HANDSHAKE=env["FAKE_SSH_HANDSHAKE"], FAKE_SSH_LOG=env["FAKE_SSH_LOG"])
+
+        def counted(fn):
+            ssh_log.write_text("")
+            encrypt_log.write_text("")
+            start = time.perf_counter()
+            result = fn()
+            connections = ssh_log.read_text().split()
+            return {"wall_ms": round((time.perf_counter() - start) * 1000, 1),
+                    "handshakes": connections.count("handshake"), "ssh_invocations": len(connections),
+                    "encrypted": len(encrypt_log.read_text().split())}, result
+
+        def engine(out: Path):
+            proc = subprocess.run([sys.executable, str(COLLECT), "--out", str(out), "--host", args.host,
+                                   "--env-root", str(root), "--encrypt", str(encrypt),
+                                   "--secrets-dir", str(secrets), "--format", "json"],
+                                  env=env, capture_output=True, text=True)
+            assert proc.returncode == 0, proc.stderr
+            return json.loads(proc.stdout)
+
+        legacy_dir = tmp / "legacy"
+        legacy_dir.mkdir()
+        legacy, found = counted(lambda: legacy_pull([sys.executable, str(FAKE_SSH)], args.host, root, legacy_dir))
+        legacy["encrypted"] = found
+
+        cold, cold_report = counted(lambda: engine(tmp / "cold"))
+        names = sorted(p.name for p in legacy_dir.iterdir())
+        for name in names:
+            assert (legacy_dir / name).read_bytes() == (secrets / f"{name}.enc").read_bytes(), name
+
+        warm_samples, changed_samples = [], []
+        for run in range(args.runs):
+            sample, report = counted(lambda: engine(tmp / f"warm{run}"))
+            assert sample["encrypted"] == 0, report
+            warm_samples.append(sample)
+            for i in range(args.changed):
+                with open(root / f"project{i:02d}" / ".env", "a") as f:
+                    f.write(f"ROTATED_{run}=yes\n")
+            sample, report = counted(lambda: engine(tmp / f"changed{run}"))
+            assert sample["encrypted"] == args.changed, report
+            changed_samples.append(sample)
+        changed_summary = report["summary"]
+
+    median = lambda samples: dict(samples[len(samples) // 2], wall_ms=statistics.median(s["wall_ms"] for s in samples))
+    print(json.dumps({
+        "projects": args.projects,
+        "handshake_s": args.handshake,
+        "legacy": legacy,
+        "infra_collect_cold": dict(cold, summary=cold_report["summary"], timing=cold_report["timing"]),
+        "infra_collect_unchanged": median(warm_samples),
+        "infra_collect_changed": dict(median(changed_samples), summary=changed_summary),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
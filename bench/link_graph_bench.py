@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+link_graph_bench - Link graph build, incremental update and query latency on a synthetic vault
+Usage: python3 bench/link_graph_bench.py [--notes 50000] [--links 5] [--queries 200]
+Notes link to a few random notes and to their folder's MOC in 00_Atlas; every 50th note is left unlinked.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO / "lib"))
+from rhncrs.vault_search import VaultSearch  # noqa: E402
+
+
+def make_vault(root: Path, notes: int, links: int, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    folders = max(1, notes // 500)
+    paths = []
+    for f in range(folders):
+        moc = root / "00_Atlas" / f"MOC {f}.md"
+        moc.parent.mkdir(parents=True, exist_ok=True)
+        moc.write_text(f"# MOC {f}\n\nUp: [[Home]]\n")
+        paths.append(f"00_Atlas/MOC {f}.md")
+    (root / "00_Atlas" / "Home.md").write_text("# Home\n\n" + "".join(f"- [[MOC {f}]]\n" for f in range(folders)))
+    paths.append("00_Atlas/Home.md")
+    for i in range(notes):
+        folder = f"1_Projects/P{i % folders:03d}"
+        rel = f"{folder}/Note {i}.md"
+        (root / folder).mkdir(parents=True, exist_ok=True)
+        if i % 50 == 0:
+            body = "No links here.\n"
+        else:
+            targets = [f"Note {rng.randrange(notes)}" for _ in range(links)]
+            body = f"Up: [[MOC {i % folders}]]\n\n" + " ".join(f"[[{t}]]" for t in targets) + "\n"
+        (root / rel).write_text(f"---\ntype: note\n---\n# Note {i}\n\n{body}")
+        paths.append(rel)
+    return paths
+
+
+def snapshot(root: Path) -> dict:
+    files = {}
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(dirpath, name)
+            st = os.stat(path)
+            files[os.path.relpath(path, root)] = (st.st_size, st.st_mtime)
+    return files
+
+
+def timed(samples: list, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    samples.append(time.perf_counter() - start)
+    return result
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+    return {"n": len(samples), "mean_ms": round(statistics.mean(samples) * 1000, 3), "p50_ms": pick(0.5), "p95_ms": pick(0.95)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--notes", type=int, default=50000)
+    parser.add_argument("--links", type=int, default=5, help="Random links per note")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="rhncrs-graph-") as tmp:
+        root = Path(tmp) / "vault"
+        paths = make_vault(root, args.notes, args.links)
+        search = VaultSearch(Path(tmp) / "state" / "search.db", root)
+
+        start = time.perf_counter()
+        search.refresh(snapshot(root))
+        build_s = time.perf_counter() - start
+
+        # Incremental: one note gains a link to a note that had none
+        target = paths[-1]
+        with open(root / target, "a") as f:
+            f.write("\n[[Note 0]]\n")
+        files = snapshot(root)
+        start = time.perf_counter()
+        search.refresh(files)
+        update_ms = (time.perf_counter() - start) * 1000
+        assert any(b["path"] == target for b in search.backlinks("Note 0")["backlinks"])
+
+        rng = random.Random(3)
+        sample = [rng.choice(paths) for _ in range(args.queries)]
+        back, out, hood1, hood2, orphan = [], [], [], [], []
+        for path in sample:
+            timed(back, search.backlinks, path)
+            timed(out, search.outlinks, path)
+            timed(hood1, search.neighborhood, path, 1)
+            timed(hood2, search.neighborhood, path, 2)
+        orphans = timed(orphan, search.orphans)
+        orphans_cold_ms = orphan.pop() * 1000
+        for _ in range(5):
+            timed(orphan, search.orphans)
+        moc = search.backlinks("MOC 1")
+        search.close()
+
+    print(json.dumps({
+        "notes": len(paths),
+        "build_s": round(build_s, 2),
+        "incremental_update_ms": round(update_ms, 2),
+        "backlinks": summarize(back),
+        "outlinks": summarize(out),
+        "neighborhood_depth1": summarize(hood1),
+        "neighborhood_depth2": summarize(hood2),
+        "orphans": dict(summarize(orphan), cold_ms=round(orphans_cold_ms, 3), total=orphans["total"]),
+        "moc_backlinks": moc["total"],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+msglog_bench - Indexed message-log queries vs a linear scan of message-log.jsonl
+Usage: python3 bench/msglog_bench.py [--lines 1000000] [--max-mb 64]
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO / "lib"))
+from rhncrs.msglog import MessageLog, parse_time  # noqa: E402
+
+AGENTS = ("gemini", "claude", "user")
+TYPES = ("info", "question", "request", "response")
+
+
+def generate(directory: Path, lines: int, max_bytes: int) -> None:
+    """Write a synthetic log (one message per minute, ending now), rotated like MessageLog would"""
+    rng = random.Random(42)
+    start = datetime.now(timezone.utc) - timedelta(minutes=lines)
+    segment, out, size = 0, None, 0
+    active = directory / "message-log.jsonl"
+    out = open(active, "w")
+    for i in range(lines):
+        sender = rng.choice(AGENTS)
+        entry = {
+            "timestamp": (start + timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "from": sender,
+            "to": rng.choice([a for a in AGENTS if a != sender]),
+            "type": rng.choice(TYPES),
+            "priority": "high" if rng.random() < 0.05 else "normal",
+            "message": f"message {i} about task {rng.randrange(500)}\n",
+        }
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        out.write(line)
+        size += len(line)
+        if size >= max_bytes:
+            out.close()
+            segment += 1
+            active.rename(directory / f"message-log.{segment:04d}.jsonl")
+            out, size = open(active, "w"), 0
+    out.close()
+
+
+def linear_scan(directory: Path, since=None, sender=None, type=None, limit=None) -> list:
+    """What answering a question cost before: parse every line of every segment"""
+    since = parse_time(since)
+    found = []
+    paths = sorted(directory.glob("message-log.*.jsonl")) + [directory / "message-log.jsonl"]
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                entry = json.loads(line)
+                if since and entry["timestamp"] < since:
+                    continue
+                if sender and entry["from"] != sender:
+                    continue
+                if type and entry["type"] != type:
+                    continue
+                found.append(entry)
+                if limit and len(found) >= limit:
+                    return found
+    return found
+
+
+def timed(fn, repeat: int = 3):
+    best, result = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = (time.perf_counter() - t0) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 3), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1000000)
+    parser.add_argument("--max-mb", type=float, default=64, help="Segment rotation size")
+    args = parser.parse_args()
+
+    queries = {
+        "gemini_questions_last_hour": dict(since="1h", sender="gemini", type="question"),
+        "last_day_all": dict(since="1d"),
+        "first_100_requests": dict(type="request", limit=100),
+    }
+    with tempfile.TemporaryDirectory(prefix="rhncrs-msglog-") as tmp:
+        directory = Path(tmp)
+        t0 = time.perf_counter()
+        generate(directory, args.lines, int(args.max_mb * 1024 * 1024))
+        generate_s = time.perf_counter() - t0
+
+        log = MessageLog(directory / "message-log.jsonl", max_bytes=int(args.max_mb * 1024 * 1024))
+        index_ms, _ = timed(log.sync, repeat=1)
+        noop_sync_ms, _ = timed(log.sync)
+        append_ms, _ = timed(lambda: log.append("bench", "claude", "gemini"), repeat=20)
+
+        results = {}
+        for label, q in queries.items():
+            indexed_ms, hits = timed(lambda: list(log.query(**q)))
+            scan_ms, scanned = timed(lambda: linear_scan(directory, **q), repeat=1)
+            results[label] = {
+                "matches": len(hits),
+                "indexed_ms": indexed_ms,
+                "linear_scan_ms": scan_ms,
+                "speedup": round(scan_ms / indexed_ms, 1) if indexed_ms else None,
+                "same_result": len(hits) == len(scanned),
+            }
+
+        stats = log.stats()
+    print(json.dumps({
+        "lines": args.lines,
+        "segments": len(stats["segments"]),
+        "generate_s": round(generate_s, 2),
+        "initial_index_ms": index_ms,
+        "noop_sync_ms": noop_sync_ms,
+        "append_ms": append_ms,
+        "queries": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
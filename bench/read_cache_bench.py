@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+read_cache_bench - Re-reading hub notes: uncached reads vs the LRU read cache vs if_none_match
+Usage: python3 bench/read_cache_bench.py [--hubs 20] [--notes 2000] [--reads 20000] [--cache-mb 8]
+80% of reads hit the hub notes (Atlas, READMEs, CURRENT_STATE.md); the rest are spread over the long tail.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO / "lib"))
+from rhncrs.ranged_read import read_window  # noqa: E402
+from rhncrs.read_cache import ReadCache  # noqa: E402
+
+
+def make_vault(root: Path, hubs: int, notes: int) -> tuple:
+    hub_paths, tail_paths = [], []
+    for i in range(hubs):
+        path = root / "00_Atlas" / f"Hub_{i}.md"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"# Hub {i}\n\n" + "".join(f"- [[Note_{j}]]\n" for j in range(400)))
+        hub_paths.append(path)
+    for i in range(notes):
+        path = root / "1_Projects" / f"{i % 20:02d}" / f"Note_{i}.md"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"# Note {i}\n\n" + "lorem ipsum " * 300)
+        tail_paths.append(path)
+    return hub_paths, tail_paths
+
+
+def workload(hub_paths, tail_paths, reads, seed=7):
+    rng = random.Random(seed)
+    return [rng.choice(hub_paths) if rng.random() < 0.8 else rng.choice(tail_paths) for _ in range(reads)]
+
+
+def summarize(samples, elapsed):
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1e6, 1)
+    return {"reads_per_s": round(len(samples) / elapsed), "mean_us": round(statistics.mean(samples) * 1e6, 1),
+            "p50_us": pick(0.50), "p99_us": pick(0.99)}
+
+
+def run(paths, read):
+    latencies, sent = [], 0
+    start = time.perf_counter()
+    for path in paths:
+        t0 = time.perf_counter()
+        sent += read(path)
+        latencies.append(time.perf_counter() - t0)
+    return dict(summarize(latencies, time.perf_counter() - start), bytes_returned=sent)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hubs", type=int, default=20)
+    parser.add_argument("--notes", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=20000)
+    parser.add_argument("--cache-mb", type=float, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="rhncrs-cache-") as tmp:
+        hub_paths, tail_paths = make_vault(Path(tmp), args.hubs, args.notes)
+        paths = workload(hub_paths, tail_paths, args.reads)
+
+        uncached = run(paths, lambda p: len(read_window(p)["text"]))
+
+        cache = ReadCache(int(args.cache_mb * 1024 * 1024))
+
+        def cached_read(path):
+            st, data, etag = cache.load(path)
+            return len(read_window(path, cached=(st, data))["text"])
+
+        cached = run(paths, cached_read)
+        cached["cache"] = cache.stats()
+
+        # Agents that remember etags only pay for notes that changed
+        etags = {}
+
+        def conditional_read(path):
+            st, data, etag = cache.load(path)
+            if etags.get(path) == etag:
+                return len(etag)
+            etags[path] = etag
+            return len(read_window(path, cached=(st, data))["text"])
+
+        conditional = run(paths, conditional_read)
+
+    print(json.dumps({
+        "uncached": uncached,
+        "lru_cache": cached,
+        "if_none_match": conditional,
+        "speedup": round(uncached["mean_us"] / cached["mean_us"], 1),
+        "bytes_saved_pct": round(100 * (1 - conditional["bytes_returned"] / uncached["bytes_returned"]), 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+secrets_broker_bench - Secrets validation and lookups: one age run per call vs worker pool / secrets-broker
+Usage: python3 bench/secrets_broker_bench.py [--projects 12] [--age-delay 0.15] [--lookups 20] [--workers 8]
+Runs against a throwaway HOME whose `age` is a stub that sleeps --age-delay (the cost of
+loading the SSH key and decrypting) and prints the file, so nothing real is decrypted.
+Reports validate wall time at -j 1 vs -j N, and decrypt-env latency with the broker off,
+on a first (cold) lookup and on repeat lookups, plus a raw BrokerClient.get round trip.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+BIN = REPO / "bin"
+sys.path.insert(0, str(REPO / "lib"))
+from rhncrs.secrets_broker import BrokerClient  # noqa: E402
+
+AGE_STUB = """#!{python}
+import sys, time
+time.sleep({delay})
+sys.stdout.write(open(sys.argv[-1]).read())
+"""
+
+
+def ms(samples) -> str:
+    return f"median {statistics.median(samples) * 1000:8.2f} ms   max {max(samples) * 1000:8.2f} ms"
+
+
+def timed(argv, env) -> float:
+    start = time.perf_counter()
+    subprocess.run(argv, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--projects", type=int, default=12)
+    parser.add_argument("--age-delay", type=float, default=0.15)
+    parser.add_argument("--lookups", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="rhncrs-secrets-") as tmp:
+        home, stubs = Path(tmp) / "home", Path(tmp) / "stubs"
+        vault = home / "Library/Mobile Documents/iCloud~md~obsidian/Documents/rhncrs-collab"
+        secrets = vault / "9_System" / "Secrets"
+        secrets.mkdir(parents=True)
+        stubs.mkdir()
+        (home / ".ssh").mkdir()
+        (home / ".ssh" / "id_ed25519").touch()
+        for i in range(args.projects):
+            lines = [f"KEY_{n}=value-{i}-{n}" for n in range(30)]
+            (secrets / f"project-{i:02d}.env.enc").write_text("\n".join(lines) + "\n")
+        age = stubs / "age"
+        age.write_text(AGE_STUB.format(python=sys.executable, delay=args.age_delay))
+        age.chmod(0o755)
+        state = Path(tmp) / "state"
+        env = dict(os.environ, HOME=str(home), OBSIDIAN_VAULT=str(vault), PATH=f"{stubs}:{BIN}:{os.environ['PATH']}",
+                   RHNCRS_STATE_DIR=str(state), RHNCRS_SECRETS_SOCKET=str(state / "secrets" / "broker.sock"))
+
+        print(f"🔐 {args.projects} projects, age stub {args.age_delay * 1000:.0f} ms per decrypt")
+        print("")
+        reports = {}
+        for workers in (1, args.workers):
+            proc = subprocess.run([sys.executable, str(BIN / "secrets-validate"), "-j", str(workers),
+                                   "--no-password", "--format", "json"], env=env, capture_output=True, text=True)
+            reports[workers] = json.loads(proc.stdout)
+        seq, par = reports[1], reports[args.workers]
+        print(f"validate -j 1      {seq['wall_ms']:8.1f} ms   ({seq['passed']} passed)")
+        print(f"validate -j {args.workers:<2}     {par['wall_ms']:8.1f} ms   "
+              f"({par['passed']} passed, {seq['wall_ms'] / par['wall_ms']:.1f}x)")
+        print("")
+
+        project = "project-00"
+        decrypt = [str(BIN / "decrypt-env"), project]
+        off = [timed(decrypt, dict(env, RHNCRS_SECRETS_BROKER="0")) for _ in range(args.lookups)]
+        cold = timed(decrypt, env)
+        warm = [timed(decrypt, env) for _ in range(args.lookups)]
+
+        client = BrokerClient(env["RHNCRS_SECRETS_SOCKET"])
+        raw = []
+        for _ in range(args.lookups * 10):
+            start = time.perf_counter()
+            client.get(project)
+            raw.append(time.perf_counter() - start)
+        stats = client.request("list")
+        client.request("stop")
+        client.close()
+
+        print(f"decrypt-env, broker off    {ms(off)}")
+        print(f"decrypt-env, first lookup  {cold * 1000:7.1f} ms (age + cache)")
+        print(f"decrypt-env, cached        {ms(warm)}")
+        print(f"BrokerClient.get           {ms(raw)}   (what the MCP server pays)")
+        print(f"broker: {stats['hits']} hits, {stats['misses']} misses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+shared_state_bench - Throughput of the append-only shared-state log vs whole-file JSON rewrites
+Usage: python3 bench/shared_state_bench.py [--messages 5000] [--writers 4]
+"""
+
+import argparse
+import json
+import multiprocessing
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO / "lib"))
+from rhncrs.shared_state import SharedStateLog  # noqa: E402
+
+
+def writer(directory: str, writer_id: int, count: int) -> None:
+    log = SharedStateLog(Path(directory), compact_bytes=256 * 1024)
+    for i in range(count):
+        log.append(f"writer {writer_id} message {i}", {"i": i}, author=f"w{writer_id}")
+
+
+def bench_log(messages: int, writers: int) -> dict:
+    with tempfile.TemporaryDirectory(prefix="rhncrs-state-") as tmp:
+        per_writer = messages // writers
+        start = time.perf_counter()
+        procs = [multiprocessing.Process(target=writer, args=(tmp, w, per_writer)) for w in range(writers)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - start
+
+        log = SharedStateLog(Path(tmp))
+        seen, since = [], 0
+        read_start = time.perf_counter()
+        while True:
+            page = log.read(since_seq=since, limit=500)
+            seen.extend(e["seq"] for e in page["messages"])
+            if not page["has_more"]:
+                break
+            since = seen[-1]
+        read_elapsed = time.perf_counter() - read_start
+
+        t0 = time.perf_counter()
+        for _ in range(100):
+            log.read(since_seq=page["last_seq"] - 10, limit=50)
+        delta_read_ms = (time.perf_counter() - t0) * 10
+
+    expected = per_writer * writers
+    return {
+        "messages": expected,
+        "writers": writers,
+        "append_throughput_msgs_s": round(expected / elapsed, 1),
+        "full_replay_s": round(read_elapsed, 3),
+        "delta_read_ms": round(delta_read_ms, 3),
+        "lost_updates": expected - len(set(seen)),
+        "monotonic": seen == sorted(seen) and seen == list(range(1, expected + 1)),
+    }
+
+
+def bench_legacy(messages: int) -> dict:
+    """The old shared_state_update: read whole file, append, rewrite with indent=2"""
+    with tempfile.TemporaryDirectory(prefix="rhncrs-legacy-") as tmp:
+        state_file = Path(tmp) / "shared-state.json"
+        start = time.perf_counter()
+        for i in range(messages):
+            state = json.loads(state_file.read_text()) if state_file.exists() else {"messages": []}
+            state["messages"].append({"timestamp": str(time.monotonic()), "message": f"m{i}", "data": {"i": i}})
+            state_file.write_text(json.dumps(state, indent=2))
+        elapsed = time.perf_counter() - start
+    return {"messages": messages, "append_throughput_msgs_s": round(messages / elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--legacy-messages", type=int, default=2000,
+                        help="Messages for the whole-file baseline (it is quadratic)")
+    args = parser.parse_args()
+    print(json.dumps({
+        "append_only_log": bench_log(args.messages, args.writers),
+        "legacy_whole_file": bench_legacy(args.legacy_messages),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
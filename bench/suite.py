@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+suite - Reproducible benchmark suite: synthetic vault + collab workload, JSON results, regression check
+Usage:
+    python3 bench/suite.py run [--size 1k|10k|100k] [--requests 500] [--only mcp,populate,collab]
+                               [--python PYTHON] [--mix FILE | --save-mix FILE] [--seed 7]
+                               [--out results.json] [--baseline old.json] [--thresholds FILE] [--keep DIR]
+    python3 bench/suite.py compare OLD.json NEW.json [--thresholds FILE]
+
+run generates a seeded workload (bench/workload.py) in a temp dir and points everything at it
+through OBSIDIAN_VAULT / PROJECT_ROOT / COLLAB_DIR / RHNCRS_PROJECTS_FILE / RHNCRS_STATE_DIR:
+    mcp       rhncrs-mcp-server.py over stdio: startup, index ready, then the request mix replayed
+              (per tool/resource; needs the MCP SDK importable by --python, else skipped)
+    populate  populate_vault.py cold, unchanged, one project changed, --force
+    collab    send_message, route-message, msglog, collab-thread, collab-status, taskq
+Results are {"meta": ..., "results": {name: {n, mean_ms, p50_ms, p95_ms, p99_ms, max_ms, ops_per_s}}}.
+With --baseline (or compare), any metric past bench/thresholds.json is reported and the exit code is 1.
+"""
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BENCH = Path(__file__).resolve().parent
+REPO = BENCH.parent
+BIN = REPO / "bin"
+SERVER = BIN / "rhncrs-mcp-server.py"
+POPULATE = REPO / "populate_vault.py"
+THRESHOLDS = BENCH / "thresholds.json"
+
+sys.path.insert(0, str(BENCH))
+from daemon_bench import Session  # noqa: E402
+from workload import SIZES, generate, load_mix, make_mix, prepare_root, save_mix  # noqa: E402
+
+
+def log(message: str) -> None:
+    print(message, file=sys.stderr, flush=True)
+
+
+def summarize(samples: List[float], wall: Optional[float] = None, errors: int = 0) -> Dict[str, Any]:
+    """Latency percentiles (nearest rank) in ms; throughput over wall seconds, or over the samples"""
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[max(0, math.ceil(q * len(ordered)) - 1)], 3)
+    busy = wall if wall is not None else sum(samples) / 1000
+    return {
+        "n": len(samples),
+        "mean_ms": round(sum(samples) / len(samples), 3),
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "max_ms": round(ordered[-1], 3),
+        "ops_per_s": round(len(samples) / busy, 2) if busy else None,
+        "errors": errors,
+    }
+
+
+def git_meta() -> Dict[str, Any]:
+    def git(*args: str) -> str:
+        proc = subprocess.run(["git", "-C", str(REPO), *args], capture_output=True, text=True)
+        return proc.stdout.strip() if proc.returncode == 0 else ""
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def timed_run(argv: List[str], env: Dict[str, str], stdin: Optional[str] = None) -> tuple:
+    start = time.perf_counter()
+    proc = subprocess.run(argv, env=env, input=stdin, capture_output=True, text=True)
+    return (time.perf_counter() - start) * 1000, proc.returncode == 0
+
+
+# ─── Phases ──────────────────────────────────────────────
+
+def bench_mcp(args, env: Dict[str, str], mix: List[Dict[str, Any]]) -> Dict[str, Any]:
+    if subprocess.run([args.python, "-c", "import mcp"], capture_output=True).returncode != 0:
+        return {"mcp": {"skipped": f"MCP SDK not importable by {args.python}"}}
+    results = {}
+    start = time.perf_counter()
+    session = Session([args.python, str(SERVER)], env)
+    try:
+        session.initialize()
+        results["mcp.startup"] = summarize([(time.perf_counter() - start) * 1000])
+
+        # The vault index builds in the background; stats come from it once it's ready
+        session.send("resources/read", {"uri": "rhncrs://vault/stats"})
+        results["mcp.ready"] = summarize([(time.perf_counter() - start) * 1000])
+
+        # First call of each kind pays for lazy work (search index refresh, project scans)
+        firsts = {}
+        for request in mix:
+            firsts.setdefault(request["label"], request)
+        warm = []
+        for request in firsts.values():
+            t0 = time.perf_counter()
+            session.send(request["method"], request["params"])
+            warm.append((time.perf_counter() - t0) * 1000)
+        results["mcp.warmup"] = summarize(warm)
+
+        samples: Dict[str, List[float]] = {}
+        errors: Dict[str, int] = {}
+        replay_start = time.perf_counter()
+        for request in mix:
+            t0 = time.perf_counter()
+            reply = session.send(request["method"], request["params"])
+            samples.setdefault(request["label"], []).append((time.perf_counter() - t0) * 1000)
+            if reply.get("isError"):
+                errors[request["label"]] = errors.get(request["label"], 0) + 1
+        wall = time.perf_counter() - replay_start
+    finally:
+        session.close()
+
+    for label, values in sorted(samples.items()):
+        results[f"mcp.{label.replace('rhncrs://', 'resource:')}"] = summarize(values, errors=errors.get(label, 0))
+    results["mcp.all"] = summarize([v for values in samples.values() for v in values], wall, sum(errors.values()))
+    return results
+
+
+def bench_populate(args, env: Dict[str, str], root: Path) -> Dict[str, Any]:
+    argv = [sys.executable, str(POPULATE)]
+    results = {}
+    ms, ok = timed_run(argv, env)
+    results["populate.cold"] = summarize([ms], errors=int(not ok))
+    warm = [timed_run(argv, env) for _ in range(args.repeat)]
+    results["populate.unchanged"] = summarize([m for m, _ in warm], errors=sum(not ok for _, ok in warm))
+    changed = []
+    for i in range(args.repeat):
+        readme = root / "projects" / "bench-project-00" / "README.md"
+        readme.write_text(readme.read_text() + f"\nRevision {i}.\n")
+        changed.append(timed_run(argv, env))
+    results["populate.one_changed"] = summarize([m for m, _ in changed], errors=sum(not ok for _, ok in changed))
+    ms, ok = timed_run(argv + ["--force"], env)
+    results["populate.force"] = summarize([ms], errors=int(not ok))
+    return results
+
+
+COLLAB_OPS = {
+    "send_message": lambda i: [str(BIN / "send_message"), "claude", f"Bench update {i}", "info", "normal"],
+    "send_question": lambda i: [str(BIN / "send_message"), "claude", f"Bench question {i}?", "question", "normal"],
+    "route_message": lambda i: [str(BIN / "route-message"), f"@Gemini check note {i}"],
+    "msglog_query": lambda i: [str(BIN / "msglog"), "query", "--since", "1d", "--from", "gemini",
+                               "--type", "question", "--limit", "50"],
+    "thread_tail": lambda i: [str(BIN / "collab-thread"), "tail", "-n", "20"],
+    "status_get": lambda i: [str(BIN / "collab-status"), "get"],
+    "taskq_enqueue": lambda i: [str(BIN / "taskq"), "enqueue", f"Bench task {i}"],
+    "taskq_list": lambda i: [str(BIN / "taskq"), "list", "--limit", "50"],
+}
+
+
+def bench_collab(args, env: Dict[str, str]) -> Dict[str, Any]:
+    samples: Dict[str, List[float]] = {name: [] for name in COLLAB_OPS}
+    errors = dict.fromkeys(COLLAB_OPS, 0)
+    # Round-robin, so each op sees the log/thread/queue grow the way it does in use
+    for i in range(args.repeat):
+        for name, argv in COLLAB_OPS.items():
+            ms, ok = timed_run(argv(i), env)
+            samples[name].append(ms)
+            errors[name] += not ok
+    return {f"collab.{name}": summarize(values, errors=errors[name]) for name, values in samples.items()}
+
+
+# ─── Comparison ──────────────────────────────────────────
+
+def load_thresholds(path: Path) -> Dict[str, Any]:
+    return json.loads(Path(path).read_text())
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], thresholds: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """One row per (result, metric) present in both runs; regressed rows exceed both the ratio and the delta
+
+    Tail percentiles are only compared once both runs have min_samples samples.
+    """
+    rows = []
+    for name, cur in sorted(current["results"].items()):
+        base = baseline["results"].get(name)
+        if not base or "skipped" in cur or "skipped" in base:
+            continue
+        rule = dict(thresholds["default"])
+        for pattern, override in thresholds.get("overrides", {}).items():
+            if fnmatch.fnmatch(name, pattern):
+                rule.update(override)
+        for metric in thresholds["metrics"]:
+            b, c = base.get(metric), cur.get(metric)
+            if b is None or c is None:
+                continue
+            if metric != "p50_ms" and min(base["n"], cur["n"]) < rule.get("min_samples", 0):
+                continue  # a tail percentile over a handful of samples is mostly noise
+            ratio = c / b if b else math.inf
+            rows.append({"name": name, "metric": metric, "baseline": round(b, 3), "current": round(c, 3),
+                         "ratio": round(ratio, 3),
+                         "regressed": ratio > rule["max_ratio"] and c - b > rule["min_delta_ms"]})
+        if cur.get("errors", 0) > base.get("errors", 0):
+            rows.append({"name": name, "metric": "errors", "baseline": base.get("errors", 0),
+                         "current": cur["errors"], "ratio": None, "regressed": True})
+    return rows
+
+
+def report(rows: List[Dict[str, Any]], baseline: Dict[str, Any], current: Dict[str, Any]) -> int:
+    keys = ("size", "notes", "requests", "seed", "mix_sha256")
+    differs = [k for k in keys if baseline["meta"].get(k) != current["meta"].get(k)]
+    if differs:
+        log(f"⚠️  Runs differ in {', '.join(differs)}; the comparison may not be meaningful")
+    log(f"{'result':36} {'metric':8} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for row in rows:
+        ratio = f"{row['ratio']:.2f}x" if row["ratio"] is not None else ""
+        mark = "  ❌ regression" if row["regressed"] else ""
+        log(f"{row['name']:36} {row['metric']:8} {row['baseline']:>10} {row['current']:>10} {ratio:>7}{mark}")
+    regressions = sum(row["regressed"] for row in rows)
+    log(f"\n{'❌' if regressions else '✅'} {regressions} regression(s) in {len(rows)} comparisons "
+        f"({(baseline['meta'].get('commit') or '?')[:10]} → {(current['meta'].get('commit') or '?')[:10]})")
+    return 1 if regressions else 0
+
+
+# ─── Main ────────────────────────────────────────────────
+
+def run(args) -> int:
+    notes = SIZES.get(args.size) or int(args.size)
+    phases = args.only.split(",")
+    root = Path(args.keep) if args.keep else Path(tempfile.mkdtemp(prefix="rhncrs-suite-"))
+    if args.keep:
+        try:
+            prepare_root(root)
+        except ValueError as e:
+            log(f"✗ --keep: {e}")
+            return 2
+    try:
+        log(f"🏗  Generating {notes} notes, {args.projects} projects, {args.messages} messages (seed {args.seed})...")
+        t0 = time.perf_counter()
+        tree = generate(root, notes, args.projects, args.messages, args.seed, args.files)
+        generate_s = round(time.perf_counter() - t0, 2)
+
+        mix = load_mix(Path(args.mix)) if args.mix else make_mix(args.requests, tree["notes"], tree["projects"], args.seed)
+        if args.save_mix:
+            save_mix(Path(args.save_mix), mix)
+        mix_sha = hashlib.sha256(json.dumps(mix, sort_keys=True).encode()).hexdigest()
+
+        env = dict(os.environ,
+                   OBSIDIAN_VAULT=str(root / "vault"), PROJECT_ROOT=str(root / "projects"),
+                   COLLAB_DIR=str(root / "collab"), RHNCRS_PROJECTS_FILE=str(root / "projects.json"),
+                   RHNCRS_STATE_DIR=str(root / "state"), RHNCRS_SOCKET=str(root / "state" / "mcp.sock"),
+                   RHNCRS_SECRETS_SOCKET=str(root / "state" / "secrets.sock"))
+
+        results: Dict[str, Any] = {}
+        if "populate" in phases:
+            # First, so the MCP phase sees the generated project docs like a real vault would
+            log("📝 populate_vault.py...")
+            results.update(bench_populate(args, env, root))
+        if "mcp" in phases:
+            log(f"🔌 MCP server over stdio, {len(mix)} requests...")
+            results.update(bench_mcp(args, env, mix))
+        if "collab" in phases:
+            log(f"💬 collab scripts x{args.repeat}...")
+            results.update(bench_collab(args, env))
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    current = {
+        "meta": dict(git_meta(),
+                     date=datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                     python=platform.python_version(), platform=platform.platform(), cpus=os.cpu_count(),
+                     size=args.size, notes=len(tree["notes"]), projects=args.projects, messages=args.messages,
+                     requests=len(mix), repeat=args.repeat, seed=args.seed, mix_sha256=mix_sha,
+                     generate_s=generate_s, phases=phases),
+        "results": results,
+    }
+    text = json.dumps(current, indent=2) + "\n"
+    if args.out:
+        Path(args.out).write_text(text)
+        log(f"✓ Results written to {args.out}")
+    else:
+        sys.stdout.write(text)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        return report(compare(baseline, current, load_thresholds(args.thresholds)), baseline, current)
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    r = sub.add_parser("run", help="Generate the workload and benchmark it")
+    r.add_argument("--size", default="1k", help=f"Vault notes: {', '.join(SIZES)} or a number")
+    r.add_argument("--projects", type=int, default=5)
+    r.add_argument("--files", type=int, default=200, help="Source files per project")
+    r.add_argument("--messages", type=int, default=20_000, help="Message log entries")
+    r.add_argument("--requests", type=int, default=500, help="MCP requests in the generated mix")
+    r.add_argument("--repeat", type=int, default=10, help="Runs per populate/collab measurement")
+    r.add_argument("--seed", type=int, default=7)
+    r.add_argument("--only", default="populate,mcp,collab", help="Comma-separated phases")
+    r.add_argument("--python", default=sys.executable, help="Interpreter with the MCP SDK")
+    r.add_argument("--mix", help="Replay this request mix (JSONL) instead of generating one")
+    r.add_argument("--save-mix", help="Write the request mix (JSONL) for later replays")
+    r.add_argument("--out", help="Write results here instead of stdout")
+    r.add_argument("--baseline", help="Compare against an earlier results file")
+    r.add_argument("--thresholds", default=str(THRESHOLDS))
+    r.add_argument("--keep", help="Generate into this directory and keep it (must be new, empty, "
+                                  "or from an earlier run)")
+
+    c = sub.add_parser("compare", help="Compare two results files")
+    c.add_argument("baseline")
+    c.add_argument("current")
+    c.add_argument("--thresholds", default=str(THRESHOLDS))
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        baseline, current = (json.loads(Path(p).read_text()) for p in (args.baseline, args.current))
+        return report(compare(baseline, current, load_thresholds(args.thresholds)), baseline, current)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
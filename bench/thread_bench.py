@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+thread_bench - Cost of "summary + last N messages" as the collaboration thread ages
+Usage: python3 bench/thread_bench.py [--sizes 1000,10000,50000] [--last 20] [--reads 200]
+Compares reading the whole unbounded active_thread.md (what agents used to load) with
+ThreadLog.render_tail() on a rotating thread holding the same messages.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO / "lib"))
+from rhncrs.thread import ThreadLog, format_message  # noqa: E402
+
+TYPES = ("info", "question", "request", "response", "completed")
+
+
+def message(rng: random.Random, i: int) -> tuple:
+    sender, recipient = ("gemini", "claude") if i % 2 == 0 else ("claude", "gemini")
+    body = f"Message {i}: " + " ".join(rng.choice(("vault", "sync", "index", "note", "task", "deploy"))
+                                       for _ in range(rng.randint(20, 120)))
+    return body, sender, recipient, rng.choice(TYPES)
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+    return {"mean_ms": round(statistics.mean(samples) * 1000, 3), "p50_ms": pick(0.5), "p95_ms": pick(0.95)}
+
+
+def timed(reads: int, fn) -> tuple:
+    samples, size = [], 0
+    for _ in range(reads):
+        start = time.perf_counter()
+        size = len(fn())
+        samples.append(time.perf_counter() - start)
+    return summarize(samples), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,50000", help="Thread lengths (messages)")
+    parser.add_argument("--last", type=int, default=20)
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args()
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        rng = random.Random(size)
+        with tempfile.TemporaryDirectory(prefix="rhncrs-thread-") as tmp:
+            unbounded = Path(tmp) / "unbounded" / "active_thread.md"
+            unbounded.parent.mkdir()
+            thread = ThreadLog(Path(tmp) / "dialogues" / "active_thread.md")
+            start = time.perf_counter()
+            with open(unbounded, "w") as f:
+                for i in range(size):
+                    body, sender, recipient, type = message(rng, i)
+                    ts = f"2025-01-01T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}Z"
+                    f.write(format_message(body, sender, recipient, type, ts))
+                    thread.append(body, sender, recipient, type, timestamp=ts)
+            append_ms = (time.perf_counter() - start) * 1000 / size
+
+            full, full_bytes = timed(args.reads, unbounded.read_text)
+            tail, tail_bytes = timed(args.reads, lambda: thread.render_tail(args.last))
+            stats = thread.stats()
+        results.append({
+            "messages": size,
+            "segments": len(stats["segments"]),
+            "append_ms": round(append_ms, 3),
+            "full_read": dict(full, chars=full_bytes),
+            "summary_plus_tail": dict(tail, chars=tail_bytes),
+        })
+
+    print(json.dumps({"last": args.last, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
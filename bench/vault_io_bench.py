@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+vault_io_bench - Latency comparison: native async vault engine vs forking the shell manager
+Usage: python3 bench/vault_io_bench.py [--notes 200] [--calls 300] [--concurrency 16]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO / "lib"))
+from rhncrs.vault_io import VaultIO  # noqa: E402
+
+VAULT_MANAGER = REPO / "bin" / "obsidian-vault-manager.sh"
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "p50_ms": round(pick(0.50), 3),
+        "p95_ms": round(pick(0.95), 3),
+        "p99_ms": round(pick(0.99), 3),
+        "mean_ms": round(statistics.mean(ordered) * 1000, 3),
+    }
+
+
+def make_vault(root: Path, notes: int) -> list:
+    paths = []
+    for i in range(notes):
+        rel = f"1_Projects/{i % 10:02d}_Project/Note_{i}.md"
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"---\ntags: [#bench]\n---\n\n# Note {i}\n\n" + "lorem ipsum " * 50)
+        paths.append(rel)
+    return paths
+
+
+def workload(paths, calls):
+    ops = []
+    for i in range(calls):
+        rel = paths[i % len(paths)]
+        if i % 5 == 0:
+            ops.append(("write", rel.replace(".md", "_w.md"), f"# Bench write {i}"))
+        elif i % 7 == 0:
+            ops.append(("list", rel.rsplit("/", 1)[0]))
+        else:
+            ops.append(("read", rel))
+    return ops
+
+
+async def run_native(vault: VaultIO, ops, concurrency):
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(op):
+        async with sem:
+            start = time.perf_counter()
+            await getattr(vault, op[0])(*op[1:])
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(op) for op in ops))
+    return latencies, time.perf_counter() - start
+
+
+def run_shell(root: Path, ops):
+    env = dict(os.environ, OBSIDIAN_VAULT=str(root))
+    latencies = []
+    start = time.perf_counter()
+    for op in ops:
+        t0 = time.perf_counter()
+        # Mirrors the old call_tool(): blocking subprocess.run per call
+        subprocess.run([str(VAULT_MANAGER), *op], capture_output=True, text=True, env=env)
+        latencies.append(time.perf_counter() - t0)
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--notes", type=int, default=200)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="rhncrs-bench-") as tmp:
+        root = Path(tmp)
+        paths = make_vault(root, args.notes)
+        ops = workload(paths, args.calls)
+
+        vault = VaultIO(root)
+        native_lat, native_wall = asyncio.run(run_native(vault, ops, args.concurrency))
+        vault.shutdown()
+        shell_lat, shell_wall = run_shell(root, ops)
+
+    report = {
+        "calls": args.calls,
+        "native": dict(percentiles(native_lat), wall_s=round(native_wall, 3),
+                       throughput_ops_s=round(args.calls / native_wall, 1)),
+        "shell": dict(percentiles(shell_lat), wall_s=round(shell_wall, 3),
+                      throughput_ops_s=round(args.calls / shell_wall, 1)),
+    }
+    report["speedup_wall"] = round(shell_wall / native_wall, 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+workload - Deterministic synthetic vaults, project repos, collab state and MCP request mixes
+Usage: python3 bench/workload.py DIR [--notes 10000] [--projects 5] [--messages 20000] [--seed 7]
+Builds DIR/vault, DIR/projects (+ DIR/projects.json) and DIR/collab, the layout
+bench/suite.py points the server and scripts at via OBSIDIAN_VAULT, PROJECT_ROOT,
+COLLAB_DIR and RHNCRS_PROJECTS_FILE. The same seed always produces the same tree.
+"""
+
+import argparse
+import json
+import random
+import shutil
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO / "lib"))
+from rhncrs.msglog import MessageLog  # noqa: E402
+from rhncrs.taskq import TaskQueue  # noqa: E402
+from rhncrs.thread import ThreadLog  # noqa: E402
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+
+WORDS = ("signal mixer compressor sidechain reverb tempo arrangement stem mastering synth patch sequencer "
+         "docker swarm nginx certificate deploy rollback volume backup cron ingress latency cache index "
+         "agent prompt handoff context budget delegation review schema migration queue lease token "
+         "invoice contract budget roadmap release milestone retro incident runbook checklist").split()
+AREAS = ("21_Audio_Engineering", "22_AI_Systems", "23_DevOps", "24_Business_Admin")
+TYPES = ("note", "guide", "spec", "reference", "moc")
+STATUSES = ("seed", "sapling", "evergreen", "deprecated")
+AGENTS = ("gemini", "claude", "user")
+# Marks a directory as generated here, so it is the only kind we ever clear
+SENTINEL = ".rhncrs-bench-workload"
+MESSAGE_TYPES = ("info", "question", "request", "response")
+
+
+def sentence(rng: random.Random, words: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def project_specs(count: int) -> List[Dict[str, str]]:
+    return [{"id": f"bench-project-{i:02d}", "name": f"Bench Project {i:02d}",
+             "vault_folder": f"{11 + i}_Bench_Project_{i:02d}"} for i in range(count)]
+
+
+# ─── Vault ───────────────────────────────────────────────
+
+def make_vault(root: Path, notes: int, projects: List[Dict[str, str]], seed: int = 7, links: int = 5) -> List[str]:
+    """Notes with frontmatter, inline tags and wikilinks; 5% of them are hubs that draw most links
+
+    Returns the note paths (relative, in creation order). Every 40th note has no links,
+    so orphan queries have something to find.
+    """
+    rng = random.Random(seed)
+    folders = [f"1_Projects/{p['vault_folder']}" for p in projects] + [f"2_Areas/{a}" for a in AREAS]
+    folders += [f"3_Resources/R{i:02d}" for i in range(max(1, notes // 2000))]
+    mocs = [f"MOC {folder.split('/')[-1]}" for folder in folders]
+    names = [f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} {i}" for i in range(notes)]
+    hubs = names[:max(1, notes // 20)]
+    start = datetime(2025, 1, 1)
+    paths = []
+
+    atlas = root / "00_Atlas"
+    atlas.mkdir(parents=True, exist_ok=True)
+    (atlas / "Home.md").write_text("---\ntype: moc\ntags: [#type/moc]\n---\n# Home\n\n"
+                                   + "".join(f"- [[{m}]]\n" for m in mocs))
+    paths.append("00_Atlas/Home.md")
+    for moc, folder in zip(mocs, folders):
+        (atlas / f"{moc}.md").write_text(f"---\ntype: moc\n---\n# {moc}\n\nUp: [[Home]]\nFolder: {folder}\n")
+        paths.append(f"00_Atlas/{moc}.md")
+
+    for i, name in enumerate(names):
+        f = i % len(folders)
+        folder = root / folders[f]
+        folder.mkdir(parents=True, exist_ok=True)
+        created = (start + timedelta(hours=i)).strftime("%Y-%m-%d")
+        tags = [f"#type/{rng.choice(TYPES)}", f"#status/{rng.choice(STATUSES)}", f"#topic/{rng.choice(WORDS)}"]
+        body = [f"# {name}", ""]
+        for _ in range(rng.randint(2, 6)):
+            body += [f"## {sentence(rng, 3)[:-1]}", "", sentence(rng, rng.randint(20, 60)), ""]
+        if i % 40:
+            targets = [rng.choice(hubs) if rng.random() < 0.6 else rng.choice(names) for _ in range(links)]
+            rendered = [f"[[{t}]]" if n % 3 else f"[[{t}|{t.split()[0]}]]" for n, t in enumerate(targets)]
+            body += [f"Up: [[{mocs[f]}]]", "Related: " + " ".join(rendered), ""]
+        body.append(" ".join(tags))
+        frontmatter = (f"---\ntype: {tags[0][6:]}\nstatus: {tags[1][8:]}\ncreated: {created}\nupdated: {created}\n"
+                       f"tags: [{', '.join(tags)}]\n---\n")
+        (folder / f"{name}.md").write_text(frontmatter + "\n".join(body) + "\n")
+        paths.append(f"{folders[f]}/{name}.md")
+
+    daily = root / "40_Logs" / "Daily_Notes"
+    daily.mkdir(parents=True, exist_ok=True)
+    for d in range(min(90, notes // 10 or 1)):
+        day = (start + timedelta(days=d)).strftime("%Y-%m-%d")
+        (daily / f"{day}.md").write_text(f"# Daily Log - {day}\n\n{sentence(rng)}\n")
+    for folder in ("90_Admin", "9_System/Secrets", "9_System/Logs/Daily_Notes"):
+        (root / folder).mkdir(parents=True, exist_ok=True)
+    return paths
+
+
+# ─── Projects ────────────────────────────────────────────
+
+def make_projects(root: Path, registry: Path, projects: List[Dict[str, str]], files: int = 200,
+                  seed: int = 7) -> None:
+    """One repo per project (README, manifest, compose file, sources, ignored build output)"""
+    rng = random.Random(seed)
+    for n, spec in enumerate(projects):
+        repo = root / spec["id"]
+        (repo / ".git").mkdir(parents=True, exist_ok=True)
+        (repo / "README.md").write_text(f"# {spec['name']}\n\n" + "\n\n".join(sentence(rng, 40) for _ in range(8)))
+        (repo / "docker-compose.yml").write_text("services:\n  app:\n    image: app\n  worker:\n    image: worker\n")
+        (repo / ".gitignore").write_text("build/\n*.log\n")
+        if n % 2:
+            (repo / "pyproject.toml").write_text(f'[project]\nname = "{spec["id"]}"\n'
+                                                 'dependencies = ["requests>=2", "pydantic>=2"]\n')
+            ext = "py"
+        else:
+            (repo / "package.json").write_text(json.dumps({"name": spec["id"], "scripts": {"test": "vitest"},
+                                                           "dependencies": {"express": "^4", "zod": "^3"}}, indent=2))
+            ext = "ts"
+            vendored = repo / "node_modules" / "express"
+            vendored.mkdir(parents=True, exist_ok=True)
+            for v in range(files // 2):
+                (vendored / f"dep{v}.js").write_text("module.exports = {};\n")
+        for i in range(files):
+            module = repo / "src" / f"pkg{i % 10}"
+            module.mkdir(parents=True, exist_ok=True)
+            lines = [f"// {sentence(rng, 8)}" if ext == "ts" else f"# {sentence(rng, 8)}"]
+            lines += [f"const v{k} = {k};" if ext == "ts" else f"v{k} = {k}" for k in range(rng.randint(20, 200))]
+            (module / f"mod{i}.{ext}").write_text("\n".join(lines) + "\n")
+        build = repo / "build"
+        build.mkdir(exist_ok=True)
+        (build / "bundle.js").write_text("x" * 4096)
+    registry.write_text(json.dumps({"vault_projects_dir": "1_Projects", "discover": True, "projects": [
+        dict(spec, description=f"Synthetic project {spec['id']}") for spec in projects]}, indent=2) + "\n")
+
+
+# ─── Collab ──────────────────────────────────────────────
+
+def make_collab(collab: Path, messages: int, seed: int = 7, thread_messages: int = 400, tasks: int = 50) -> None:
+    """Message log (one message a minute up to now, then indexed), thread, status and a task queue"""
+    rng = random.Random(seed)
+    collab.mkdir(parents=True, exist_ok=True)
+    start = datetime.now(timezone.utc) - timedelta(minutes=messages)
+    with open(collab / "message-log.jsonl", "w") as out:
+        for i in range(messages):
+            sender = rng.choice(AGENTS)
+            out.write(json.dumps({
+                "timestamp": (start + timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "from": sender,
+                "to": rng.choice([a for a in AGENTS if a != sender]),
+                "type": rng.choice(MESSAGE_TYPES),
+                "priority": "high" if rng.random() < 0.05 else "normal",
+                "message": sentence(rng, rng.randint(5, 40)),
+            }, separators=(",", ":")) + "\n")
+    MessageLog(collab / "message-log.jsonl").reindex()
+
+    thread = ThreadLog(collab / "dialogues" / "active_thread.md")
+    for i in range(thread_messages):
+        sender = AGENTS[i % 2]
+        thread.append(sentence(rng, rng.randint(10, 80)), sender, AGENTS[1 - i % 2], rng.choice(MESSAGE_TYPES))
+
+    (collab / "status.json").write_text(json.dumps({"state": "IDLE", "version": 1}, indent=2) + "\n")
+    queue = TaskQueue(collab / "tasks.sqlite", collab / "handoffs")
+    for i in range(tasks):
+        queue.enqueue(f"Task {i}: {sentence(rng, 8)}", priority=rng.choice(("low", "normal", "high")))
+
+
+# ─── Request mix ─────────────────────────────────────────
+
+# label -> weight; labels are the tool name or the resource URI without its query
+MIX_WEIGHTS = {
+    "vault_read": 30, "vault_search": 12, "vault_backlinks": 8, "vault_outlinks": 5, "vault_neighborhood": 3,
+    "vault_list": 5, "vault_tree": 2, "vault_write": 6, "project_read_file": 8, "message_log_query": 5,
+    "shared_state_read": 2, "task_list": 2,
+    "rhncrs://vault/stats": 3, "rhncrs://projects": 4, "rhncrs://collab/thread": 4,
+    "rhncrs://collab/status": 3, "rhncrs://collab/tasks": 2,
+}
+
+
+def make_mix(requests: int, notes: List[str], projects: List[Dict[str, str]], seed: int = 7) -> List[Dict[str, Any]]:
+    """A replayable list of MCP requests: {"label", "method", "params"}"""
+    rng = random.Random(seed)
+    labels, weights = zip(*MIX_WEIGHTS.items())
+    hubs = notes[:max(1, len(notes) // 20)]
+    folders = sorted({p.rsplit("/", 1)[0] for p in notes})
+    sources = [f"src/pkg{i % 10}/mod{i}.{'py' if n % 2 else 'ts'}" for n in range(len(projects)) for i in range(10)]
+
+    def note() -> str:
+        return rng.choice(hubs) if rng.random() < 0.5 else rng.choice(notes)
+
+    def tool(name: str, **arguments: Any) -> Dict[str, Any]:
+        return {"method": "tools/call", "params": {"name": name, "arguments": arguments}}
+
+    mix = []
+    for i in range(requests):
+        label = rng.choices(labels, weights)[0]
+        if label == "vault_read":
+            request = tool(label, path=note())
+        elif label == "vault_search":
+            query = " ".join(rng.sample(WORDS, rng.randint(1, 3)))
+            if rng.random() < 0.3:
+                query += f" tag:#status/{rng.choice(STATUSES)}"
+            request = tool(label, query=query, limit=20)
+        elif label in ("vault_backlinks", "vault_outlinks"):
+            request = tool(label, path=note().rsplit("/", 1)[-1][:-3])
+        elif label == "vault_neighborhood":
+            request = tool(label, path=note(), depth=2)
+        elif label == "vault_list":
+            request = tool(label, path=rng.choice(folders))
+        elif label == "vault_tree":
+            request = tool(label, path=rng.choice(("00_Atlas", "2_Areas", "1_Projects")), depth=2)
+        elif label == "vault_write":
+            request = tool(label, path=f"99_Bench/Scratch {i % 20}.md", content=f"- entry {i}: {sentence(rng, 10)}\n",
+                           mode="append")
+        elif label == "project_read_file":
+            n = rng.randrange(len(projects))
+            request = tool(label, project=projects[n]["id"],
+                           path=rng.choice(("README.md",) + tuple(s for s in sources if s.endswith("py" if n % 2 else "ts"))))
+        elif label == "message_log_query":
+            request = tool(label, since=rng.choice(("1h", "1d", "7d")), **{"from": rng.choice(AGENTS)},
+                           type=rng.choice(MESSAGE_TYPES), limit=50)
+        elif label == "shared_state_read":
+            request = tool(label, limit=50)
+        elif label == "task_list":
+            request = tool(label, status=["pending"])
+        elif label == "rhncrs://projects":
+            request = {"method": "resources/read",
+                       "params": {"uri": f"rhncrs://projects/{rng.choice(projects)['id']}?per_page=100"}}
+        elif label == "rhncrs://collab/thread":
+            request = {"method": "resources/read", "params": {"uri": "rhncrs://collab/thread?last=20"}}
+        else:
+            request = {"method": "resources/read", "params": {"uri": label}}
+        mix.append(dict(request, label=label))
+    return mix
+
+
+def save_mix(path: Path, mix: List[Dict[str, Any]]) -> None:
+    path.write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in mix))
+
+
+def load_mix(path: Path) -> List[Dict[str, Any]]:
+    return [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+
+
+def prepare_root(root: Path) -> None:
+    """Empty a workload dir from an earlier run, or claim a new/empty one; refuse anything else"""
+    if root.exists() and any(root.iterdir()):
+        if not (root / SENTINEL).is_file():
+            raise ValueError(f"{root} is not empty and was not generated by bench/workload.py")
+        shutil.rmtree(root)
+    root.mkdir(parents=True, exist_ok=True)
+    (root / SENTINEL).write_text("Generated by bench/workload.py; cleared on the next run\n")
+
+
+def generate(root: Path, notes: int, projects: int, messages: int, seed: int = 7,
+             files: int = 200) -> Dict[str, Any]:
+    """Build the whole tree under root; returns what bench/suite.py needs to know about it"""
+    specs = project_specs(projects)
+    note_paths = make_vault(root / "vault", notes, specs, seed)
+    make_projects(root / "projects", root / "projects.json", specs, files, seed)
+    make_collab(root / "collab", messages, seed)
+    return {"notes": note_paths, "projects": specs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("dir", type=Path)
+    parser.add_argument("--notes", default="10k", help=f"Note count or one of {', '.join(SIZES)}")
+    parser.add_argument("--projects", type=int, default=5)
+    parser.add_argument("--files", type=int, default=200, help="Source files per project")
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    notes = SIZES.get(args.notes) or int(args.notes)
+    try:
+        prepare_root(args.dir)
+    except ValueError as e:
+        parser.error(str(e))
+    tree = generate(args.dir, notes, args.projects, args.messages, args.seed, args.files)
+    print(json.dumps({"dir": str(args.dir), "notes": len(tree["notes"]), "projects": len(tree["projects"])}))
+
+
+if __name__ == "__main__":
+    main()
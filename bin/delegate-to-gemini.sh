@@ -4,10 +4,13 @@
 
 set -e
 
-VAULT_PATH="/Users/hoe/Library/Mobile Documents/iCloud~md~obsidian/Documents/rhncrs-collab"
-PROJECT_ROOT="/Users/hoe/Dev/org"
+VAULT_PATH="${OBSIDIAN_VAULT:-/Users/hoe/Library/Mobile Documents/iCloud~md~obsidian/Documents/rhncrs-collab}"
+PROJECT_ROOT="${PROJECT_ROOT:-/Users/hoe/Dev/org}"
 VAULT_MANAGER="/Users/hoe/Dev/workspace/tools/gemini-vault"
 TEMP_DIR="/tmp/gemini-delegation-$$"
+BIN_DIR="$(cd "$(dirname "$(readlink -f "$0" 2>/dev/null || echo "$0")")" && pwd)"
+# Whole-prompt token budget; context files get whatever the template and task leave over
+PROMPT_BUDGET="${RHNCRS_PROMPT_BUDGET:-16000}"
 
 usage() {
     cat << EOF
@@ -27,6 +30,8 @@ Gemini will:
 OPTIONS:
     --task-file FILE         File containing the task description
     --context FILES...       Additional context files to provide Gemini
+    --budget TOKENS          Prompt token budget (default: \$RHNCRS_PROMPT_BUDGET or 16000)
+    --fresh-context          Re-send context Gemini was already given recently
     --help                   Show this help
 
 EXAMPLE:
@@ -43,6 +48,7 @@ EOF
 # Parse arguments
 TASK_FILE=""
 CONTEXT_FILES=()
+FRESH_CONTEXT=""
 
 while [[ $# -gt 0 ]]; do
     case $1 in
@@ -57,6 +63,14 @@ while [[ $# -gt 0 ]]; do
                 shift
             done
             ;;
+        --budget)
+            PROMPT_BUDGET="$2"
+            shift 2
+            ;;
+        --fresh-context)
+            FRESH_CONTEXT="--fresh"
+            shift
+            ;;
         --help)
             usage
             ;;
@@ -100,56 +114,56 @@ You have been delegated FULL AUTHORITY to manage the vault independently.
 
 You have access to the `gemini-vault` command-line tool:
 
-**Location:** /Users/hoe/Dev/workspace/tools/gemini-vault
+**Location:** {{VAULT_MANAGER}}
 
 **Available Commands:**
 ```bash
 # Write a file (creates parent directories automatically)
-/Users/hoe/Dev/workspace/tools/gemini-vault write "path/to/file.md" "complete content here"
+{{VAULT_MANAGER}} write "path/to/file.md" "complete content here"
 
 # Read a file
-/Users/hoe/Dev/workspace/tools/gemini-vault read "path/to/file.md"
+{{VAULT_MANAGER}} read "path/to/file.md"
 
 # List directory
-/Users/hoe/Dev/workspace/tools/gemini-vault list "10_Projects"
+{{VAULT_MANAGER}} list "1_Projects"
 
 # Show tree structure
-/Users/hoe/Dev/workspace/tools/gemini-vault tree "00_Atlas" 2
+{{VAULT_MANAGER}} tree "9_System/Atlas" 2
 
 # Create directory
-/Users/hoe/Dev/workspace/tools/gemini-vault mkdir "new/directory"
+{{VAULT_MANAGER}} mkdir "new/directory"
 
 # Check if file exists
-/Users/hoe/Dev/workspace/tools/gemini-vault exists "path/file.md"
+{{VAULT_MANAGER}} exists "path/file.md"
 
 # Show vault structure
-/Users/hoe/Dev/workspace/tools/gemini-vault structure
+{{VAULT_MANAGER}} structure
 ```
 
 ## VAULT INFORMATION
 
-**Vault Path:** /Users/hoe/Library/Mobile Documents/iCloud~md~obsidian/Documents/rhncrs-collab
+**Vault Path:** {{VAULT_PATH}}
 
 **Projects to Document:**
-- rhinoceros-music: /Users/hoe/Dev/org/rhinoceros-music
-- rhinocrash: /Users/hoe/Dev/org/rhinocrash
-- rhncrsv1: /Users/hoe/Dev/org/rhncrsv1
-- infrastructure: /Users/hoe/Dev/org/infrastructure
-- infrastructure-swarm: /Users/hoe/Dev/org/infrastructure-swarm
+- rhinoceros-music: {{PROJECT_ROOT}}/rhinoceros-music
+- rhinocrash: {{PROJECT_ROOT}}/rhinocrash
+- rhncrsv1: {{PROJECT_ROOT}}/rhncrsv1
+- infrastructure: {{PROJECT_ROOT}}/infrastructure
+- infrastructure-swarm: {{PROJECT_ROOT}}/infrastructure-swarm
 
 **Vault Structure:**
 ```
-00_Atlas/         - Navigation and MOCs
-10_Projects/      - Active project documentation
+0_Inbox/          - Unsorted captures
+1_Projects/       - Active project documentation
   11_Rhinoceros_Music/
   12_Rhinocrash/
   13_Rhncrs_V1/
   14_Infrastructure/
   15_Infra_Swarm/
-20_Domains/       - Permanent knowledge domains
-30_Resources/     - Reference materials
-40_Logs/          - Chronological records
-90_Admin/         - Vault maintenance
+2_Areas/          - Permanent knowledge domains
+3_Resources/      - Reference materials
+4_Archive/        - Finished and inactive material
+9_System/         - Atlas (navigation and MOCs), Admin, Logs, Secrets
 ```
 
 ## DOCUMENTATION STANDARDS
@@ -180,6 +194,13 @@ status: active|deprecated|draft
 
 EOFPROMPT
 
+# Fill in this machine's paths (the prompt above is quoted so its backticks stay literal)
+PROMPT_TEXT="$(cat "$TEMP_DIR/delegation-prompt.txt")"
+PROMPT_TEXT=${PROMPT_TEXT//'{{VAULT_MANAGER}}'/"$VAULT_MANAGER"}
+PROMPT_TEXT=${PROMPT_TEXT//'{{VAULT_PATH}}'/"$VAULT_PATH"}
+PROMPT_TEXT=${PROMPT_TEXT//'{{PROJECT_ROOT}}'/"$PROJECT_ROOT"}
+printf '%s\n\n' "$PROMPT_TEXT" > "$TEMP_DIR/delegation-prompt.txt"
+
 # Append the actual task
 echo "$TASK" >> "$TEMP_DIR/delegation-prompt.txt"
 
@@ -190,21 +211,8 @@ cat >> "$TEMP_DIR/delegation-prompt.txt" << 'EOFCONTEXT'
 
 EOFCONTEXT
 
-# Add context files if provided
-if [ ${#CONTEXT_FILES[@]} -gt 0 ]; then
-    for context_file in "${CONTEXT_FILES[@]}"; do
-        if [ -f "$context_file" ]; then
-            echo "### Context from: $context_file" >> "$TEMP_DIR/delegation-prompt.txt"
-            echo '```' >> "$TEMP_DIR/delegation-prompt.txt"
-            cat "$context_file" >> "$TEMP_DIR/delegation-prompt.txt"
-            echo '```' >> "$TEMP_DIR/delegation-prompt.txt"
-            echo >> "$TEMP_DIR/delegation-prompt.txt"
-        fi
-    done
-fi
-
-# Append execution instructions
-cat >> "$TEMP_DIR/delegation-prompt.txt" << 'EOFINSTRUCTIONS'
+# Execution instructions go last; written first so the context budget can account for them
+cat > "$TEMP_DIR/instructions.txt" << 'EOFINSTRUCTIONS'
 
 ## EXECUTION INSTRUCTIONS
 
@@ -242,6 +250,22 @@ Provide your response in this format:
 
 EOFINSTRUCTIONS
 
+# Pack context files into what's left of the budget (~4 chars/token): chunked, deduplicated,
+# already-sent sections referenced, the rest ranked by relevance to the task.
+# What was sent is only recorded once gemini succeeds, so a failed run's retry gets it again.
+CONTEXT_NOTE="none"
+if [ ${#CONTEXT_FILES[@]} -gt 0 ]; then
+    USED_BYTES=$(cat "$TEMP_DIR/delegation-prompt.txt" "$TEMP_DIR/instructions.txt" | wc -c)
+    CONTEXT_BUDGET=$(( PROMPT_BUDGET - USED_BYTES / 4 ))
+    [ "$CONTEXT_BUDGET" -gt 0 ] || CONTEXT_BUDGET=0
+    printf '%s' "$TASK" > "$TEMP_DIR/task.txt"
+    "$BIN_DIR/pack-context" --budget "$CONTEXT_BUDGET" --worker gemini $FRESH_CONTEXT \
+        --no-record --sent "$TEMP_DIR/context-sent.json" --query-file "$TEMP_DIR/task.txt" -- "${CONTEXT_FILES[@]}" \
+        >> "$TEMP_DIR/delegation-prompt.txt" 2> "$TEMP_DIR/context-report.txt"
+    CONTEXT_NOTE="${#CONTEXT_FILES[@]} files, $(sed 's/^pack-context: //' "$TEMP_DIR/context-report.txt")"
+fi
+cat "$TEMP_DIR/instructions.txt" >> "$TEMP_DIR/delegation-prompt.txt"
+
 # Echo the delegation to user
 echo "========================================="
 echo "DELEGATING TO GEMINI (Autonomous Worker)"
@@ -250,13 +274,22 @@ echo
 echo "Task:"
 echo "$TASK"
 echo
-echo "Context files: ${#CONTEXT_FILES[@]}"
+echo "Context: $CONTEXT_NOTE"
 echo
 echo "Executing delegation..."
 echo
 
 # Execute Gemini with full context and autonomy
-gemini < "$TEMP_DIR/delegation-prompt.txt"
+GEMINI_STATUS=0
+gemini < "$TEMP_DIR/delegation-prompt.txt" || GEMINI_STATUS=$?
+if [ "$GEMINI_STATUS" -ne 0 ]; then
+    echo
+    echo "✗ Gemini exited with status $GEMINI_STATUS (context not marked as sent)" >&2
+    exit "$GEMINI_STATUS"
+fi
+if [ -f "$TEMP_DIR/context-sent.json" ]; then
+    "$BIN_DIR/pack-context" --record "$TEMP_DIR/context-sent.json" || true
+fi
 
 echo
 echo "========================================="
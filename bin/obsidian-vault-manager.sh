@@ -2,7 +2,7 @@
 # obsidian-vault-manager.sh - Comprehensive vault management tool for Gemini
 # Provides Gemini with full access to read, write, and manage Obsidian vault files
 
-VAULT_PATH="/Users/hoe/Library/Mobile Documents/iCloud~md~obsidian/Documents/rhncrs-collab"
+VAULT_PATH="${OBSIDIAN_VAULT:-/Users/hoe/Library/Mobile Documents/iCloud~md~obsidian/Documents/rhncrs-collab}"
 
 usage() {
     cat << EOF
@@ -12,7 +12,8 @@ USAGE:
     $(basename "$0") <command> [args...]
 
 COMMANDS:
-    write <file> <content>       Write content to file (creates parent dirs)
+    write <file> <content|->     Write content to file (creates parent dirs; - reads stdin)
+    append <file> <content|->    Append content to file (- reads stdin)
     read <file>                  Read file content
     list [dir]                   List files in directory (default: vault root)
     tree [dir] [depth]           Show directory tree (default depth: 3)
@@ -28,13 +29,16 @@ VAULT LOCATION:
 
 EXAMPLES:
     # Write a file
-    $(basename "$0") write "10_Projects/README.md" "# Project Documentation"
+    $(basename "$0") write "1_Projects/README.md" "# Project Documentation"
+
+    # Write a large note from stdin (no ARG_MAX limit)
+    cat note.md | $(basename "$0") write "1_Projects/Notes.md" -
 
     # Read a file
     $(basename "$0") read "00_Atlas/000_Home.md"
 
     # List directory
-    $(basename "$0") list "10_Projects"
+    $(basename "$0") list "1_Projects"
 
     # Show tree
     $(basename "$0") tree "00_Atlas" 2
@@ -49,6 +53,32 @@ if [ ! -d "$VAULT_PATH" ]; then
     exit 1
 fi
 
+# Content argument, or stdin when it is "-" (keeps big notes out of argv)
+read_content() {
+    if [ "$#" -eq 1 ] && [ "$1" = "-" ]; then
+        cat
+    else
+        printf '%s' "$1"
+    fi
+}
+
+# Write via temp file + rename so readers (and iCloud) never see a truncated note
+atomic_write() {
+    local filepath="$1" tmp
+    mkdir -p "$(dirname "$filepath")"
+    tmp="$(mktemp "$(dirname "$filepath")/.$(basename "$filepath").XXXXXX.tmp")" || return 1
+    if ! cat > "$tmp"; then
+        rm -f "$tmp"
+        return 1
+    fi
+    if [ -f "$filepath" ]; then
+        chmod "$(stat -c '%a' "$filepath" 2>/dev/null || stat -f '%Lp' "$filepath")" "$tmp"
+    else
+        chmod "$(printf '%o' $(( 0666 & ~0$(umask) )))" "$tmp"
+    fi
+    mv -f "$tmp" "$filepath"
+}
+
 # Command handling
 cmd="${1:-}"
 shift || true
@@ -56,17 +86,36 @@ shift || true
 case "$cmd" in
     write)
         file="$1"
-        content="$2"
         if [ -z "$file" ]; then
             echo "Error: No file specified"
             usage
         fi
+        content="$(read_content "${2-}")"
         filepath="$VAULT_PATH/$file"
-        mkdir -p "$(dirname "$filepath")"
-        echo "$content" > "$filepath"
+        if ! printf '%s\n' "$content" | atomic_write "$filepath"; then
+            echo "Error: Could not write: $file"
+            exit 1
+        fi
         echo "✓ Written: $file"
         ;;
 
+    append)
+        file="$1"
+        if [ -z "$file" ]; then
+            echo "Error: No file specified"
+            usage
+        fi
+        content="$(read_content "${2-}")"
+        filepath="$VAULT_PATH/$file"
+        mkdir -p "$(dirname "$filepath")"
+        # Small appends don't need a rewrite; just make sure the previous line is terminated
+        if [ -s "$filepath" ] && [ "$(tail -c 1 "$filepath")" != "" ]; then
+            printf '\n' >> "$filepath"
+        fi
+        printf '%s\n' "$content" >> "$filepath"
+        echo "✓ Appended: $file"
+        ;;
+
     read)
         file="$1"
         if [ -z "$file" ]; then
@@ -5,10 +5,16 @@ Enables fast communication and context sharing between Claude and Gemini
 """
 
 import os
+import sys
 import json
-import subprocess
+import signal
+import socket
+import argparse
+import ipaddress
+from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+from typing import Any, Dict, List, Optional, Tuple
 import asyncio
 
 # MCP SDK imports (install with: pip install mcp)
@@ -20,13 +26,405 @@ except ImportError:
     print("Error: MCP SDK not installed. Run: pip install mcp")
     exit(1)
 
-# Configuration
-VAULT_PATH = Path("/Users/hoe/Library/Mobile Documents/iCloud~md~obsidian/Documents/rhncrs-collab")
-PROJECT_ROOT = Path("/Users/hoe/Dev/org")
+# Configuration (roots shared with the shell tools: OBSIDIAN_VAULT, PROJECT_ROOT, COLLAB_DIR)
+VAULT_PATH = Path(os.environ.get("OBSIDIAN_VAULT", "/Users/hoe/Library/Mobile Documents/iCloud~md~obsidian/Documents/rhncrs-collab"))
+PROJECT_ROOT = Path(os.environ.get("PROJECT_ROOT", "/Users/hoe/Dev/org"))
 VAULT_MANAGER = Path("/Users/hoe/Dev/workspace/tools/gemini-vault")
+COLLAB_DIR = Path(os.environ.get("COLLAB_DIR", "/Users/hoe/Dev/workspace/collab"))
+# Local server state (indexes, caches) - kept out of the iCloud vault so it never syncs
+STATE_DIR = Path(os.environ.get("RHNCRS_STATE_DIR", Path.home() / ".cache" / "rhncrs"))
+
+# Project registry (shared with populate_vault.py); repos under PROJECT_ROOT are auto-discovered
+PROJECTS_FILE = Path(os.environ.get("RHNCRS_PROJECTS_FILE", Path(__file__).resolve().parent.parent / "lib" / "projects.json"))
+
+# Daemon mode: one warm server shared by all clients (see bin/rhncrs-mcp for the stdio shim)
+SOCKET_PATH = Path(os.environ.get("RHNCRS_SOCKET", STATE_DIR / "mcp.sock"))
+
+# Metrics: RHNCRS_METRICS_FILE=*.prom (Prometheus text) or *.jsonl (snapshots), dumped periodically
+METRICS_FILE = os.environ.get("RHNCRS_METRICS_FILE")
+METRICS_INTERVAL = float(os.environ.get("RHNCRS_METRICS_INTERVAL", "15"))
+# Opt-in profiling: keep profiles of the N slowest calls (cprofile or pyinstrument)
+PROFILE_SLOWEST = int(os.environ.get("RHNCRS_PROFILE_SLOWEST", "0"))
+PROFILER = os.environ.get("RHNCRS_PROFILER", "cprofile")
+
+# Vault backend: "native" (in-process, default) or "shell" (fork VAULT_MANAGER per call)
+VAULT_BACKEND = os.environ.get("RHNCRS_VAULT_BACKEND", "native")
+VAULT_IO_WORKERS = int(os.environ.get("RHNCRS_VAULT_IO_WORKERS", "8"))
+# Writes to the same note that arrive while one is in flight are folded into one atomic write;
+# a window > 0 also holds every write that long to gather bursts (costs latency on lone writes)
+WRITE_COALESCE_MS = float(os.environ.get("RHNCRS_WRITE_COALESCE_MS", "0"))
+# Seconds between full mtime reconciliations of the in-memory vault index
+VAULT_RECONCILE_INTERVAL = float(os.environ.get("RHNCRS_VAULT_RECONCILE_INTERVAL", "300"))
+# File reads: bytes returned per call (callers may ask for up to the limit) and TextContent chunk size
+READ_MAX_BYTES = int(os.environ.get("RHNCRS_READ_MAX_BYTES", str(256 * 1024)))
+READ_MAX_BYTES_LIMIT = int(os.environ.get("RHNCRS_READ_MAX_BYTES_LIMIT", str(4 * 1024 * 1024)))
+READ_CHUNK_CHARS = int(os.environ.get("RHNCRS_READ_CHUNK_CHARS", str(64 * 1024)))
+# LRU cache of file contents for vault/project reads (total MB, per-file KB; 0 MB = etags only)
+READ_CACHE_MB = float(os.environ.get("RHNCRS_READ_CACHE_MB", "64"))
+READ_CACHE_ENTRY_KB = int(os.environ.get("RHNCRS_READ_CACHE_ENTRY_KB", "1024"))
+# Context files packed into task handoffs: token budget, and how long "already sent" lasts per worker
+CONTEXT_BUDGET = int(os.environ.get("RHNCRS_CONTEXT_BUDGET", "8000"))
+CONTEXT_SEEN_TTL = float(os.environ.get("RHNCRS_CONTEXT_SEEN_TTL", str(6 * 3600)))
+# Files per page in rhncrs://projects/<id> (override with ?per_page=N)
+PROJECT_PAGE_SIZE = int(os.environ.get("RHNCRS_PROJECT_PAGE_SIZE", "200"))
+# Encrypted .env files, and the secrets-broker socket that holds recently unlocked ones in memory
+SECRETS_DIR = VAULT_PATH / "9_System" / "Secrets"
+SECRETS_SOCKET = Path(os.environ.get("RHNCRS_SECRETS_SOCKET", STATE_DIR / "secrets" / "broker.sock"))
+
+# Shared libraries live in lib/ next to bin/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "lib"))
+from rhncrs.vault_io import VaultIO, VaultError
+from rhncrs.vault_index import VaultIndex
+from rhncrs.vault_batch import MAX_OPS, op_paths, run_batch
+from rhncrs.vault_edit import MODES as WRITE_MODES, make_edit
+from rhncrs.vault_search import VaultSearch
+from rhncrs.shared_state import SharedStateLog
+from rhncrs.collab_status import CollabStatus, TransitionRejected
+from rhncrs.events import ResourceNotifier
+from rhncrs.msglog import MessageLog
+from rhncrs.thread import ThreadLog
+from rhncrs.context_pack import SeenCache
+from rhncrs.taskq import DEFAULT_LEASE, PRIORITIES, TaskError, TaskQueue
+from rhncrs.read_cache import ReadCache
+from rhncrs.ranged_read import describe_window, read_window, resolve_under, split_chunks
+from rhncrs.project_scan import ProjectScanner, readme_summary
+from rhncrs.metrics import Metrics
+from rhncrs.projects import ProjectRegistry
+from rhncrs.watch import PeriodicTask
+from rhncrs.secrets_broker import BrokerClient, BrokerUnavailable
+from rhncrs.vault_secrets import projects as secret_projects
 
 # Initialize MCP Server
 server = Server("rhncrs-ecosystem")
+vault = VaultIO(VAULT_PATH, max_workers=VAULT_IO_WORKERS, coalesce_window=WRITE_COALESCE_MS / 1000)
+vault_index = VaultIndex(VAULT_PATH, reconcile_interval=VAULT_RECONCILE_INTERVAL)
+vault_search = VaultSearch(STATE_DIR / "vault-search.db", VAULT_PATH)
+shared_state = SharedStateLog(VAULT_PATH / "90_Admin")
+collab_status = CollabStatus(COLLAB_DIR / "status.json")
+message_log = MessageLog(COLLAB_DIR / "message-log.jsonl")
+collab_thread = ThreadLog(COLLAB_DIR / "dialogues" / "active_thread.md")
+task_queue = TaskQueue(COLLAB_DIR / "tasks.sqlite", COLLAB_DIR / "handoffs", CONTEXT_BUDGET,
+                       SeenCache(STATE_DIR / "context-seen.sqlite", CONTEXT_SEEN_TTL))
+project_scans = ProjectScanner(PROJECT_ROOT)
+project_registry = ProjectRegistry(PROJECTS_FILE, PROJECT_ROOT)
+read_cache = ReadCache(int(READ_CACHE_MB * 1024 * 1024), READ_CACHE_ENTRY_KB * 1024)
+metrics = Metrics()
+metrics.add_source("read_cache", read_cache.stats)
+metrics.add_source("vault_writes", lambda: dict(vault.write_stats))
+for counter in ("subprocess_spawns", "vault_shell_fallbacks"):
+    metrics.count(counter, 0)
+if PROFILE_SLOWEST > 0:
+    metrics.enable_profiling(STATE_DIR / "profiles", PROFILE_SLOWEST, PROFILER)
+notifier = ResourceNotifier()
+
+# Vault paths touched by each mutating operation (index is refreshed right after)
+MUTATING_OPS = {
+    "write": lambda args: [args[0]],
+    "edit": lambda args: [args[0]],
+    "mkdir": lambda args: [args[0]],
+    "rm": lambda args: [args[0]],
+    "mv": lambda args: [args[0], args[1]],
+}
+
+#  ═══════════════════════════════════════════════════════════
+#  VAULT BACKEND - Native async I/O with shell manager fallback
+#  ═══════════════════════════════════════════════════════════
+
+async def run_vault_manager(*args: str, stdin: Optional[str] = None) -> str:
+    """Run the shell vault manager without blocking the event loop"""
+    metrics.count("subprocess_spawns")
+    with metrics.timer("subprocess", f"gemini-vault {args[0] if args else ''}".strip()):
+        proc = await asyncio.create_subprocess_exec(
+            str(VAULT_MANAGER), *args,
+            stdin=asyncio.subprocess.PIPE if stdin is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stdout, _ = await proc.communicate(stdin.encode("utf-8") if stdin is not None else None)
+    return stdout.decode("utf-8", errors="replace")
+
+async def shell_write(rel: str, content: Any) -> str:
+    """Shell-backend write; content goes through stdin (`write <file> -`), never argv"""
+    if not callable(content):
+        return await run_vault_manager("write", rel, "-", stdin=content)
+    # Edit modes: read, transform here, write the result back
+    exists = (await run_vault_manager("exists", rel)).startswith("✓")
+    current = await run_vault_manager("read", rel) if exists else None
+    try:
+        text, message = content(current)
+    except VaultError as e:
+        return str(e)
+    result = await run_vault_manager("write", rel, "-", stdin=text)
+    return message if result.startswith("✓") else result
+
+async def vault_op(op: str, *args: Any) -> str:
+    """Dispatch a vault operation to the native engine, falling back to the shell manager"""
+    result = None
+    if VAULT_BACKEND != "shell":
+        try:
+            with metrics.timer("vault_op", op):
+                result = await getattr(vault, op)(*args)
+        except VaultError as e:
+            return str(e)
+        except OSError:
+            # e.g. iCloud placeholder or permission issue - let the shell manager try
+            metrics.count("vault_shell_fallbacks")
+    if result is None:
+        if op in ("write", "edit"):
+            result = await shell_write(*args)
+        else:
+            result = await run_vault_manager(op, *(str(a) for a in args))
+    if op in MUTATING_OPS and vault_index.ready:
+        for path in MUTATING_OPS[op](args):
+            vault_index.update_path(path)
+    return result
+
+WRITE_MODE_SCHEMA = {
+    "mode": {"type": "string", "enum": list(WRITE_MODES), "description": "overwrite (default), append, patch or section"},
+    "heading": {"type": "string", "description": "section mode: heading to replace, e.g. '## Status'"},
+    "field": {"type": "string", "description": "section mode: frontmatter field to set instead of a heading"}
+}
+
+async def write_with_mode(path: str, content: str, arguments: Dict[str, Any]) -> str:
+    mode = arguments.get("mode") or "overwrite"
+    if mode == "overwrite":
+        return await vault_op("write", path, content)
+    try:
+        edit = make_edit(path, mode, content, arguments.get("heading"), arguments.get("field"))
+    except VaultError as e:
+        return str(e)
+    return await vault_op("edit", path, edit)
+
+# Tool arguments that select part of a file rather than the whole thing
+READ_RANGE_ARGS = ("offset", "length", "start_line", "end_line", "cursor")
+
+READ_RANGE_SCHEMA = {
+    "offset": {"type": "number", "description": "Byte offset to start at (default: 0)"},
+    "length": {"type": "number", "description": "Number of bytes to read"},
+    "start_line": {"type": "number", "description": "First line to read (1-based, instead of offset)"},
+    "end_line": {"type": "number", "description": "Last line to read (inclusive)"},
+    "max_bytes": {"type": "number", "description": f"Maximum bytes returned (default: {READ_MAX_BYTES})"},
+    "cursor": {"type": "string", "description": "Continuation cursor from a truncated read"},
+    "encoding": {"type": "string", "enum": ["text", "base64"], "description": "base64 to fetch binary bytes"},
+    "if_none_match": {"type": "string", "description": "etag from an earlier read; unchanged files return 'not modified'"}
+}
+
+def optional_int(value: Any) -> Optional[int]:
+    return None if value is None else int(value)
+
+def load_window(resolve, rel: str, arguments: Dict[str, Any],
+                missing: str = "Error: File does not exist: {}") -> Dict[str, Any]:
+    """Blocking ranged read of `rel` as selected by the READ_RANGE_SCHEMA arguments"""
+    path = resolve(rel)
+    if not path.is_file():
+        raise VaultError(missing.format(rel))
+    st, data, etag = read_cache.load(path)
+    if etag == str(arguments.get("if_none_match") or "").strip('"'):
+        read_cache.note_not_modified()
+        return {"not_modified": True, "etag": etag, "size": st.st_size}
+    window = read_window(
+        path,
+        offset=optional_int(arguments.get("offset")),
+        length=optional_int(arguments.get("length")),
+        start_line=optional_int(arguments.get("start_line")),
+        end_line=optional_int(arguments.get("end_line")),
+        max_bytes=min(int(arguments.get("max_bytes") or READ_MAX_BYTES), READ_MAX_BYTES_LIMIT),
+        cursor=arguments.get("cursor"),
+        encoding=arguments.get("encoding") or "text",
+        cached=(st, data)
+    )
+    window["etag"] = etag
+    return window
+
+async def read_file_window(resolve, rel: str, arguments: Dict[str, Any],
+                           missing: str = "Error: File does not exist: {}") -> List[types.TextContent]:
+    """Bounded read: the text (chunked if large) plus a footer with the etag and any continuation cursor"""
+    loop = asyncio.get_running_loop()
+    try:
+        window = await loop.run_in_executor(None, load_window, resolve, rel, arguments, missing)
+    except (VaultError, ValueError) as e:
+        return [types.TextContent(type="text", text=str(e))]
+    except OSError as e:
+        return [types.TextContent(type="text", text=f"Error: {e.strerror or e}: {rel}")]
+
+    if window.get("not_modified"):
+        return [types.TextContent(type="text", text=f"[{rel}: not modified, etag={window['etag']}]")]
+    footer = types.TextContent(type="text", text=describe_window(rel, window))
+    if window.get("base64") is not None:
+        return [types.TextContent(type="text", text=window["base64"]), footer]
+    if window["text"] is None:
+        return [footer]
+    contents = [types.TextContent(type="text", text=chunk)
+                for chunk in split_chunks(window["text"], READ_CHUNK_CHARS)]
+    contents.append(footer)
+    return contents
+
+async def batch_op(op: Dict[str, Any]) -> Tuple[bool, Any]:
+    """One vault_batch operation -> (ok, result); mutations go through vault_op so the index follows"""
+    kind, path = op["op"], op.get("path") or "."
+    if kind == "read":
+        loop = asyncio.get_running_loop()
+        with metrics.timer("vault_op", "read"):
+            window = await loop.run_in_executor(None, load_window, vault.resolve, path, op)
+        return True, window
+    if kind == "exists":
+        with metrics.timer("vault_op", "exists"):
+            found, _ = await vault.exists(path)
+        return True, found
+    if kind == "write":
+        result = await write_with_mode(path, op["content"], op)
+    elif kind == "mv":
+        result = await vault_op("mv", path, op["dest"])
+    else:
+        result = await vault_op(kind, path)
+    return not result.startswith(("Error", "✗")), result
+
+async def run_vault_batch(ops: Any, atomic: bool) -> Dict[str, Any]:
+    start = asyncio.get_running_loop().time()
+    try:
+        result = await run_batch(vault, ops, batch_op, atomic=atomic, limit=VAULT_IO_WORKERS)
+    except VaultError as e:
+        return {"ok": False, "error": str(e)}
+    if atomic and vault_index.ready:
+        # The transaction bypasses vault_op, so refresh the index for everything it touched
+        for op in ops:
+            if op["op"] in MUTATING_OPS:
+                for path in op_paths(op):
+                    vault_index.update_path(path)
+    result["elapsed_ms"] = round((asyncio.get_running_loop().time() - start) * 1000, 3)
+    return result
+
+def project_path(project: str, rel: str) -> Path:
+    """Resolve a file inside PROJECT_ROOT/<project>, refusing escapes from either"""
+    if not project or "/" in project or project in (".", ".."):
+        raise VaultError(f"Error: Invalid project: {project}")
+    entry = project_registry.get(project)
+    return resolve_under(Path(entry["path"]) if entry else PROJECT_ROOT / project, rel)
+
+def describe_project(project_id: str, project_dir: Path, params: Dict[str, str]) -> Dict[str, Any]:
+    """Paginated file listing from the scan cache plus a README summary"""
+    try:
+        page = int(params.get("page", 1))
+        per_page = max(1, min(int(params.get("per_page", PROJECT_PAGE_SIZE)), 1000))
+    except ValueError:
+        raise VaultError("Error: page and per_page must be integers")
+    scan = project_scans.get(project_id, project_dir)
+    listing = scan.page(params.get("glob", "*.md"), page, per_page)
+    info = {"id": project_id, "path": str(project_dir), "exists": True}
+    info.update(listing)
+
+    readme_path = project_dir / "README.md"
+    if readme_path.is_file():
+        if params.get("readme") == "full":
+            window = read_window(readme_path, max_bytes=READ_MAX_BYTES)
+            info["readme"] = window["text"]
+            info["readme_truncated"] = window["truncated"]
+        else:
+            head = read_window(readme_path, max_bytes=64 * 1024)
+            info["readme"] = readme_summary(head["text"] or "")
+            info["readme"]["size"] = head["size"]
+            info["readme"]["full_uri"] = f"rhncrs://projects/{project_id}?readme=full"
+    return info
+
+def tool_result_size(result: List[types.TextContent]) -> Tuple[int, bool]:
+    """(bytes returned, looks like an error) for metrics"""
+    texts = [getattr(c, "text", "") or "" for c in result]
+    error = bool(texts) and texts[0].startswith(("Error", "Unknown tool", "✗"))
+    return sum(len(t.encode("utf-8")) for t in texts), error
+
+def resource_result_size(result: str) -> Tuple[int, bool]:
+    return len(result.encode("utf-8")), result.startswith('{"error"')
+
+_project_resources: Tuple[int, List[types.Resource]] = (-1, [])
+
+def project_resources() -> List[types.Resource]:
+    """One resource per registered/discovered project, rebuilt only when the registry reloads"""
+    global _project_resources
+    projects = project_registry.projects()
+    if _project_resources[0] != project_registry.version:
+        _project_resources = (project_registry.version, [
+            types.Resource(
+                uri=f"rhncrs://projects/{p['id']}",
+                name=f"{p['name']} Project",
+                mimeType="application/json",
+                description=p["description"] or f"{p['name']} project information and structure"
+            )
+            for p in projects.values()
+        ])
+    return _project_resources[1]
+
+async def vault_index_ready() -> bool:
+    """Wait (off the event loop) for the startup index build to finish"""
+    if vault_index.ready:
+        return True
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, vault_index.wait_ready, 30)
+
+def refresh_vault_search() -> None:
+    """Re-read only the notes whose size/mtime changed since the last refresh"""
+    vault_index.wait_ready()
+    # Read the version before snapshotting: a change in between just costs one more refresh
+    version = vault_index.version
+    if version == vault_search.indexed_version:
+        return  # skip copying the whole index when nothing changed
+    vault_search.refresh(vault_index.snapshot(), version)
+
+async def search_vault(query: str, limit: int, offset: int) -> Dict[str, Any]:
+    return await query_vault_index(vault_search.search, query, limit, offset)
+
+async def query_vault_index(query, *args: Any) -> Dict[str, Any]:
+    """Run a VaultSearch query (search or link graph) against a freshly refreshed index"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, refresh_vault_search)
+    return await loop.run_in_executor(None, query, *args)
+
+async def run_task_op(fn, *args: Any) -> Dict[str, Any]:
+    """Run a task queue operation off the event loop; lost races come back as ok=False"""
+    loop = asyncio.get_running_loop()
+    try:
+        task = await loop.run_in_executor(None, fn, *args)
+    except TaskError as e:
+        return {"ok": False, "reason": str(e), "task": e.task}
+    except ValueError as e:
+        return {"ok": False, "reason": str(e)}
+    notifier.notify_threadsafe("rhncrs://collab/tasks")
+    return {"ok": True, "task": task}
+
+def secrets_overview() -> Dict[str, Any]:
+    """Projects with encrypted secrets and whether the broker has them unlocked (never values)"""
+    client = BrokerClient(SECRETS_SOCKET, timeout=2)
+    try:
+        cached = {e["project"]: e for e in client.request("list")["cached"]}
+        broker = True
+    except BrokerUnavailable:
+        cached, broker = {}, False
+    finally:
+        client.close()
+    entries = []
+    for project in secret_projects(SECRETS_DIR):
+        enc = SECRETS_DIR / f"{project}.env.enc"
+        entries.append({
+            "project": project,
+            "modified": datetime.fromtimestamp(enc.stat().st_mtime).isoformat(timespec="seconds"),
+            "password_copy": (SECRETS_DIR / f"{project}.env.password.enc").exists(),
+            "unlocked_for": cached[project]["expires_in"] if project in cached else None,
+        })
+    return {"broker_running": broker, "count": len(entries), "secrets": entries}
+
+def secret_keys(project: str, decrypt: bool) -> Dict[str, Any]:
+    """Variable names of a project's .env, served by secrets-broker (values never leave it)"""
+    client = BrokerClient(SECRETS_SOCKET)
+    try:
+        reply = client.request("keys", project=project, decrypt=decrypt)
+    except BrokerUnavailable:
+        return {"ok": False, "reason": "secrets-broker is not running (start it with: secrets-broker start)"}
+    finally:
+        client.close()
+    if reply.get("miss"):
+        return {"ok": False, "reason": f"{project} is not unlocked; run decrypt-env {project} or pass decrypt=true"}
+    if not reply.get("ok"):
+        return {"ok": False, "reason": reply.get("error")}
+    return reply
 
 #  ═══════════════════════════════════════════════════════════
 #  RESOURCES - Shared context between Claude and Gemini
@@ -54,144 +452,135 @@ async def list_resources() -> List[types.Resource]:
             mimeType="application/json",
             description="List of all RHINOCEROS projects with metadata"
         ),
+        *project_resources(),
         types.Resource(
-            uri="rhncrs://projects/rhinoceros-music",
-            name="Rhinoceros Music Project",
+            uri="rhncrs://shared-state",
+            name="Shared State",
             mimeType="application/json",
-            description="Rhinoceros Music project information and structure"
+            description="Shared context and state between Claude and Gemini"
         ),
         types.Resource(
-            uri="rhncrs://projects/rhinocrash",
-            name="RhinoCrash Project",
+            uri="rhncrs://metrics",
+            name="Server Metrics",
             mimeType="application/json",
-            description="RhinoCrash development tools project"
+            description="Per-tool/resource latency (p50/p95/p99), calls, errors, bytes; ?format=prometheus"
         ),
         types.Resource(
-            uri="rhncrs://projects/rhncrsv1",
-            name="RHNCRS V1 Platform",
+            uri="rhncrs://collab/status",
+            name="Collaboration Status",
             mimeType="application/json",
-            description="Legacy platform project"
+            description="Current collaboration state (IDLE / CLAUDE_WORKING / GEMINI_WORKING / ERROR)"
         ),
         types.Resource(
-            uri="rhncrs://projects/infrastructure",
-            name="Infrastructure Core",
-            mimeType="application/json",
-            description="Server infrastructure project"
+            uri="rhncrs://collab/thread",
+            name="Active Thread",
+            mimeType="text/markdown",
+            description="Rolling summary + last N thread messages (?last=20&before=SEQ&summary=0)"
         ),
         types.Resource(
-            uri="rhncrs://projects/infrastructure-swarm",
-            name="Infrastructure Swarm",
+            uri="rhncrs://collab/tasks",
+            name="Delegated Tasks",
             mimeType="application/json",
-            description="Docker Swarm UI project"
+            description="Open delegations (pending / in progress) by priority, with per-status counts"
         ),
         types.Resource(
-            uri="rhncrs://shared-state",
-            name="Shared State",
+            uri="rhncrs://secrets",
+            name="Encrypted Secrets",
             mimeType="application/json",
-            description="Shared context and state between Claude and Gemini"
+            description="Projects with encrypted .env files and which are unlocked in secrets-broker (no values)"
         ),
     ]
 
 @server.read_resource()
+@metrics.instrument("resource", lambda uri: str(uri).split("?", 1)[0], resource_result_size)
 async def read_resource(uri: str) -> str:
     """Read resource content"""
+    uri = str(uri)  # the SDK passes a pydantic AnyUrl
 
     if uri == "rhncrs://vault/structure":
-        result = subprocess.run(
-            [str(VAULT_MANAGER), "structure"],
-            capture_output=True,
-            text=True
-        )
-        return result.stdout
+        if await vault_index_ready():
+            return vault_index.structure()
+        return await run_vault_manager("structure")
 
     elif uri == "rhncrs://vault/stats":
-        result = subprocess.run(
-            [str(VAULT_MANAGER), "stats"],
-            capture_output=True,
-            text=True
-        )
-        return result.stdout
+        if await vault_index_ready():
+            return vault_index.stats()
+        return await run_vault_manager("stats")
 
     elif uri == "rhncrs://projects/list":
-        projects = {
-            "projects": [
-                {
-                    "id": "rhinoceros-music",
-                    "name": "Rhinoceros Music",
-                    "path": str(PROJECT_ROOT / "rhinoceros-music"),
-                    "vault_path": "10_Projects/11_Rhinoceros_Music",
-                    "description": "Creative hub, hardware, production"
-                },
-                {
-                    "id": "rhinocrash",
-                    "name": "RhinoCrash",
-                    "path": str(PROJECT_ROOT / "rhinocrash"),
-                    "vault_path": "10_Projects/12_Rhinocrash",
-                    "description": "Development tools, RhinoChat agents"
-                },
-                {
-                    "id": "rhncrsv1",
-                    "name": "RHNCRS V1",
-                    "path": str(PROJECT_ROOT / "rhncrsv1"),
-                    "vault_path": "10_Projects/13_Rhncrs_V1",
-                    "description": "Platform infrastructure, streaming"
-                },
-                {
-                    "id": "infrastructure",
-                    "name": "Infrastructure",
-                    "path": str(PROJECT_ROOT / "infrastructure"),
-                    "vault_path": "10_Projects/14_Infrastructure",
-                    "description": "Server management"
-                },
-                {
-                    "id": "infrastructure-swarm",
-                    "name": "Infrastructure Swarm",
-                    "path": str(PROJECT_ROOT / "infrastructure-swarm"),
-                    "vault_path": "10_Projects/15_Infra_Swarm",
-                    "description": "Web UI for infrastructure"
-                },
-            ]
-        }
-        return json.dumps(projects, indent=2)
+        return project_registry.list_json()
 
     elif uri.startswith("rhncrs://projects/"):
-        project_id = uri.split("/")[-1]
-        project_path = PROJECT_ROOT / project_id
-
-        if not project_path.exists():
+        # rhncrs://projects/<id>[?page=N&per_page=N&glob=*.md&readme=full]
+        parts = urlsplit(uri)
+        project_id = parts.path.rstrip("/").split("/")[-1]
+        params = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        try:
+            project_dir = project_path(project_id, ".")
+        except VaultError as e:
+            return json.dumps({"error": str(e)})
+        if not project_dir.is_dir():
             return json.dumps({"error": f"Project not found: {project_id}"})
+        loop = asyncio.get_running_loop()
+        try:
+            info = await loop.run_in_executor(None, describe_project, project_id, project_dir, params)
+        except VaultError as e:
+            return json.dumps({"error": str(e)})
+        return json.dumps(info, indent=2)
 
-        # Gather project information
-        info = {
-            "id": project_id,
-            "path": str(project_path),
-            "exists": True,
-            "files": []
-        }
+    elif uri == "rhncrs://shared-state":
+        # Latest entries of the shared-state log (use shared_state_read for deltas)
+        loop = asyncio.get_running_loop()
+        state = await loop.run_in_executor(None, shared_state.read, None, 50)
+        return json.dumps(state, indent=2)
 
-        # List key files
-        for item in project_path.rglob("*.md"):
-            if not any(part.startswith(".") for part in item.parts):
-                info["files"].append(str(item.relative_to(project_path)))
+    elif uri == "rhncrs://collab/status":
+        return json.dumps(collab_status.read(), indent=2)
 
-        # Read README if exists
-        readme_path = project_path / "README.md"
-        if readme_path.exists():
-            info["readme"] = readme_path.read_text()
+    elif uri.split("?", 1)[0] == "rhncrs://collab/thread":
+        # Reads the index + tail offsets only, so the cost doesn't grow with the thread
+        params = {k: v[-1] for k, v in parse_qs(urlsplit(uri).query).items()}
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                None, collab_thread.render_tail,
+                int(params.get("last", 20)),
+                optional_int(params.get("before")),
+                params.get("summary", "1") not in ("0", "false")
+            )
+        except ValueError as e:
+            return json.dumps({"error": str(e)})
 
-        return json.dumps(info, indent=2)
+    elif uri == "rhncrs://collab/tasks":
+        loop = asyncio.get_running_loop()
+        tasks = await loop.run_in_executor(None, task_queue.list, "pending,in_progress", None, 200)
+        return json.dumps(tasks, indent=2, ensure_ascii=False)
 
-    elif uri == "rhncrs://shared-state":
-        # Read shared state file (for coordination between agents)
-        state_file = VAULT_PATH / "90_Admin" / "shared-state.json"
-        if state_file.exists():
-            return state_file.read_text()
-        else:
-            return json.dumps({"initialized": False, "messages": []})
+    elif uri == "rhncrs://secrets":
+        loop = asyncio.get_running_loop()
+        return json.dumps(await loop.run_in_executor(None, secrets_overview), indent=2)
+
+    elif uri.split("?", 1)[0] == "rhncrs://metrics":
+        if "format=prometheus" in uri:
+            return metrics.prometheus()
+        return json.dumps(metrics.snapshot(), indent=2)
 
     else:
         return json.dumps({"error": f"Unknown resource: {uri}"})
 
+#  ═══════════════════════════════════════════════════════════
+#  SUBSCRIPTIONS - Push updates instead of polling status.json
+#  ═══════════════════════════════════════════════════════════
+
+@server.subscribe_resource()
+async def subscribe_resource(uri) -> None:
+    """Notify this session whenever the resource changes"""
+    notifier.subscribe(str(uri), server.request_context.session)
+
+@server.unsubscribe_resource()
+async def unsubscribe_resource(uri) -> None:
+    notifier.unsubscribe(str(uri), server.request_context.session)
+
 #  ═══════════════════════════════════════════════════════════
 #  TOOLS - Operations available to both Claude and Gemini
 #  ═══════════════════════════════════════════════════════════
@@ -202,27 +591,70 @@ async def list_tools() -> List[types.Tool]:
     return [
         types.Tool(
             name="vault_write",
-            description="Write content to a file in the Obsidian vault",
+            description=(
+                "Write content to a file in the Obsidian vault. Besides overwriting, it can append, "
+                "apply a unified diff, or replace one section (by heading or frontmatter field) "
+                "so small edits don't resend the whole note."
+            ),
             inputSchema={
                 "type": "object",
                 "properties": {
                     "path": {"type": "string", "description": "Relative path within vault"},
-                    "content": {"type": "string", "description": "File content to write"}
+                    "content": {
+                        "type": "string",
+                        "description": "File content; text to append; unified diff (patch); new section body or field value (section)"
+                    },
+                    **WRITE_MODE_SCHEMA
                 },
                 "required": ["path", "content"]
             }
         ),
         types.Tool(
             name="vault_read",
-            description="Read content from a file in the Obsidian vault",
+            description=(
+                "Read content from a file in the Obsidian vault. Large files are returned in "
+                "bounded windows; pass the cursor from the footer to continue."
+            ),
             inputSchema={
                 "type": "object",
                 "properties": {
-                    "path": {"type": "string", "description": "Relative path within vault"}
+                    "path": {"type": "string", "description": "Relative path within vault"},
+                    **READ_RANGE_SCHEMA
                 },
                 "required": ["path"]
             }
         ),
+        types.Tool(
+            name="vault_batch",
+            description=(
+                "Run an ordered list of vault operations in one call. Independent operations run "
+                "concurrently; ones touching the same path keep their order. With atomic=true all "
+                "writes/mkdir/mv/rm are staged and applied together, or not at all."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "ops": {
+                        "type": "array",
+                        "maxItems": MAX_OPS,
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "op": {"type": "string", "enum": ["read", "write", "list", "exists", "mkdir", "mv", "rm"]},
+                                "path": {"type": "string", "description": "Relative path within vault"},
+                                "content": {"type": "string", "description": "File content (write)"},
+                                "dest": {"type": "string", "description": "Destination path (mv)"},
+                                **WRITE_MODE_SCHEMA,
+                                **READ_RANGE_SCHEMA
+                            },
+                            "required": ["op"]
+                        }
+                    },
+                    "atomic": {"type": "boolean", "description": "Apply all mutations or none (default: false)"}
+                },
+                "required": ["ops"]
+            }
+        ),
         types.Tool(
             name="vault_list",
             description="List files in a vault directory",
@@ -244,127 +676,447 @@ async def list_tools() -> List[types.Tool]:
                 }
             }
         ),
+        types.Tool(
+            name="vault_search",
+            description=(
+                "Ranked full-text search over vault notes, frontmatter and wikilinks. "
+                "Filters: tag:#project/infra-core type:architecture project:x status:active path:1_Projects/"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "Search terms and/or field filters"},
+                    "limit": {"type": "number", "description": "Results per page (default: 20, max: 100)"},
+                    "offset": {"type": "number", "description": "Result offset for pagination (default: 0)"}
+                },
+                "required": ["query"]
+            }
+        ),
+        types.Tool(
+            name="vault_backlinks",
+            description="Notes that link to a note ([[wikilinks]], resolved like Obsidian)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "path": {"type": "string", "description": "Note path (00_Atlas/Home.md) or link name (Home)"},
+                    "limit": {"type": "number", "description": "Results per page (default: 100)"},
+                    "offset": {"type": "number", "description": "Result offset for pagination (default: 0)"}
+                },
+                "required": ["path"]
+            }
+        ),
+        types.Tool(
+            name="vault_outlinks",
+            description="Notes a note links to, plus link targets that don't resolve to any note",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "path": {"type": "string", "description": "Note path or link name"}
+                },
+                "required": ["path"]
+            }
+        ),
+        types.Tool(
+            name="vault_orphans",
+            description="Notes with no incoming links (optionally also no outgoing links)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "path": {"type": "string", "description": "Only notes under this path prefix"},
+                    "no_outlinks": {"type": "boolean", "description": "Also require no outgoing links (default: false)"},
+                    "limit": {"type": "number", "description": "Results per page (default: 100)"},
+                    "offset": {"type": "number", "description": "Result offset for pagination (default: 0)"}
+                }
+            }
+        ),
+        types.Tool(
+            name="vault_neighborhood",
+            description="Notes within N link hops of a note, with the links between them",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "path": {"type": "string", "description": "Note path or link name"},
+                    "depth": {"type": "number", "description": "Hops to follow (default: 1, max: 3)"},
+                    "direction": {"type": "string", "enum": ["both", "out", "in"], "description": "Links to follow (default: both)"},
+                    "limit": {"type": "number", "description": "Maximum notes returned (default: 200)"}
+                },
+                "required": ["path"]
+            }
+        ),
+        types.Tool(
+            name="collab_status_transition",
+            description=(
+                "Atomically move the collaboration state machine (compare-and-set). "
+                "Fails without changing anything if the current state/version doesn't match."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "state": {
+                        "type": "string",
+                        "enum": ["IDLE", "CLAUDE_WORKING", "GEMINI_WORKING", "AWAITING_USER", "ERROR"],
+                        "description": "New state"
+                    },
+                    "expect": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Allowed current states (default: any)"
+                    },
+                    "expect_version": {"type": "number", "description": "Required current status version"},
+                    "current_task": {"type": "string", "description": "Task description"},
+                    "context": {"type": "string", "description": "Context file path"}
+                },
+                "required": ["state"]
+            }
+        ),
+        types.Tool(
+            name="task_enqueue",
+            description="Delegate a task to another agent; returns its id and rendered handoff file",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "description": {"type": "string", "description": "What needs to be done"},
+                    "assigned_to": {"type": "string", "description": "Agent that should do it (default: claude)"},
+                    "from": {"type": "string", "description": "Delegating agent (default: gemini)"},
+                    "priority": {"type": "string", "enum": list(PRIORITIES), "description": "Default: normal"},
+                    "reason": {"type": "string", "description": "Why it is being delegated"},
+                    "context_files": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Files packed into the handoff (chunked, deduplicated, ranked by relevance)"
+                    },
+                    "context_budget": {"type": "number", "description": f"Token budget for context files (default: {CONTEXT_BUDGET})"}
+                },
+                "required": ["description"]
+            }
+        ),
+        types.Tool(
+            name="task_claim",
+            description=(
+                "Atomically lease the next task for an agent (highest priority, oldest first), "
+                "or a specific task. Re-claiming a task you hold renews its lease."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "agent": {"type": "string", "description": "Claiming agent (e.g., 'claude')"},
+                    "task_id": {"type": "string", "description": "Claim (or renew) this task instead of the next one"},
+                    "lease_seconds": {"type": "number", "description": f"Lease length (default: {DEFAULT_LEASE})"},
+                    "queue": {"type": "string", "description": "Assignee queue to claim from (default: agent)"}
+                },
+                "required": ["agent"]
+            }
+        ),
+        types.Tool(
+            name="task_complete",
+            description=(
+                "Finish a task (completed / blocked / failed) or release it back to pending. "
+                "Rejected if another agent holds a live lease, expect_version doesn't match, "
+                "or the task is already final (set reopen to change it)."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "task_id": {"type": "string", "description": "Task ID"},
+                    "agent": {"type": "string", "description": "Agent finishing the task"},
+                    "status": {
+                        "type": "string",
+                        "enum": ["completed", "blocked", "failed", "pending"],
+                        "description": "Final status (default: completed; pending releases the lease)"
+                    },
+                    "result": {"type": "string", "description": "Result summary, shown in the handoff"},
+                    "expect_version": {"type": "number", "description": "Required current task version"},
+                    "reopen": {"type": "boolean", "description": "Allow changing a completed/blocked/failed task"}
+                },
+                "required": ["task_id", "agent"]
+            }
+        ),
+        types.Tool(
+            name="task_list",
+            description="List delegated tasks by priority then age, with per-status counts",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "status": {
+                        "type": "array",
+                        "items": {"type": "string", "enum": ["pending", "in_progress", "completed", "blocked", "failed"]},
+                        "description": "Statuses to include (default: all)"
+                    },
+                    "assigned_to": {"type": "string", "description": "Only tasks for this agent"},
+                    "task_id": {"type": "string", "description": "Return this one task with its events"},
+                    "limit": {"type": "number", "description": "Tasks per page (default: 50)"},
+                    "offset": {"type": "number", "description": "Result offset for pagination (default: 0)"}
+                }
+            }
+        ),
         types.Tool(
             name="project_read_file",
-            description="Read a file from one of the project repositories",
+            description=(
+                "Read a file from one of the project repositories. Supports byte/line ranges; "
+                "binaries are reported, not dumped."
+            ),
             inputSchema={
                 "type": "object",
                 "properties": {
                     "project": {"type": "string", "description": "Project ID (e.g., 'rhinoceros-music')"},
-                    "path": {"type": "string", "description": "Relative path within project"}
+                    "path": {"type": "string", "description": "Relative path within project"},
+                    **READ_RANGE_SCHEMA
                 },
                 "required": ["project", "path"]
             }
         ),
         types.Tool(
             name="shared_state_update",
-            description="Update shared state for coordination between agents",
+            description="Append a message to the shared state log for coordination between agents",
             inputSchema={
                 "type": "object",
                 "properties": {
                     "message": {"type": "string", "description": "Message to add to shared state"},
-                    "data": {"type": "object", "description": "Additional data to store"}
+                    "data": {"type": "object", "description": "Additional data to store"},
+                    "from": {"type": "string", "description": "Sending agent (e.g., 'claude', 'gemini')"}
                 },
                 "required": ["message"]
             }
         ),
         types.Tool(
             name="shared_state_read",
-            description="Read current shared state",
+            description="Read shared state messages; pass since_seq to fetch only new entries",
             inputSchema={
                 "type": "object",
-                "properties": {}
+                "properties": {
+                    "since_seq": {"type": "number", "description": "Return entries after this sequence number"},
+                    "limit": {"type": "number", "description": "Maximum entries to return (default: 50)"}
+                }
+            }
+        ),
+        types.Tool(
+            name="message_log_query",
+            description=(
+                "Query the agent message log by time range and participants, e.g. "
+                "what Gemini asked in the last hour: {from: gemini, type: question, since: 1h}"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "since": {"type": "string", "description": "ISO timestamp or age (30m, 1h, 2d)"},
+                    "until": {"type": "string", "description": "ISO timestamp or age"},
+                    "from": {"type": "string", "description": "Sender (e.g., 'gemini')"},
+                    "to": {"type": "string", "description": "Recipient (e.g., 'claude')"},
+                    "type": {"type": "string", "description": "info, question, request, response"},
+                    "priority": {"type": "string", "description": "normal or high"},
+                    "contains": {"type": "string", "description": "Case-insensitive text in the message"},
+                    "limit": {"type": "number", "description": "Maximum messages (default: 50)"},
+                    "newest_first": {"type": "boolean", "description": "Newest messages first (default: false)"}
+                }
+            }
+        ),
+        types.Tool(
+            name="secrets_keys",
+            description="Variable names (never values) in a project's encrypted .env, via secrets-broker",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "project": {"type": "string", "description": "Project name (see rhncrs://secrets)"},
+                    "decrypt": {"type": "boolean", "description": "If not unlocked yet, decrypt with the SSH key (default: false)"}
+                },
+                "required": ["project"]
             }
         ),
     ]
 
 @server.call_tool()
+@metrics.instrument("tool", lambda name, arguments: name, tool_result_size)
 async def call_tool(name: str, arguments: Dict[str, Any]) -> List[types.TextContent]:
     """Execute tool calls"""
 
     if name == "vault_write":
         path = arguments["path"]
         content = arguments["content"]
-        result = subprocess.run(
-            [str(VAULT_MANAGER), "write", path, content],
-            capture_output=True,
-            text=True
-        )
-        return [types.TextContent(type="text", text=result.stdout)]
+        return [types.TextContent(type="text", text=await write_with_mode(path, content, arguments))]
 
     elif name == "vault_read":
         path = arguments["path"]
-        result = subprocess.run(
-            [str(VAULT_MANAGER), "read", path],
-            capture_output=True,
-            text=True
-        )
-        return [types.TextContent(type="text", text=result.stdout)]
+        if VAULT_BACKEND == "shell" and not any(arguments.get(k) is not None for k in READ_RANGE_ARGS + ("if_none_match",)):
+            return [types.TextContent(type="text", text=await vault_op("read", path))]
+        return await read_file_window(vault.resolve, path, arguments)
+
+    elif name == "vault_batch":
+        result = await run_vault_batch(arguments.get("ops"), bool(arguments.get("atomic")))
+        return [types.TextContent(type="text", text=json.dumps(result, indent=2))]
 
     elif name == "vault_list":
         path = arguments.get("path", ".")
-        result = subprocess.run(
-            [str(VAULT_MANAGER), "list", path],
-            capture_output=True,
-            text=True
-        )
-        return [types.TextContent(type="text", text=result.stdout)]
+        return [types.TextContent(type="text", text=await vault_op("list", path))]
 
     elif name == "vault_tree":
         path = arguments.get("path", ".")
-        depth = str(arguments.get("depth", 3))
-        result = subprocess.run(
-            [str(VAULT_MANAGER), "tree", path, depth],
-            capture_output=True,
-            text=True
-        )
-        return [types.TextContent(type="text", text=result.stdout)]
+        depth = int(arguments.get("depth", 3))
+        return [types.TextContent(type="text", text=await vault_op("tree", path, depth))]
 
-    elif name == "project_read_file":
-        project = arguments["project"]
-        path = arguments["path"]
-        file_path = PROJECT_ROOT / project / path
+    elif name == "vault_search":
+        result = await search_vault(
+            arguments["query"],
+            int(arguments.get("limit", 20)),
+            int(arguments.get("offset", 0))
+        )
+        return [types.TextContent(type="text", text=json.dumps(result, indent=2))]
 
-        if not file_path.exists():
-            return [types.TextContent(type="text", text=f"Error: File not found: {path}")]
+    elif name == "vault_backlinks":
+        result = await query_vault_index(
+            vault_search.backlinks,
+            arguments["path"],
+            int(arguments.get("limit", 100)),
+            int(arguments.get("offset", 0))
+        )
+        return [types.TextContent(type="text", text=json.dumps(result, indent=2))]
 
-        content = file_path.read_text()
-        return [types.TextContent(type="text", text=content)]
+    elif name == "vault_outlinks":
+        result = await query_vault_index(vault_search.outlinks, arguments["path"])
+        return [types.TextContent(type="text", text=json.dumps(result, indent=2))]
 
-    elif name == "shared_state_update":
-        message = arguments["message"]
-        data = arguments.get("data", {})
+    elif name == "vault_orphans":
+        result = await query_vault_index(
+            vault_search.orphans,
+            arguments.get("path", ""),
+            bool(arguments.get("no_outlinks", False)),
+            int(arguments.get("limit", 100)),
+            int(arguments.get("offset", 0))
+        )
+        return [types.TextContent(type="text", text=json.dumps(result, indent=2))]
 
-        state_file = VAULT_PATH / "90_Admin" / "shared-state.json"
+    elif name == "vault_neighborhood":
+        result = await query_vault_index(
+            vault_search.neighborhood,
+            arguments["path"],
+            int(arguments.get("depth", 1)),
+            arguments.get("direction", "both"),
+            int(arguments.get("limit", 200))
+        )
+        return [types.TextContent(type="text", text=json.dumps(result, indent=2))]
 
-        # Read current state
-        if state_file.exists():
-            state = json.loads(state_file.read_text())
+    elif name == "collab_status_transition":
+        expect_version = arguments.get("expect_version")
+        try:
+            previous, new = collab_status.transition(
+                arguments["state"],
+                expect=arguments.get("expect"),
+                expect_version=None if expect_version is None else int(expect_version),
+                current_task=arguments.get("current_task"),
+                context=arguments.get("context")
+            )
+        except TransitionRejected as e:
+            result = {"ok": False, "reason": str(e), "status": e.status}
+        except ValueError as e:
+            result = {"ok": False, "reason": str(e)}
         else:
-            state = {"initialized": True, "messages": []}
+            notifier.notify_threadsafe("rhncrs://collab/status")
+            result = {"ok": True, "previous_state": previous.get("state"), "status": new}
+        return [types.TextContent(type="text", text=json.dumps(result, indent=2))]
 
-        # Add new message
-        state["messages"].append({
-            "timestamp": str(asyncio.get_event_loop().time()),
-            "message": message,
-            "data": data
-        })
+    elif name == "task_enqueue":
+        result = await run_task_op(
+            task_queue.enqueue,
+            arguments["description"],
+            arguments.get("from", "gemini"),
+            arguments.get("assigned_to", "claude"),
+            arguments.get("priority", "normal"),
+            arguments.get("reason"),
+            arguments.get("context_files"),
+            None,
+            optional_int(arguments.get("context_budget"))
+        )
+        return [types.TextContent(type="text", text=json.dumps(result, indent=2, ensure_ascii=False))]
 
-        # Write updated state
-        state_file.parent.mkdir(parents=True, exist_ok=True)
-        state_file.write_text(json.dumps(state, indent=2))
+    elif name == "task_claim":
+        result = await run_task_op(
+            task_queue.claim,
+            arguments["agent"],
+            arguments.get("task_id"),
+            float(arguments.get("lease_seconds", DEFAULT_LEASE)),
+            arguments.get("queue")
+        )
+        if result["ok"] and result["task"] is None:
+            result = {"ok": False, "reason": f"No claimable tasks for {arguments.get('queue') or arguments['agent']}"}
+        return [types.TextContent(type="text", text=json.dumps(result, indent=2, ensure_ascii=False))]
 
-        return [types.TextContent(type="text", text=f"State updated: {message}")]
+    elif name == "task_complete":
+        expect_version = arguments.get("expect_version")
+        result = await run_task_op(
+            task_queue.complete,
+            arguments["task_id"],
+            arguments["agent"],
+            arguments.get("result"),
+            arguments.get("status", "completed"),
+            None if expect_version is None else int(expect_version),
+            bool(arguments.get("reopen", False))
+        )
+        return [types.TextContent(type="text", text=json.dumps(result, indent=2, ensure_ascii=False))]
+
+    elif name == "task_list":
+        loop = asyncio.get_running_loop()
+        if arguments.get("task_id"):
+            task = await loop.run_in_executor(None, task_queue.get, arguments["task_id"])
+            result = {"ok": True, "task": task} if task else {"ok": False, "reason": f"Unknown task: {arguments['task_id']}"}
+        else:
+            result = await loop.run_in_executor(
+                None, task_queue.list,
+                arguments.get("status"),
+                arguments.get("assigned_to"),
+                int(arguments.get("limit", 50)),
+                int(arguments.get("offset", 0))
+            )
+        return [types.TextContent(type="text", text=json.dumps(result, indent=2, ensure_ascii=False))]
+
+    elif name == "project_read_file":
+        project = arguments["project"]
+        return await read_file_window(
+            lambda rel: project_path(project, rel), arguments["path"], arguments,
+            missing="Error: File not found: {}"
+        )
+
+    elif name == "shared_state_update":
+        loop = asyncio.get_running_loop()
+        entry = await loop.run_in_executor(
+            None, shared_state.append,
+            arguments["message"], arguments.get("data", {}), arguments.get("from")
+        )
+        notifier.notify_threadsafe("rhncrs://shared-state")
+        return [types.TextContent(type="text", text=f"State updated (seq {entry['seq']}): {entry['message']}")]
 
     elif name == "shared_state_read":
-        state_file = VAULT_PATH / "90_Admin" / "shared-state.json"
+        since_seq = arguments.get("since_seq")
+        limit = int(arguments.get("limit", 50))
+        loop = asyncio.get_running_loop()
+        state = await loop.run_in_executor(
+            None, shared_state.read, None if since_seq is None else int(since_seq), limit
+        )
+        return [types.TextContent(type="text", text=json.dumps(state, indent=2))]
 
-        if state_file.exists():
-            content = state_file.read_text()
-        else:
-            content = json.dumps({"initialized": False, "messages": []})
+    elif name == "message_log_query":
+        limit = int(arguments.get("limit", 50))
+        query = lambda: list(message_log.query(
+            since=arguments.get("since"),
+            until=arguments.get("until"),
+            sender=arguments.get("from"),
+            recipient=arguments.get("to"),
+            type=arguments.get("type"),
+            priority=arguments.get("priority"),
+            contains=arguments.get("contains"),
+            limit=limit,
+            newest_first=bool(arguments.get("newest_first", False))
+        ))
+        loop = asyncio.get_running_loop()
+        messages = await loop.run_in_executor(None, query)
+        return [types.TextContent(type="text", text=json.dumps(
+            {"count": len(messages), "messages": messages}, indent=2, ensure_ascii=False
+        ))]
 
-        return [types.TextContent(type="text", text=content)]
+    elif name == "secrets_keys":
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            None, secret_keys, arguments["project"], bool(arguments.get("decrypt", False))
+        )
+        return [types.TextContent(type="text", text=json.dumps(result, indent=2))]
 
     else:
         return [types.TextContent(type="text", text=f"Unknown tool: {name}")]
@@ -373,10 +1125,199 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[types.TextCont
 #  MAIN - Run the MCP server
 #  ═══════════════════════════════════════════════════════════
 
+def initialization_options():
+    """Server options, advertising resource subscriptions"""
+    options = server.create_initialization_options()
+    resources = getattr(options.capabilities, "resources", None)
+    if resources is not None:
+        resources.subscribe = True
+    return options
+
+def start_event_sources(loop: asyncio.AbstractEventLoop) -> None:
+    """Wake subscribed agents on handoffs instead of making them poll the filesystem"""
+    notifier.attach(loop)
+    notifier.watch_file(COLLAB_DIR / "status.json", "rhncrs://collab/status")
+    notifier.watch_file(COLLAB_DIR / ".claude-notify", "rhncrs://collab/status")
+    notifier.watch_file(collab_thread.thread_path, "rhncrs://collab/thread")
+    # Tasks enqueued/claimed by the shell tools (taskq, delegate_task) commit to the WAL
+    notifier.watch_file(COLLAB_DIR / "tasks.sqlite-wal", "rhncrs://collab/tasks")
+    notifier.watch_file(COLLAB_DIR / "tasks.sqlite", "rhncrs://collab/tasks")
+    notifier.watch_file(shared_state.log_path, "rhncrs://shared-state")
+    notifier.watch_file(shared_state.snapshot_path, "rhncrs://shared-state")
+    notifier.start()
+
+#  ═══════════════════════════════════════════════════════════
+#  DAEMON - One warm process shared by every Claude/Gemini session
+#  ═══════════════════════════════════════════════════════════
+
+class _SocketLines:
+    """Adapts an asyncio socket to the async file interface stdio_server expects"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        line = await self.reader.readline()
+        if not line:
+            raise StopAsyncIteration
+        return line.decode("utf-8")
+
+    async def write(self, text: str) -> None:
+        self.writer.write(text.encode("utf-8"))
+
+    async def flush(self) -> None:
+        await self.writer.drain()
+
+async def serve_socket_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Run one MCP session over a Unix socket connection"""
+    lines = _SocketLines(reader, writer)
+    try:
+        async with stdio_server(lines, lines) as (read_stream, write_stream):
+            await server.run(read_stream, write_stream, initialization_options())
+    except Exception as e:
+        # One broken client must never take the shared daemon down
+        print(f"rhncrs-mcp: client session ended with error: {e!r}", file=sys.stderr)
+    finally:
+        writer.close()
+
+def socket_in_use(path: Path) -> bool:
+    """True if a live daemon is accepting on `path` (a stale file is removed)"""
+    if not path.exists():
+        return False
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(path))
+        return True
+    except OSError:
+        path.unlink()
+        return False
+    finally:
+        probe.close()
+
+class _HTTPApp:
+    """What StreamableHTTPSessionManager needs from the server, with our init options"""
+
+    def run(self, *args, **kwargs):
+        return server.run(*args, **kwargs)
+
+    def create_initialization_options(self):
+        return initialization_options()
+
+def is_loopback(host: str) -> bool:
+    """True for localhost and loopback addresses (IPv6 with or without brackets)"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host.strip("[]")).is_loopback
+    except ValueError:
+        return False
+
+async def serve_http(host: str, port: int) -> None:
+    """Streamable HTTP on localhost (needs the SDK's optional starlette/uvicorn deps)"""
+    try:
+        import contextlib
+        import uvicorn
+        from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+        from mcp.server.transport_security import TransportSecuritySettings
+        from starlette.applications import Starlette
+        from starlette.routing import Mount
+    except ImportError:
+        print("Error: streamable HTTP needs mcp>=1.10 with uvicorn and starlette", file=sys.stderr)
+        return
+
+    # No auth on this endpoint, so only answer requests addressed to us: a browser page that
+    # DNS-rebinds its own name onto this port still sends its Host/Origin and gets turned away
+    hosts = {"127.0.0.1", "localhost", "[::1]", host if ":" not in host else f"[{host.strip('[]')}]"}
+    security = TransportSecuritySettings(
+        enable_dns_rebinding_protection=True,
+        allowed_hosts=sorted(f"{h}:{port}" for h in hosts),
+        allowed_origins=sorted(f"http://{h}:{port}" for h in hosts),
+    )
+    manager = StreamableHTTPSessionManager(app=_HTTPApp(), security_settings=security)
+
+    async def handle(scope, receive, send):
+        await manager.handle_request(scope, receive, send)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        async with manager.run():
+            yield
+
+    app = Starlette(routes=[Mount("/mcp", app=handle)], lifespan=lifespan)
+    config = uvicorn.Config(app, host=host, port=port, log_level="warning")
+    await uvicorn.Server(config).serve()
+
+def start_shared_state(loop: asyncio.AbstractEventLoop) -> None:
+    """Indexes, search warm-up and file watches - built once per process"""
+    vault_index.start()
+    # Warm the search index in the background so the first query is fast
+    loop.run_in_executor(None, refresh_vault_search)
+    start_event_sources(loop)
+    if METRICS_FILE:
+        PeriodicTask(METRICS_INTERVAL, lambda: metrics.dump(Path(METRICS_FILE)), "metrics-dump").start()
+
 async def main():
-    """Run the MCP server"""
+    """Run the MCP server on stdio (one client per process)"""
+    start_shared_state(asyncio.get_running_loop())
     async with stdio_server() as (read_stream, write_stream):
-        await server.run(read_stream, write_stream, server.create_initialization_options())
+        await server.run(read_stream, write_stream, initialization_options())
+
+async def daemon(socket_path: Optional[Path], http: Optional[str]) -> None:
+    """Serve many clients from one process over a Unix socket and/or localhost HTTP"""
+    loop = asyncio.get_running_loop()
+    tasks = []
+    if socket_path is not None:
+        socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if socket_in_use(socket_path):
+            print(f"rhncrs-mcp: daemon already running on {socket_path}", file=sys.stderr)
+            return
+        old_umask = os.umask(0o077)
+        try:
+            unix_server = await asyncio.start_unix_server(serve_socket_client, path=str(socket_path))
+        finally:
+            os.umask(old_umask)
+        tasks.append(asyncio.ensure_future(unix_server.serve_forever()))
+        print(f"rhncrs-mcp: listening on {socket_path}", file=sys.stderr)
+    if http:
+        host, _, port = http.rpartition(":")
+        host = host or "127.0.0.1"
+        tasks.append(asyncio.ensure_future(serve_http(host, int(port))))
+        print(f"rhncrs-mcp: listening on http://{host}:{port}/mcp", file=sys.stderr)
+    start_shared_state(loop)
+    loop.add_signal_handler(signal.SIGTERM, lambda: [t.cancel() for t in tasks])
+    try:
+        await asyncio.gather(*tasks)
+    except asyncio.CancelledError:
+        pass
+    finally:
+        if socket_path is not None and socket_path.exists():
+            socket_path.unlink()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="RHNCRS MCP server")
+    parser.add_argument("--daemon", action="store_true",
+                        help=f"Serve clients over a Unix socket (default: {SOCKET_PATH})")
+    parser.add_argument("--socket", type=Path, help="Unix socket path (implies --daemon)")
+    parser.add_argument("--http", metavar="HOST:PORT", help="Also serve streamable HTTP, e.g. 127.0.0.1:8765")
+    parser.add_argument("--http-allow-remote", action="store_true",
+                        help="Allow --http on a non-loopback address (the endpoint has no authentication)")
+    args = parser.parse_args()
+    if args.http:
+        http_host, _, http_port = args.http.rpartition(":")
+        if not http_port.isdigit():
+            parser.error(f"--http expects HOST:PORT, got {args.http!r}")
+        if http_host and not is_loopback(http_host) and not args.http_allow_remote:
+            parser.error(f"refusing to serve unauthenticated HTTP on {http_host}; "
+                         "bind 127.0.0.1 or pass --http-allow-remote")
+    if args.daemon or args.socket or args.http:
+        socket_path = args.socket or (SOCKET_PATH if args.daemon or not args.http else None)
+        try:
+            asyncio.run(daemon(socket_path, args.http))
+        except KeyboardInterrupt:
+            pass
+    else:
+        asyncio.run(main())
@@ -3,8 +3,8 @@
 # Generated by Gemini, Executed by Claude
 
 # --- Configuration ---
-VAULT_ROOT="/Users/hoe/Library/Mobile Documents/iCloud~md~obsidian/Documents/rhncrs-collab"
-SOURCE_ROOT="/Users/hoe/Dev/org"
+VAULT_ROOT="${OBSIDIAN_VAULT:-/Users/hoe/Library/Mobile Documents/iCloud~md~obsidian/Documents/rhncrs-collab}"
+SOURCE_ROOT="${PROJECT_ROOT:-/Users/hoe/Dev/org}"
 
 # Project Mapping (ID_Name SourceDir)
 declare -a PROJECTS=(
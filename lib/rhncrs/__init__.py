@@ -0,0 +1,4 @@
+"""
+rhncrs - Shared libraries for the AI Collaboration Framework
+Used by the MCP server (bin/rhncrs-mcp-server.py) and the collaboration tools in bin/
+"""
@@ -0,0 +1,92 @@
+"""
+collab_status - Compare-and-set state machine for collab/status.json
+Every transition is checked and written under an flock, so two agents racing
+for the turn can't both win and readers never see a half-written file.
+"""
+
+import fcntl
+import json
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+from rhncrs.vault_io import atomic_write_text
+
+STATES = ("IDLE", "CLAUDE_WORKING", "GEMINI_WORKING", "AWAITING_USER", "ERROR")
+
+DEFAULT_STATUS = {
+    "state": "IDLE",
+    "updated": None,
+    "current_task": None,
+    "context": None,
+    "version": 0,
+}
+
+
+class TransitionRejected(Exception):
+    """The current state did not match the caller's expectation"""
+
+    def __init__(self, status: Dict[str, Any]):
+        super().__init__(f"Current state is {status.get('state')} (version {status.get('version', 0)})")
+        self.status = status
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class CollabStatus:
+    """Atomic reader/writer for the shared collaboration status file"""
+
+    def __init__(self, status_file: Path):
+        self.path = Path(status_file)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def read(self) -> Dict[str, Any]:
+        try:
+            status = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            return dict(DEFAULT_STATUS)
+        except json.JSONDecodeError:
+            # Written by an older non-atomic script mid-update; treat as unknown
+            return dict(DEFAULT_STATUS, state="ERROR", context="status.json unreadable")
+        status.setdefault("version", 0)
+        return status
+
+    def transition(self, state: str,
+                   expect: Optional[Union[str, Iterable[str]]] = None,
+                   expect_version: Optional[int] = None,
+                   **fields: Any) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Move to `state` if the current state/version match; returns (previous, new)"""
+        if state not in STATES:
+            raise ValueError(f"Unknown state: {state} (expected one of {', '.join(STATES)})")
+        if isinstance(expect, str):
+            expect = [s.strip() for s in expect.split(",") if s.strip()]
+        with self._locked():
+            current = self.read()
+            if expect and current.get("state") not in expect:
+                raise TransitionRejected(current)
+            if expect_version is not None and current.get("version", 0) != expect_version:
+                raise TransitionRejected(current)
+            new = {
+                "state": state,
+                "updated": utc_now(),
+                "current_task": fields.pop("current_task", None),
+                "context": fields.pop("context", None),
+            }
+            new.update({k: v for k, v in fields.items() if v is not None})
+            new["previous_state"] = current.get("state")
+            new["version"] = current.get("version", 0) + 1
+            atomic_write_text(self.path, json.dumps(new, indent=2) + "\n")
+            return current, new
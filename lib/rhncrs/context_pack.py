@@ -0,0 +1,421 @@
+"""
+context_pack - Assemble delegation context under a token budget
+Context files are split into chunks (markdown sections, or blank-line blocks
+for everything else). Chunks repeated across files are sent once, chunks the
+worker was already sent recently (content-hash cache) become a one-line
+reference, and the rest are ranked by keyword relevance to the task and packed
+until the budget is spent. What didn't fit is listed by line range so the
+worker can still read it. Tokens are estimated at ~4 characters each.
+"""
+
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from rhncrs.markdown import HEADING_RE
+from rhncrs.vault_edit import FENCE_LINE_RE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen (
+    worker TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    path TEXT NOT NULL,
+    start_line INTEGER NOT NULL,
+    end_line INTEGER NOT NULL,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (worker, hash)
+);
+CREATE INDEX IF NOT EXISTS seen_age ON seen(seen_at);
+"""
+
+DEFAULT_BUDGET = 8000
+CHUNK_TOKENS = 600
+DEFAULT_SEEN_TTL = 6 * 3600
+# Files past this are chunked from their first MAX_FILE_BYTES only
+MAX_FILE_BYTES = 4 * 1024 * 1024
+MARKDOWN_SUFFIXES = {".md", ".markdown", ".mdx"}
+WORD_RE = re.compile(r"[A-Za-z0-9_]{3,}")
+STOPWORDS = {
+    "the", "and", "for", "with", "this", "that", "from", "into", "are", "was", "were", "will", "should",
+    "please", "all", "any", "can", "have", "has", "not", "but", "you", "your", "our", "its", "use", "using",
+    "make", "add", "new", "file", "files", "task", "need", "needs", "also", "about", "them", "then", "when",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def chunk_hash(text: str) -> str:
+    normalized = "\n".join(line.rstrip() for line in text.strip("\n").splitlines())
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def terms(text: str) -> List[str]:
+    return [w for w in (m.lower() for m in WORD_RE.findall(text)) if w not in STOPWORDS]
+
+
+class Chunk:
+    """A line range of one context file; `fate` is decided by pack()"""
+
+    def __init__(self, path: str, index: int, start: int, end: int, text: str, heading: Optional[str] = None):
+        self.path = path
+        self.index = index
+        self.start = start  # 1-based, inclusive
+        self.end = end
+        self.text = text
+        self.heading = heading
+        self.tokens = estimate_tokens(text)
+        self.hash = chunk_hash(text)
+        self.score = 0.0
+        self.fate = "omitted"  # included | duplicate | unchanged | omitted
+        self.ref: Optional[str] = None
+        self.ref_path: Optional[str] = None
+
+    @property
+    def span(self) -> str:
+        return f"{self.start}" if self.start == self.end else f"{self.start}–{self.end}"
+
+
+class SourceFile:
+    def __init__(self, name: str):
+        self.name = name
+        self.chunks: List[Chunk] = []
+        self.lines = 0
+        self.problem: Optional[str] = None
+
+
+def _blocks(lines: List[str], markdown: bool) -> List[Tuple[int, int, Optional[str]]]:
+    """(start, end, heading) line-index ranges: markdown sections, else blank-line separated blocks"""
+    cuts: List[Tuple[int, Optional[str]]] = [(0, None)]
+    fence = None
+    for i, line in enumerate(lines):
+        match = FENCE_LINE_RE.match(line)
+        if match:
+            fence = None if fence == match.group(1) else (fence or match.group(1))
+            continue
+        if fence or i == 0:
+            continue
+        if markdown:
+            heading = HEADING_RE.match(line)
+            if heading:
+                cuts.append((i, line.strip()))
+        elif not line.strip() and lines[i - 1].strip():
+            cuts.append((i + 1, None))
+    if markdown and lines and HEADING_RE.match(lines[0]):
+        cuts[0] = (0, lines[0].strip())
+    cuts = [c for n, c in enumerate(cuts) if c[0] < len(lines) and (n == 0 or c[0] > cuts[n - 1][0])]
+    return [(start, cuts[n + 1][0] if n + 1 < len(cuts) else len(lines), heading)
+            for n, (start, heading) in enumerate(cuts)]
+
+
+def split_chunks(name: str, text: str, chunk_tokens: int = CHUNK_TOKENS) -> List[Chunk]:
+    """Merge small blocks up to `chunk_tokens`, split oversized ones by lines"""
+    lines = text.splitlines()
+    limit = chunk_tokens * 4
+    markdown = Path(name).suffix.lower() in MARKDOWN_SUFFIXES
+    chunks: List[Chunk] = []
+    pending: List[Tuple[int, int, Optional[str]]] = []
+
+    def emit(start: int, end: int, heading: Optional[str]) -> None:
+        body = "\n".join(lines[start:end])
+        if body.strip():
+            chunks.append(Chunk(name, len(chunks), start + 1, end, body, heading))
+
+    def flush() -> None:
+        if pending:
+            emit(pending[0][0], pending[-1][1], pending[0][2])
+            pending.clear()
+
+    for start, end, heading in _blocks(lines, markdown):
+        size = sum(len(l) + 1 for l in lines[start:end])
+        if size > limit:
+            flush()
+            piece, used = start, 0
+            for i in range(start, end):
+                used += len(lines[i]) + 1
+                if used > limit and i > piece:
+                    emit(piece, i, heading if piece == start else None)
+                    piece, used = i, len(lines[i]) + 1
+            emit(piece, end, heading if piece == start else None)
+            continue
+        pending_size = sum(len(l) + 1 for l in lines[pending[0][0]:pending[-1][1]]) if pending else 0
+        # A new markdown section starts a new chunk unless the current one is tiny
+        if pending and (pending_size + size > limit or (heading and pending_size > limit // 4)):
+            flush()
+        pending.append((start, end, heading))
+    flush()
+    return chunks
+
+
+def load_source(name: str, chunk_tokens: int = CHUNK_TOKENS) -> SourceFile:
+    source = SourceFile(name)
+    path = Path(name)
+    if not path.is_file():
+        source.problem = "not found"
+        return source
+    try:
+        with open(path, "rb") as f:
+            data = f.read(MAX_FILE_BYTES + 1)
+    except OSError as e:
+        source.problem = f"unreadable: {e.strerror or e}"
+        return source
+    if b"\0" in data[:8192]:
+        source.problem = "binary, not included"
+        return source
+    text = data[:MAX_FILE_BYTES].decode("utf-8", errors="replace")
+    source.lines = text.count("\n") + (0 if text.endswith("\n") else 1)
+    source.chunks = split_chunks(name, text, chunk_tokens)
+    if len(data) > MAX_FILE_BYTES:
+        source.problem = f"only the first {MAX_FILE_BYTES // (1024 * 1024)} MB considered"
+    return source
+
+
+def fence_for(text: str) -> str:
+    longest = max((len(m) for m in re.findall(r"`{3,}", text)), default=0)
+    return "`" * max(3, longest + 1)
+
+
+def sent_manifest(chunks: Iterable[Chunk]) -> List[Dict[str, Any]]:
+    """What SeenCache needs to remember about sent chunks, as JSON-able dicts"""
+    return [{"hash": c.hash, "path": c.path, "start": c.start, "end": c.end} for c in chunks]
+
+
+class SeenCache:
+    """Chunks each worker was already sent, by content hash, for `ttl` seconds"""
+
+    def __init__(self, db_path: Path, ttl: float = DEFAULT_SEEN_TTL):
+        self.db_path = Path(db_path)
+        self.ttl = ttl
+        self._conn: Optional[sqlite3.Connection] = None
+        self._mutex = threading.RLock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def lookup(self, worker: str, hashes: Iterable[str]) -> Dict[str, Tuple[str, int, int, float]]:
+        hashes = list(set(hashes))
+        found: Dict[str, Tuple[str, int, int, float]] = {}
+        cutoff = time.time() - self.ttl
+        with self._mutex:
+            for i in range(0, len(hashes), 500):
+                batch = hashes[i:i + 500]
+                rows = self.conn.execute(
+                    f"SELECT hash, path, start_line, end_line, seen_at FROM seen WHERE worker = ? "
+                    f"AND seen_at >= ? AND hash IN ({', '.join('?' * len(batch))})", (worker, cutoff, *batch))
+                found.update({h: (p, s, e, t) for h, p, s, e, t in rows})
+        return found
+
+    def record(self, worker: str, chunks: Iterable[Chunk]) -> None:
+        self.record_manifest(worker, sent_manifest(chunks))
+
+    def record_manifest(self, worker: str, entries: Iterable[Dict[str, Any]]) -> None:
+        """Record chunks listed by sent_manifest() (e.g. saved until a delegation succeeded)"""
+        now = time.time()
+        rows = [(worker, e["hash"], e["path"], e["start"], e["end"], now) for e in entries]
+        with self._mutex, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO seen VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self.conn.execute("DELETE FROM seen WHERE seen_at < ?", (now - self.ttl,))
+
+
+def score_chunks(chunks: List[Chunk], query: Optional[str]) -> None:
+    """Keyword relevance (log tf * idf over this pack's chunks); file heads get a small boost"""
+    wanted = set(terms(query or ""))
+    if not wanted:
+        for chunk in chunks:
+            chunk.score = 1.0 / (1 + chunk.index)
+        return
+    counts = [dict.fromkeys(wanted, 0) for _ in chunks]
+    for chunk, count in zip(chunks, counts):
+        for word in terms(chunk.text + " " + (chunk.heading or "") + " " + chunk.path):
+            if word in count:
+                count[word] += 1
+    n = len(chunks)
+    df = {w: sum(1 for c in counts if c[w]) for w in wanted}
+    for chunk, count in zip(chunks, counts):
+        score = sum(math.log1p(tf) * math.log(1 + n / df[w]) for w, tf in count.items() if tf)
+        # Normalize by length so one huge chunk doesn't win on raw counts
+        chunk.score = score / math.sqrt(max(1, chunk.tokens) / CHUNK_TOKENS) + (0.5 if chunk.index == 0 else 0.0)
+
+
+def pack(paths: List[str], budget: int = DEFAULT_BUDGET, query: Optional[str] = None,
+         worker: Optional[str] = None, seen: Optional[SeenCache] = None,
+         chunk_tokens: int = CHUNK_TOKENS, record: bool = True, reuse: bool = True) -> Tuple[str, Dict[str, Any]]:
+    """Markdown context block for `paths` within `budget` tokens, plus a savings report.
+
+    With a `seen` cache and `worker`, chunks already sent to that worker are referenced
+    (unless `reuse` is False) and what this pack sends is recorded (unless `record` is False).
+    """
+    text, report, sent = build_pack(paths, budget, query, worker, seen, chunk_tokens, reuse)
+    if seen is not None and worker and record:
+        seen.record(worker, sent)
+    return text, report
+
+
+def build_pack(paths: List[str], budget: int = DEFAULT_BUDGET, query: Optional[str] = None,
+               worker: Optional[str] = None, seen: Optional[SeenCache] = None,
+               chunk_tokens: int = CHUNK_TOKENS, reuse: bool = True) -> Tuple[str, Dict[str, Any], List[Chunk]]:
+    """pack() without recording: also returns the chunks sent, for the caller to record
+    once the pack is actually delivered (e.g. after the task holding it is committed)"""
+    sources: List[SourceFile] = []
+    for name in dict.fromkeys(paths):
+        sources.append(load_source(name, chunk_tokens))
+    chunks = [c for s in sources for c in s.chunks]
+
+    first_by_hash: Dict[str, Chunk] = {}
+    for chunk in chunks:
+        original = first_by_hash.setdefault(chunk.hash, chunk)
+        if original is not chunk:
+            chunk.fate, chunk.ref = "duplicate", f"same as `{original.path}` lines {original.span}"
+            chunk.ref_path = original.path
+
+    if seen is not None and worker and reuse:
+        known = seen.lookup(worker, (c.hash for c in chunks if c.fate == "omitted"))
+        for chunk in chunks:
+            if chunk.fate == "omitted" and chunk.hash in known:
+                path, start, end, at = known[chunk.hash]
+                chunk.fate = "unchanged"
+                chunk.ref = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(at))
+
+    candidates = [c for c in chunks if c.fate == "omitted"]
+    score_chunks(candidates, query)
+    # Every file costs a header; reserve room for headers and the omission notes up front
+    overhead = sum(12 + estimate_tokens(s.name) for s in sources) + 40
+    remaining = budget - overhead
+    order = {id(c): n for n, c in enumerate(chunks)}
+    for chunk in sorted(candidates, key=lambda c: (-c.score, order[id(c)])):
+        cost = chunk.tokens + 8
+        if cost <= remaining:
+            chunk.fate = "included"
+            remaining -= cost
+
+    text = render(sources)
+    if estimate_tokens(text) > budget:
+        text = render(sources, terse=True)
+    while estimate_tokens(text) > budget and any(c.fate == "included" for c in chunks):
+        # Notes for many files can still overflow a tiny budget: drop the lowest-scoring chunk
+        worst = min((c for c in chunks if c.fate == "included"), key=lambda c: (c.score, -order[id(c)]))
+        worst.fate = "omitted"
+        text = render(sources, terse=True)
+    if estimate_tokens(text) > budget:
+        text = render_overflow(sources, budget)
+
+    def total(fate: Optional[str] = None) -> int:
+        return sum(c.tokens for c in chunks if fate is None or c.fate == fate)
+
+    tokens_in = total()
+    tokens_out = estimate_tokens(text)
+    report = {
+        "files": len(sources),
+        "chunks": len(chunks),
+        "budget": budget,
+        "tokens_in": tokens_in,
+        "tokens_out": tokens_out,
+        "included": total("included"),
+        "duplicate": total("duplicate"),
+        "unchanged": total("unchanged"),
+        "over_budget": total("omitted"),
+        "saved_pct": round(100 * (1 - tokens_out / tokens_in), 1) if tokens_in else 0.0,
+    }
+    return text, report, [c for c in chunks if c.fate == "included"]
+
+
+def _runs(chunks: List[Chunk]) -> List[List[Chunk]]:
+    runs: List[List[Chunk]] = []
+    for chunk in chunks:
+        if runs and runs[-1][-1].fate == chunk.fate and runs[-1][-1].index + 1 == chunk.index:
+            runs[-1].append(chunk)
+        else:
+            runs.append([chunk])
+    return runs
+
+
+def _label(run: List[Chunk]) -> str:
+    span = f"{run[0].start}" if run[0].start == run[-1].end else f"{run[0].start}–{run[-1].end}"
+    headings = [c.heading for c in run if c.heading]
+    if headings:
+        shown = ", ".join(headings[:3]) + (f", +{len(headings) - 3} more" if len(headings) > 3 else "")
+        return f"lines {span} ({shown})"
+    return f"lines {span}"
+
+
+def render(sources: List[SourceFile], terse: bool = False) -> str:
+    parts = []
+    for source in sources:
+        if source.problem and not source.chunks:
+            parts.append(f"- Referenced file: `{source.name}` ({source.problem})\n")
+            continue
+        if not source.chunks:
+            parts.append(f"- Referenced file: `{source.name}` (empty)\n")
+            continue
+        fates = {c.fate for c in source.chunks}
+        if fates == {"unchanged"}:
+            parts.append(f"- `{source.name}`: unchanged since {source.chunks[0].ref} (already sent; re-read it if needed)\n")
+            continue
+        if fates == {"duplicate"}:
+            originals = ", ".join(f"`{p}`" for p in dict.fromkeys(c.ref_path for c in source.chunks))
+            parts.append(f"- `{source.name}`: same content as {originals}\n")
+            continue
+        included = [c for c in source.chunks if c.fate == "included"]
+        whole = len(included) == len(source.chunks)
+        title = f"### Context from: `{source.name}`"
+        if not whole:
+            title += f" ({sum(c.end - c.start + 1 for c in included)} of {source.lines} lines)"
+        if source.problem:
+            title += f" [{source.problem}]"
+        lines = [title]
+        notes = []
+        for run in _runs(source.chunks):
+            fate = run[0].fate
+            if fate == "included":
+                body = "\n".join(c.text for c in run)
+                fence = fence_for(body)
+                if not whole:
+                    lines.append(f"_{_label(run)}_")
+                lines += [fence, body, fence]
+            elif fate == "unchanged":
+                notes.append(f"{_label(run)} unchanged since {run[0].ref}")
+            elif fate == "duplicate":
+                notes.append(f"{_label(run)} {run[0].ref}")
+            else:
+                notes.append(f"{_label(run)} over budget")
+        if notes:
+            if terse and len(notes) > 3:
+                notes = notes[:3] + [f"+{len(notes) - 3} more ranges"]
+            lines.append("Not included (read the file for these): " + "; ".join(notes))
+        parts.append("\n".join(lines) + "\n")
+    return "\n".join(parts)
+
+
+def render_overflow(sources: List[SourceFile], budget: int) -> str:
+    """Last resort when even the file list doesn't fit: name as many files as the budget allows"""
+    head = f"{len(sources)} context files attached; none fit the {budget}-token budget. Read them directly:"
+    names, used = [], estimate_tokens(head) + 8
+    for source in sources:
+        cost = estimate_tokens(source.name) + 4
+        if used + cost > budget:
+            break
+        names.append(f"- `{source.name}`")
+        used += cost
+    if len(names) < len(sources):
+        names.append(f"- … and {len(sources) - len(names)} more")
+    return "\n".join([head] + names) + "\n"
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    return (f"context: {report['tokens_in']} → {report['tokens_out']} tokens "
+            f"({report['saved_pct']}% saved; duplicate {report['duplicate']}, unchanged {report['unchanged']}, "
+            f"over budget {report['over_budget']}; budget {report['budget']})")
@@ -0,0 +1,244 @@
+"""
+dispatch - Run the agents a prompt is addressed to concurrently
+Each agent command gets the prompt on stdin in its own process group. Output
+is streamed line by line to an optional callback, every agent has its own
+deadline, and a timed-out or cancelled agent is terminated (SIGTERM, then
+SIGKILL after a grace period) together with anything it spawned. Replies are
+appended to the active thread and the message log in the order they finish,
+so routing a prompt to both agents costs max(latency) instead of the sum.
+
+Agent commands default to AGENT_COMMANDS and can be overridden per agent with
+RHNCRS_<AGENT>_CMD (e.g. RHNCRS_GEMINI_CMD="gemini -m gemini-2.5-pro").
+"""
+
+import os
+import queue
+import shlex
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+from rhncrs.msglog import MessageLog
+from rhncrs.thread import SENDER_ICONS, ThreadLog, utc_now
+
+AGENT_COMMANDS = {"gemini": "gemini", "claude": "claude -p"}
+DEFAULT_TIMEOUT = 600.0
+KILL_GRACE = 2.0
+# Bytes of stderr kept per agent for the merged result
+STDERR_TAIL = 4096
+
+OutputCallback = Callable[[str, str], None]
+ResultCallback = Callable[[Dict[str, Any]], None]
+
+
+def agent_command(agent: str, env: Optional[Mapping[str, str]] = None) -> List[str]:
+    """argv for an agent: RHNCRS_<AGENT>_CMD, else AGENT_COMMANDS, else the agent's name"""
+    env = os.environ if env is None else env
+    command = env.get(f"RHNCRS_{agent.upper()}_CMD") or AGENT_COMMANDS.get(agent, agent)
+    return shlex.split(command)
+
+
+class AgentRun:
+    """One agent process: feeds the prompt, drains its pipes and enforces its deadline"""
+
+    def __init__(self, agent: str, argv: List[str], timeout: float, on_output: Optional[OutputCallback] = None):
+        self.agent = agent
+        self.argv = argv
+        self.timeout = timeout
+        self.on_output = on_output
+        self.proc: Optional[subprocess.Popen] = None
+        self.lines: List[str] = []
+        self.stderr = b""
+        self.cancelled = threading.Event()
+        self._spawned = threading.Event()
+
+    def _feed(self, prompt: str) -> None:
+        try:
+            self.proc.stdin.write(prompt.encode("utf-8"))
+        except (BrokenPipeError, OSError):
+            pass
+        finally:
+            try:
+                self.proc.stdin.close()
+            except OSError:
+                pass
+
+    def _drain_stdout(self) -> None:
+        for raw in iter(self.proc.stdout.readline, b""):
+            line = raw.decode("utf-8", errors="replace")
+            self.lines.append(line)
+            if self.on_output:
+                self.on_output(self.agent, line.rstrip("\n"))
+
+    def _drain_stderr(self) -> None:
+        for chunk in iter(lambda: self.proc.stderr.read(4096), b""):
+            self.stderr = (self.stderr + chunk)[-STDERR_TAIL:]
+
+    def terminate(self) -> None:
+        """SIGTERM the whole process group, SIGKILL it if it outlives the grace period"""
+        if self.proc is None or self.proc.poll() is not None:
+            return
+        for sig, wait in ((signal.SIGTERM, KILL_GRACE), (signal.SIGKILL, None)):
+            try:
+                os.killpg(self.proc.pid, sig)
+            except (ProcessLookupError, PermissionError):
+                return
+            try:
+                self.proc.wait(wait)
+                return
+            except subprocess.TimeoutExpired:
+                continue
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+        if self._spawned.is_set():
+            self.terminate()
+
+    def run(self, prompt: str) -> Dict[str, Any]:
+        start = time.monotonic()
+        result: Dict[str, Any] = {"agent": self.agent, "command": self.argv, "started": utc_now()}
+        try:
+            self.proc = subprocess.Popen(self.argv, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                         stderr=subprocess.PIPE, start_new_session=True)
+        except OSError as e:
+            result.update(status="failed", exit_code=None, output="", error=str(e),
+                          elapsed_ms=round((time.monotonic() - start) * 1000, 1))
+            return result
+        self._spawned.set()
+        if self.cancelled.is_set():
+            self.terminate()
+
+        pumps = [threading.Thread(target=target, daemon=True)
+                 for target in (self._drain_stdout, self._drain_stderr)]
+        pumps.append(threading.Thread(target=self._feed, args=(prompt,), daemon=True))
+        for pump in pumps:
+            pump.start()
+
+        status = "ok"
+        try:
+            self.proc.wait(self.timeout)
+        except subprocess.TimeoutExpired:
+            status = "timeout"
+            self.terminate()
+        for pump in pumps:
+            pump.join(KILL_GRACE)
+
+        code = self.proc.returncode
+        if self.cancelled.is_set() and status == "ok" and code != 0:
+            status = "cancelled"
+        elif status == "ok" and code != 0:
+            status = "failed"
+        result.update(status=status, exit_code=code, output="".join(self.lines).rstrip("\n"),
+                      elapsed_ms=round((time.monotonic() - start) * 1000, 1))
+        stderr = self.stderr.decode("utf-8", errors="replace").strip()
+        if stderr and status != "ok":
+            result["error"] = stderr
+        return result
+
+
+class Dispatcher:
+    """Fan one prompt out to several agents and merge what comes back"""
+
+    def __init__(self, thread: Optional[ThreadLog] = None, log: Optional[MessageLog] = None,
+                 env: Optional[Mapping[str, str]] = None):
+        self.thread = thread
+        self.log = log
+        self.env = env
+        self._runs: List[AgentRun] = []
+        self._lock = threading.Lock()
+
+    def cancel(self) -> None:
+        """Terminate every agent still running (safe to call from a signal handler's thread)"""
+        with self._lock:
+            runs = list(self._runs)
+        for run in runs:
+            run.cancel()
+
+    def _record(self, message: str, sender: str, recipient: str, type: str, **extra: Any) -> None:
+        timestamp = utc_now()
+        if self.log is not None:
+            self.log.append(message, sender, recipient, type=type, timestamp=timestamp, **extra)
+        if self.thread is not None:
+            self.thread.append(message, sender, recipient, type=type, timestamp=timestamp)
+
+    def _record_result(self, result: Dict[str, Any], dispatch_id: str) -> None:
+        body = result["output"]
+        if result["status"] != "ok":
+            note = {"timeout": f"timed out after {result['elapsed_ms'] / 1000:.1f}s",
+                    "cancelled": "cancelled",
+                    "failed": f"failed (exit {result['exit_code']})"}[result["status"]]
+            if result.get("error"):
+                note += f": {result['error'].splitlines()[-1]}"
+            body = f"_{note}_\n\n{body}" if body else f"_{note}_"
+        self._record(body or "_(no output)_", result["agent"], "user",
+                     "response" if result["status"] == "ok" else "error",
+                     dispatch_id=dispatch_id, status=result["status"], elapsed_ms=result["elapsed_ms"])
+
+    def run(self, prompt: str, agents: List[str], timeouts: Optional[Mapping[str, float]] = None,
+            default_timeout: float = DEFAULT_TIMEOUT, route_mode: Optional[str] = None,
+            on_output: Optional[OutputCallback] = None,
+            on_result: Optional[ResultCallback] = None) -> Dict[str, Any]:
+        timeouts = timeouts or {}
+        # One run per agent: results are keyed by agent name
+        agents = list(dict.fromkeys(agents))
+        dispatch_id = f"dispatch-{uuid.uuid4().hex[:12]}"
+        start = time.monotonic()
+        recipient = agents[0] if len(agents) == 1 else "both"
+        self._record(prompt, "user", recipient, "request", dispatch_id=dispatch_id, agents=agents)
+
+        runs = [AgentRun(agent, agent_command(agent, self.env), timeouts.get(agent, default_timeout), on_output)
+                for agent in agents]
+        with self._lock:
+            self._runs = runs
+        done: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        for run in runs:
+            threading.Thread(target=lambda r=run: done.put(r.run(prompt)), daemon=True).start()
+
+        results: Dict[str, Dict[str, Any]] = {}
+        try:
+            while len(results) < len(runs):
+                try:
+                    result = done.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+                results[result["agent"]] = result
+                self._record_result(result, dispatch_id)
+                if on_result:
+                    on_result(result)
+        except KeyboardInterrupt:
+            self.cancel()
+            while len(results) < len(runs):
+                result = done.get()
+                results[result["agent"]] = result
+                self._record_result(result, dispatch_id)
+            raise
+        finally:
+            with self._lock:
+                self._runs = []
+
+        ordered = [results[agent] for agent in agents]
+        return {
+            "dispatch_id": dispatch_id,
+            "route_mode": route_mode,
+            "agents": agents,
+            "ok": all(r["status"] == "ok" for r in ordered),
+            "elapsed_ms": round((time.monotonic() - start) * 1000, 1),
+            "sequential_ms": round(sum(r["elapsed_ms"] for r in ordered), 1),
+            "results": ordered,
+        }
+
+
+def render_merged(merged: Dict[str, Any]) -> str:
+    """gemini-say / claude-say style blocks, one per agent, in routing order"""
+    blocks = []
+    for result in merged["results"]:
+        agent = result["agent"]
+        head = f"### {SENDER_ICONS.get(agent, '🔹')} {agent.capitalize()}"
+        if result["status"] != "ok":
+            head += f" ({result['status']}, {result['elapsed_ms'] / 1000:.1f}s)"
+        body = result["output"] or result.get("error") or "_(no output)_"
+        blocks.append(f"{head}\n{body}\n")
+    return "\n".join(blocks)
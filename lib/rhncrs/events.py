@@ -0,0 +1,124 @@
+"""
+events - Push resource-update notifications to subscribed MCP sessions
+File changes (from watchdog, or a fast stat poll without it) are mapped to
+resource URIs and fanned out to every session subscribed to that URI.
+"""
+
+import asyncio
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from rhncrs.watch import PeriodicTask, Watcher
+
+
+class ResourceNotifier:
+    """Tracks subscriptions and delivers `notifications/resources/updated`"""
+
+    def __init__(self, coalesce_seconds: float = 0.01, poll_interval: float = 0.25):
+        self.coalesce_seconds = coalesce_seconds
+        self.poll_interval = poll_interval
+        self.subscribers: Dict[str, Set[Any]] = {}
+        self.sent = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+        self._files: Dict[str, str] = {}  # absolute file path -> uri
+        self._stamps: Dict[str, Optional[Tuple[int, int, int]]] = {}
+        self._polled: List[str] = []  # files stat-polled instead of watched
+        self._watcher: Optional[Watcher] = None
+        self._poller: Optional[PeriodicTask] = None
+
+    # ─── Subscriptions ───────────────────────────────────────
+
+    def subscribe(self, uri: str, session: Any) -> None:
+        with self._lock:
+            self.subscribers.setdefault(uri, set()).add(session)
+
+    def unsubscribe(self, uri: str, session: Any) -> None:
+        with self._lock:
+            sessions = self.subscribers.get(uri)
+            if sessions:
+                sessions.discard(session)
+
+    # ─── Delivery ────────────────────────────────────────────
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    def notify_threadsafe(self, uri: str) -> None:
+        """Schedule a notification from any thread; bursts within the coalesce window merge"""
+        if self._loop is None or self._loop.is_closed():
+            return
+        with self._lock:
+            if uri in self._pending or not self.subscribers.get(uri):
+                return
+            self._pending.add(uri)
+        self._loop.call_soon_threadsafe(self._loop.call_later, self.coalesce_seconds, self._flush, uri)
+
+    def _flush(self, uri: str) -> None:
+        with self._lock:
+            self._pending.discard(uri)
+        asyncio.ensure_future(self.notify(uri))
+
+    async def notify(self, uri: str) -> None:
+        with self._lock:
+            sessions = list(self.subscribers.get(uri, ()))
+        for session in sessions:
+            try:
+                await session.send_resource_updated(uri)
+                self.sent += 1
+            except Exception:
+                # Session went away - stop notifying it
+                self.unsubscribe(uri, session)
+
+    # ─── File sources ────────────────────────────────────────
+
+    def watch_file(self, path: Path, uri: str) -> None:
+        """Notify `uri` whenever `path` is created, modified, replaced or removed"""
+        key = os.path.abspath(path)
+        self._files[key] = uri
+        self._stamps[key] = self._stamp(key)
+
+    @staticmethod
+    def _stamp(path: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _on_event(self, event_type: str, src: str, dest: Optional[str]) -> None:
+        for path in (src, dest):
+            uri = self._files.get(os.path.abspath(path)) if path else None
+            if uri:
+                self.notify_threadsafe(uri)
+
+    def _poll(self) -> None:
+        for path in self._polled:
+            uri = self._files[path]
+            stamp = self._stamp(path)
+            if stamp != self._stamps.get(path):
+                self._stamps[path] = stamp
+                self.notify_threadsafe(uri)
+
+    def start(self) -> None:
+        # Only watch directories that exist: never create a wrong or not-yet-mounted
+        # OBSIDIAN_VAULT/COLLAB_DIR tree; files under a missing directory are polled instead
+        existing = {str(Path(p).parent) for p in self._files if Path(p).parent.is_dir()}
+        self._watcher = Watcher([Path(d) for d in sorted(existing)], self._on_event)
+        if self._watcher.start():
+            self._polled = [p for p in self._files if str(Path(p).parent) not in existing]
+        else:
+            # No watchdog: a stat() per watched file every poll interval
+            self._polled = list(self._files)
+        if self._polled:
+            self._poller = PeriodicTask(self.poll_interval, self._poll, "resource-poll")
+            self._poller.start()
+
+    def stop(self) -> None:
+        if self._watcher:
+            self._watcher.stop()
+        if self._poller:
+            self._poller.stop()
@@ -0,0 +1,237 @@
+"""
+infra - Single-connection state collection for infra-pull
+infra-pull used to open a fresh SSH connection for every step: the probe,
+docker ps, systemctl, nginx -t, find, then one scp per .env file, i.e. N+5
+handshakes. Here one ControlMaster connection is opened by the probe and
+reused. COLLECTOR runs the collectors concurrently on the remote host in one
+round trip and streams their output back as framed sections. One of those
+sections is the sha256 of every .env file. Only the files whose hash differs
+from the secrets manifest (see secrets_manifest) are then fetched, as one tar
+over the same connection.
+
+Each section comes back as a header line "@@rhncrs NAME RC MS BYTES",
+followed by exactly BYTES bytes of output.
+
+The ssh command is INFRA_SSH (default "ssh"), so a local sshd or a fake-ssh
+stand-in (bench/fake_ssh.py) can replace the VPS.
+"""
+
+import io
+import os
+import re
+import shlex
+import subprocess
+import tarfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Runs under `sh -s -- ENV_ROOT` on the remote host; POSIX sh, GNU or busybox userland
+COLLECTOR = r"""
+ENV_ROOT="${1:-/root}"
+T=$(mktemp -d) || exit 1
+trap 'rm -rf "$T"' EXIT
+now() {
+    n=$(date +%s%N 2>/dev/null)
+    case "$n" in *N|"") echo "$(date +%s)000000000" ;; *) echo "$n" ;; esac
+}
+run() {
+    name=$1; shift
+    (
+        s=$(now)
+        "$@" > "$T/$name.out" 2>/dev/null
+        echo $? > "$T/$name.rc"
+        e=$(now)
+        echo $(( (e - s) / 1000000 )) > "$T/$name.ms"
+    ) &
+}
+run docker sh -c "docker ps --format 'table {{.Names}}\t{{.Image}}\t{{.Status}}\t{{.Ports}}'"
+run services sh -c "systemctl list-units --type=service --state=running | grep -E '(docker|nginx|rhino|node)'"
+run nginx sh -c "nginx -t 2>&1 && echo '---' && ls -la /etc/nginx/sites-enabled/"
+if command -v sha256sum > /dev/null 2>&1; then SHA256="sha256sum"; else SHA256="shasum -a 256"; fi
+run envfiles find "$ENV_ROOT" -maxdepth 3 -name .env -type f -exec $SHA256 {} +
+wait
+for name in docker services nginx envfiles; do
+    printf '@@rhncrs %s %s %s %s\n' "$name" "$(cat "$T/$name.rc")" "$(cat "$T/$name.ms")" \
+        "$(wc -c < "$T/$name.out" | tr -d ' ')"
+    cat "$T/$name.out"
+done
+"""
+
+SECTIONS = ("docker", "services", "nginx", "envfiles")
+# What the old per-step ssh calls printed when a collector failed
+FALLBACKS = {
+    "docker": "Docker not available",
+    "services": "No matching services",
+    "nginx": "Nginx not configured",
+}
+HEADER_RE = re.compile(rb"^@@rhncrs (\w+) (-?\d+) (-?\d+) (\d+)$")
+
+
+class InfraError(Exception):
+    """Raised when the remote host can't be reached or returns something unparseable"""
+
+
+class RemoteHost:
+    """ssh to one host over a shared ControlMaster connection"""
+
+    def __init__(self, host: str, ssh: Optional[str] = None, control_dir: Optional[Path] = None,
+                 connect_timeout: int = 5, persist: int = 60):
+        self.host = host
+        self.ssh = shlex.split(ssh or os.environ.get("INFRA_SSH", "ssh"))
+        self.control_dir = Path(control_dir) if control_dir else \
+            Path(os.environ.get("RHNCRS_STATE_DIR", Path.home() / ".cache" / "rhncrs")) / "ssh"
+        self.connect_timeout = connect_timeout
+        self.persist = persist
+        self.handshakes = 0
+
+    def argv(self, *remote: str) -> List[str]:
+        return self.ssh + [
+            "-o", "BatchMode=yes",
+            "-o", f"ConnectTimeout={self.connect_timeout}",
+            "-o", "ControlMaster=auto",
+            # %C is a hash of host/port/user, short enough for the sun_path limit
+            "-o", f"ControlPath={self.control_dir}/%C",
+            "-o", f"ControlPersist={self.persist}",
+            self.host, *remote,
+        ]
+
+    def connect(self) -> float:
+        """Open the master connection (the only handshake); returns seconds taken"""
+        self.control_dir.mkdir(parents=True, exist_ok=True)
+        os.chmod(self.control_dir, 0o700)
+        start = time.perf_counter()
+        proc = subprocess.run(self.argv("true"), stdin=subprocess.DEVNULL, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise InfraError(proc.stderr.strip() or f"ssh exited with {proc.returncode}")
+        self.handshakes += 1
+        return time.perf_counter() - start
+
+    def run(self, *remote: str, input: Optional[bytes] = None, timeout: Optional[float] = None) -> bytes:
+        proc = subprocess.run(self.argv(*remote), input=input, capture_output=True, timeout=timeout)
+        if proc.returncode != 0:
+            detail = proc.stderr.decode("utf-8", errors="replace").strip()
+            raise InfraError(detail or f"ssh exited with {proc.returncode}")
+        return proc.stdout
+
+    def close(self) -> None:
+        subprocess.run(self.ssh + ["-o", f"ControlPath={self.control_dir}/%C", "-O", "exit", self.host],
+                       stdin=subprocess.DEVNULL, capture_output=True)
+
+
+def parse_sections(stream: bytes) -> Dict[str, Dict[str, Any]]:
+    """Split COLLECTOR output into {name: {rc, ms, output}}"""
+    sections: Dict[str, Dict[str, Any]] = {}
+    pos = 0
+    while pos < len(stream):
+        end = stream.find(b"\n", pos)
+        if end < 0:
+            raise InfraError(f"truncated collector output at byte {pos}")
+        match = HEADER_RE.match(stream[pos:end])
+        if not match:
+            raise InfraError(f"unexpected collector output at byte {pos}: {stream[pos:end][:80]!r}")
+        name, rc, ms, size = match.group(1).decode(), int(match.group(2)), int(match.group(3)), int(match.group(4))
+        body = stream[end + 1:end + 1 + size]
+        if len(body) != size:
+            raise InfraError(f"truncated {name} section ({len(body)}/{size} bytes)")
+        sections[name] = {"rc": rc, "ms": ms, "output": body}
+        pos = end + 1 + size
+    missing = [name for name in SECTIONS if name not in sections]
+    if missing:
+        raise InfraError(f"collector returned no {', '.join(missing)} section")
+    return sections
+
+
+def section_text(section: Dict[str, Any], name: str) -> str:
+    text = section["output"].decode("utf-8", errors="replace").rstrip("\n")
+    if section["rc"] != 0 and name in FALLBACKS:
+        return text if name == "nginx" and text else FALLBACKS[name]
+    return text
+
+
+def env_project(remote: str) -> str:
+    """Secret name for a remote .env: its parent directory, as encrypt-env has always been called with"""
+    return Path(remote).parent.name
+
+
+def parse_hashes(text: str) -> Dict[str, str]:
+    """sha256sum output -> {remote path: sha256}"""
+    hashes = {}
+    for line in text.splitlines():
+        if line.startswith("\\"):
+            # sha256sum escapes names containing a backslash or newline; skip those
+            continue
+        digest, _, path = line.partition(" ")
+        path = path.lstrip(" *")
+        if len(digest) == 64 and path:
+            hashes[path] = digest.lower()
+    return hashes
+
+
+def fetch_env_files(host: RemoteHost, paths: List[str], timeout: Optional[float] = 300) -> bytes:
+    """One tar of the given remote files over the existing connection"""
+    if not paths:
+        return b""
+    return host.run("tar", "-cf", "-", "--", *(shlex.quote(p) for p in paths), timeout=timeout)
+
+
+def extract_env_files(archive: bytes, dest: Path) -> List[Tuple[str, str, Path]]:
+    """Unpack a fetch_env_files tar into dest/<project>.env (0600)
+
+    Returns (project, remote path, local path) per file.
+    """
+    dest.mkdir(parents=True, exist_ok=True)
+    os.chmod(dest, 0o700)
+    if not archive:
+        return []
+    found = []
+    with tarfile.open(fileobj=io.BytesIO(archive), mode="r:") as tar:
+        for member in tar:
+            remote = "/" + member.name.lstrip("/")
+            if not member.isfile() or Path(remote).name != ".env":
+                continue
+            project = env_project(remote)
+            if not project or project in (".", ".."):
+                continue
+            local = dest / f"{project}.env"
+            fd = os.open(local, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(tar.extractfile(member).read())
+            found.append((project, remote, local))
+    return found
+
+
+def collect(host: RemoteHost, env_root: str = "/root", timeout: Optional[float] = 300) -> Dict[str, Any]:
+    """Probe and run every collector over one connection
+
+    Stage timings are in milliseconds. "remote" holds each collector's own run
+    time on the host; they overlap, so "collect" is about the slowest one plus
+    the transfer. .env files come back as {remote path: sha256}; fetch the
+    changed ones with fetch_env_files().
+    """
+    timing: Dict[str, Any] = {}
+    timing["connect"] = round(host.connect() * 1000, 1)
+    start = time.perf_counter()
+    stream = host.run("sh", "-s", "--", shlex.quote(env_root), input=COLLECTOR.encode(), timeout=timeout)
+    timing["collect"] = round((time.perf_counter() - start) * 1000, 1)
+    sections = parse_sections(stream)
+    timing["remote"] = {name: sections[name]["ms"] for name in SECTIONS}
+    timing["transfer_bytes"] = len(stream)
+    return {
+        "host": host.host,
+        "docker": section_text(sections["docker"], "docker"),
+        "services": section_text(sections["services"], "services"),
+        "nginx": section_text(sections["nginx"], "nginx"),
+        "env_files": parse_hashes(section_text(sections["envfiles"], "envfiles")),
+        "timing": timing,
+        "handshakes": host.handshakes,
+    }
+
+
+def format_timing(timing: Dict[str, Any]) -> str:
+    """One line for the terminal and the daily log"""
+    parts = [f"{stage} {timing[stage] / 1000:.2f}s" for stage in ("connect", "collect", "fetch", "extract", "encrypt")
+             if stage in timing]
+    remote = ", ".join(f"{name} {ms / 1000:.2f}s" for name, ms in timing.get("remote", {}).items())
+    return "; ".join(parts) + (f" (on host: {remote})" if remote else "")
+
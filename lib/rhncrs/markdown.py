@@ -0,0 +1,100 @@
+"""
+markdown - Lightweight parsing of vault notes (frontmatter, tags, wikilinks)
+The vault writes tags as `tags: [#type/x, #domain/y]`, which is not valid YAML
+(`#` starts a comment), so frontmatter is parsed by hand.
+"""
+
+import re
+from typing import Any, Dict, List, Tuple
+
+WIKILINK_RE = re.compile(r"!?\[\[([^\]\|#\^]*)(?:[#\^][^\]\|]*)?(?:\|[^\]]*)?\]\]")
+INLINE_TAG_RE = re.compile(r"(?<![\w/#&])#([A-Za-z][\w/\-]*)")
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$", re.MULTILINE)
+FENCE_RE = re.compile(r"^(```|~~~).*?^\1", re.MULTILINE | re.DOTALL)
+
+
+def _scalar(value: str) -> str:
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+
+def split_frontmatter(text: str) -> Tuple[str, str]:
+    """Return (frontmatter block without fences, body)"""
+    if not text.startswith("---"):
+        return "", text
+    end = text.find("\n---", 3)
+    if end == -1:
+        return "", text
+    block = text[3:end].strip("\n")
+    body_start = text.find("\n", end + 4)
+    return block, "" if body_start == -1 else text[body_start + 1:]
+
+
+def parse_frontmatter(text: str) -> Tuple[Dict[str, Any], str]:
+    """Parse simple `key: value` / `key: [a, b]` / `- item` frontmatter"""
+    block, body = split_frontmatter(text)
+    data: Dict[str, Any] = {}
+    current = None
+    for line in block.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("%"):
+            continue
+        if stripped.startswith("- ") and current is not None:
+            if not isinstance(data.get(current), list):
+                data[current] = []
+            data[current].append(_scalar(stripped[2:]))
+            continue
+        if ":" not in line or line[0].isspace():
+            continue
+        key, _, value = line.partition(":")
+        key = key.strip()
+        value = value.strip()
+        current = key
+        if value.startswith("[") and value.endswith("]"):
+            data[key] = [_scalar(v) for v in value[1:-1].split(",") if v.strip()]
+        elif value:
+            data[key] = _scalar(value)
+        else:
+            data[key] = []
+    return data, body
+
+
+def normalize_tag(tag: str) -> str:
+    return tag.strip().lstrip("#").strip().lower()
+
+
+def as_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(v) for v in value]
+    return [v for v in re.split(r"[,\s]+", str(value)) if v]
+
+
+def extract_tags(frontmatter: Dict[str, Any], body: str) -> List[str]:
+    """Frontmatter tags plus inline #tags outside code fences, normalized and deduplicated"""
+    tags = [normalize_tag(t) for t in as_list(frontmatter.get("tags"))]
+    tags += [normalize_tag(t) for t in INLINE_TAG_RE.findall(FENCE_RE.sub("", body))]
+    seen = set()
+    return [t for t in tags if t and not (t in seen or seen.add(t))]
+
+
+def extract_wikilinks(text: str) -> List[str]:
+    """Targets of [[target]], [[target|alias]] and [[target#heading]], in order, deduplicated"""
+    seen = set()
+    links = []
+    for target in WIKILINK_RE.findall(text):
+        target = target.strip()
+        if target and target not in seen:
+            seen.add(target)
+            links.append(target)
+    return links
+
+
+def extract_title(frontmatter: Dict[str, Any], body: str, fallback: str) -> str:
+    if frontmatter.get("title"):
+        return str(frontmatter["title"])
+    match = HEADING_RE.search(body)
+    return match.group(2) if match else fallback
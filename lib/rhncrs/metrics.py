@@ -0,0 +1,293 @@
+"""
+metrics - Latency histograms and counters for MCP tools and resources
+Every tool call, resource read, vault operation and subprocess is timed into a
+log-bucketed histogram (p50/p95/p99 from bucket interpolation) with call,
+error and byte counters. Optionally profiles the slowest N calls.
+"""
+
+import cProfile
+import functools
+import heapq
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from rhncrs.vault_io import atomic_write_text
+
+# Optional dependency (install with: pip install pyinstrument)
+try:
+    from pyinstrument import Profiler as Pyinstrument
+except ImportError:
+    Pyinstrument = None
+
+# Upper bounds in seconds: 100µs doubling up to ~52s, then +Inf
+BUCKETS = tuple(0.0001 * 2 ** i for i in range(20))
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """Fixed log-scale buckets; cheap to update, mergeable, Prometheus-compatible"""
+
+    __slots__ = ("counts", "count", "sum", "max", "errors", "bytes")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self.bytes = 0
+
+    def observe(self, seconds: float) -> None:
+        lo, hi = 0, len(BUCKETS)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if seconds <= BUCKETS[mid]:
+                hi = mid
+            else:
+                lo = mid + 1
+        self.counts[lo] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                value = lower + (upper - lower) * (rank - seen) / n
+                return min(value, self.max)
+            seen += n
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        ms = lambda s: round(s * 1000, 3)
+        result = {
+            "calls": self.count,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "mean_ms": ms(self.sum / self.count) if self.count else 0.0,
+            "max_ms": ms(self.max),
+        }
+        for q in QUANTILES:
+            result[f"p{int(q * 100)}_ms"] = ms(self.quantile(q))
+        return result
+
+
+class SlowCallProfiler:
+    """Profiles calls and keeps the slowest N on disk (cProfile, or pyinstrument if asked)"""
+
+    def __init__(self, directory: Path, keep: int, engine: str = "cprofile"):
+        self.directory = Path(directory)
+        self.keep = keep
+        self.engine = "pyinstrument" if engine == "pyinstrument" and Pyinstrument else "cprofile"
+        self._slowest: List[Tuple[float, str]] = []  # min-heap of (seconds, file)
+        self._lock = threading.Lock()
+        self._active = False
+        self._seq = 0
+
+    @contextmanager
+    def profile(self, kind: str, name: str) -> Iterator[None]:
+        # One profiler at a time: concurrent calls on the loop are timed but not profiled
+        with self._lock:
+            if self._active:
+                busy = True
+            else:
+                busy = False
+                self._active = True
+        if busy:
+            yield
+            return
+        if self.engine == "pyinstrument":
+            profiler = Pyinstrument(async_mode="enabled")
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if self.engine == "pyinstrument":
+                profiler.stop()
+            else:
+                profiler.disable()
+            with self._lock:
+                self._active = False
+            self._record(profiler, kind, name, elapsed)
+
+    def _record(self, profiler: Any, kind: str, name: str, elapsed: float) -> None:
+        with self._lock:
+            if len(self._slowest) >= self.keep and elapsed <= self._slowest[0][0]:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", name)[:60]
+            self._seq += 1
+            stem = f"{int(elapsed * 1000):07d}ms-{kind}-{slug}-{os.getpid()}-{self._seq}"
+            if self.engine == "pyinstrument":
+                path = self.directory / f"{stem}.txt"
+                path.write_text(profiler.output_text(unicode=True))
+            else:
+                path = self.directory / f"{stem}.prof"
+                profiler.dump_stats(str(path))
+            heapq.heappush(self._slowest, (elapsed, str(path)))
+            while len(self._slowest) > self.keep:
+                _, evicted = heapq.heappop(self._slowest)
+                try:
+                    os.unlink(evicted)
+                except OSError:
+                    pass
+
+    def slowest(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = sorted(self._slowest, reverse=True)
+        return [{"ms": round(s * 1000, 3), "profile": p} for s, p in entries]
+
+
+class Metrics:
+    """Registry of histograms keyed by (kind, name) plus free-form counters"""
+
+    def __init__(self):
+        self.started = time.time()
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._counters: Dict[str, int] = {}
+        self._sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self.profiler: Optional[SlowCallProfiler] = None
+
+    def add_source(self, name: str, fn: Callable[[], Dict[str, Any]]) -> None:
+        """Include stats kept elsewhere (e.g. a cache's hit counters) in every export"""
+        self._sources[name] = fn
+
+    def enable_profiling(self, directory: Path, keep: int, engine: str = "cprofile") -> None:
+        self.profiler = SlowCallProfiler(directory, keep, engine)
+
+    # ─── Recording ───────────────────────────────────────────
+
+    def observe(self, kind: str, name: str, seconds: float, error: bool = False, nbytes: int = 0) -> None:
+        key = (kind, name)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram()
+            hist.observe(seconds)
+            if error:
+                hist.errors += 1
+            hist.bytes += nbytes
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    @contextmanager
+    def timer(self, kind: str, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.observe(kind, name, time.perf_counter() - start, error)
+
+    def instrument(self, kind: str, label: Callable[..., str],
+                   measure: Callable[[Any], Tuple[int, bool]]) -> Callable:
+        """Decorator for async handlers: `label(*args)` names the call, `measure(result)` gives (bytes, error)"""
+
+        def decorator(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                name = label(*args, **kwargs)
+                start = time.perf_counter()
+                nbytes, error = 0, True
+                profiling = self.profiler.profile(kind, name) if self.profiler else None
+                try:
+                    if profiling is not None:
+                        with profiling:
+                            result = await fn(*args, **kwargs)
+                    else:
+                        result = await fn(*args, **kwargs)
+                    nbytes, error = measure(result)
+                    return result
+                finally:
+                    self.observe(kind, name, time.perf_counter() - start, error, nbytes)
+            return wrapper
+        return decorator
+
+    # ─── Export ──────────────────────────────────────────────
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            items = sorted(self._histograms.items())
+            counters = dict(self._counters)
+        result: Dict[str, Any] = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "uptime_s": round(time.time() - self.started, 1),
+            "counters": counters,
+        }
+        for (kind, name), hist in items:
+            result.setdefault(kind, {})[name] = hist.summary()
+        for name, fn in sorted(self._sources.items()):
+            result[name] = fn()
+        if self.profiler:
+            result["slowest_profiles"] = self.profiler.slowest()
+        return result
+
+    def prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            items = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        esc = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        lines.append("# TYPE rhncrs_call_duration_seconds histogram")
+        for (kind, name), hist in items:
+            labels = f'kind="{esc(kind)}",name="{esc(name)}"'
+            cumulative = 0
+            for bound, n in zip(BUCKETS, hist.counts):
+                cumulative += n
+                lines.append(f'rhncrs_call_duration_seconds_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+            lines.append(f'rhncrs_call_duration_seconds_bucket{{{labels},le="+Inf"}} {hist.count}')
+            lines.append(f"rhncrs_call_duration_seconds_sum{{{labels}}} {hist.sum:.6f}")
+            lines.append(f"rhncrs_call_duration_seconds_count{{{labels}}} {hist.count}")
+        lines.append("# TYPE rhncrs_call_errors_total counter")
+        for (kind, name), hist in items:
+            lines.append(f'rhncrs_call_errors_total{{kind="{esc(kind)}",name="{esc(name)}"}} {hist.errors}')
+        lines.append("# TYPE rhncrs_response_bytes_total counter")
+        for (kind, name), hist in items:
+            lines.append(f'rhncrs_response_bytes_total{{kind="{esc(kind)}",name="{esc(name)}"}} {hist.bytes}')
+        for name, value in counters:
+            metric = "rhncrs_" + re.sub(r"[^a-zA-Z0-9_]", "_", name) + "_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for source, fn in sorted(self._sources.items()):
+            for name, value in sorted(fn().items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    metric = "rhncrs_" + re.sub(r"[^a-zA-Z0-9_]", "_", f"{source}_{name}")
+                    lines.append(f"# TYPE {metric} gauge")
+                    lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: Path) -> None:
+        """Write Prometheus text (atomically) or append a JSONL snapshot, by file extension"""
+        path = Path(path)
+        if path.suffix == ".jsonl":
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "a") as f:
+                f.write(json.dumps(self.snapshot(), separators=(",", ":")) + "\n")
+        else:
+            atomic_write_text(path, self.prometheus())
@@ -0,0 +1,335 @@
+"""
+msglog - Indexed, rotating store for collab/message-log.jsonl
+A SQLite sidecar maps timestamp -> (segment, byte offset) with per-field
+postings (from/to/type/priority), so range queries seek straight to matching
+entries instead of scanning the whole log. Rotated segments keep their index
+rows; rotation only renames the segment record.
+
+Files (next to the log):
+    message-log.jsonl           active segment (appended by send_message)
+    message-log.NNNN.jsonl      rotated segments, oldest = 0001
+    message-log.idx.sqlite      offset index
+    message-log.lock            flock(2) target for appends/rotation
+"""
+
+import fcntl
+import json
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    indexed_bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS entries (
+    segment_id INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    ts TEXT,
+    sender TEXT,
+    recipient TEXT,
+    type TEXT,
+    priority TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_ts ON entries(ts);
+CREATE INDEX IF NOT EXISTS entries_sender ON entries(sender, ts);
+CREATE INDEX IF NOT EXISTS entries_recipient ON entries(recipient, ts);
+CREATE INDEX IF NOT EXISTS entries_type ON entries(type, ts);
+CREATE INDEX IF NOT EXISTS entries_priority ON entries(priority, ts);
+"""
+
+RELATIVE_RE = re.compile(r"^(\d+)\s*([smhdw])$")
+UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def parse_time(value: Optional[str]) -> Optional[str]:
+    """Accept ISO timestamps or relative ages (`90s`, `30m`, `1h`, `2d`, `1w`)"""
+    if not value:
+        return None
+    match = RELATIVE_RE.match(value.strip())
+    if match:
+        delta = timedelta(**{UNITS[match.group(2)]: int(match.group(1))})
+        return (datetime.now(timezone.utc) - delta).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return value.strip()
+
+
+def iter_records(f, start: int) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+    """Yield (offset, length, entry) from `start`; tolerates legacy pretty-printed objects.
+
+    Stops before a trailing partial record so a concurrent append is never half-indexed.
+    """
+    f.seek(start)
+    offset = start
+    buf: List[bytes] = []
+    buf_start = offset
+    for line in f:
+        if not buf:
+            buf_start = offset
+        offset += len(line)
+        if not line.endswith(b"\n"):
+            break
+        if not buf and not line.strip():
+            continue
+        buf.append(line)
+        if line.rstrip().endswith(b"}"):
+            try:
+                entry = json.loads(b"".join(buf))
+            except ValueError:
+                if len(buf) > 10000:
+                    buf = []
+                continue
+            yield buf_start, offset - buf_start, entry
+            buf = []
+
+
+class MessageLog:
+    """Append, rotate, index and query the collaboration message log"""
+
+    def __init__(self, log_path: Path, max_bytes: int = 64 * 1024 * 1024):
+        self.log_path = Path(log_path)
+        self.directory = self.log_path.parent
+        self.stem = self.log_path.name[:-len(".jsonl")] if self.log_path.name.endswith(".jsonl") \
+            else self.log_path.name
+        self.index_path = self.directory / f"{self.stem}.idx.sqlite"
+        self.lock_path = self.directory / f"{self.stem}.lock"
+        self.max_bytes = max_bytes
+        self._conn: Optional[sqlite3.Connection] = None
+        self._mutex = threading.RLock()
+
+    # ─── Plumbing ────────────────────────────────────────────
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.index_path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._mutex, open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _segment_path(self, name: str) -> Path:
+        return self.directory / name
+
+    def _rotated_names(self) -> List[str]:
+        pattern = re.compile(re.escape(self.stem) + r"\.(\d{4,})\.jsonl$")
+        names = [p.name for p in self.directory.glob(f"{self.stem}.*.jsonl") if pattern.match(p.name)]
+        return sorted(names, key=lambda n: int(pattern.match(n).group(1)))
+
+    def _segment_id(self, name: str) -> Tuple[int, int]:
+        row = self.conn.execute("SELECT id, indexed_bytes FROM segments WHERE name = ?", (name,)).fetchone()
+        if row:
+            return row[0], row[1]
+        cur = self.conn.execute("INSERT INTO segments (name) VALUES (?)", (name,))
+        return cur.lastrowid, 0
+
+    # ─── Indexing ────────────────────────────────────────────
+
+    def _index_segment(self, name: str) -> int:
+        path = self._segment_path(name)
+        if not path.exists():
+            return 0
+        seg_id, indexed = self._segment_id(name)
+        size = path.stat().st_size
+        if size < indexed:
+            # Truncated/replaced behind our back - rebuild this segment
+            self.conn.execute("DELETE FROM entries WHERE segment_id = ?", (seg_id,))
+            indexed = 0
+        if size == indexed:
+            return 0
+        rows = []
+        end = indexed
+        with open(path, "rb") as f:
+            for offset, length, entry in iter_records(f, indexed):
+                rows.append((seg_id, offset, length, entry.get("timestamp"),
+                             entry.get("from"), entry.get("to"), entry.get("type"), entry.get("priority")))
+                end = offset + length
+                if len(rows) >= 50000:
+                    self.conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                    rows = []
+        if rows:
+            self.conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self.conn.execute("UPDATE segments SET indexed_bytes = ? WHERE id = ?", (end, seg_id))
+        return end - indexed
+
+    def _index_all(self) -> int:
+        total = 0
+        for name in self._rotated_names():
+            total += self._index_segment(name)
+        return total + self._index_segment(self.log_path.name)
+
+    def sync(self) -> int:
+        """Index anything appended since the last sync; returns bytes indexed"""
+        with self._mutex:
+            conn = self.conn
+            # IMMEDIATE: another process syncing the same bytes must wait, not double-index
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                total = self._index_all()
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            return total
+
+    def reindex(self) -> int:
+        with self._locked():
+            with self.conn:
+                self.conn.execute("DELETE FROM entries")
+                self.conn.execute("DELETE FROM segments")
+            return self.sync()
+
+    # ─── Writes ──────────────────────────────────────────────
+
+    def append(self, message: str, sender: str, recipient: str,
+               type: str = "info", priority: str = "normal",
+               timestamp: Optional[str] = None, **extra: Any) -> Dict[str, Any]:
+        entry = {
+            "timestamp": timestamp or utc_now(),
+            "from": sender,
+            "to": recipient,
+            "type": type,
+            "priority": priority,
+            "message": message,
+        }
+        entry.update(extra)
+        line = (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._locked():
+            with open(self.log_path, "ab") as f:
+                f.write(line)
+            self.sync()
+            if self.log_path.stat().st_size >= self.max_bytes:
+                self._rotate_locked()
+        return entry
+
+    def rotate(self) -> Optional[str]:
+        with self._locked():
+            return self._rotate_locked()
+
+    def _rotate_locked(self) -> Optional[str]:
+        if not self.log_path.exists() or self.log_path.stat().st_size == 0:
+            return None
+        with self._mutex:
+            conn = self.conn
+            # Readers sync() without the flock, so the rename and the segment UPDATE share one
+            # IMMEDIATE transaction: a concurrent sync waits, then sees the renamed file with
+            # its existing rows instead of an unknown segment to index a second time
+            conn.execute("BEGIN IMMEDIATE")
+            renamed = None
+            try:
+                self._index_all()
+                rotated = self._rotated_names()
+                number = 1
+                if rotated:
+                    number = int(rotated[-1][len(self.stem) + 1:-len(".jsonl")]) + 1
+                new_name = f"{self.stem}.{number:04d}.jsonl"
+                renamed = self._segment_path(new_name)
+                os.rename(self.log_path, renamed)
+                # The index follows the rename: same segment id, new name
+                conn.execute("UPDATE segments SET name = ? WHERE name = ?", (new_name, self.log_path.name))
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                if renamed is not None and renamed.exists() and not self.log_path.exists():
+                    os.rename(renamed, self.log_path)
+                raise
+            return new_name
+
+    # ─── Queries ─────────────────────────────────────────────
+
+    def query(self, since: Optional[str] = None, until: Optional[str] = None,
+              sender: Optional[str] = None, recipient: Optional[str] = None,
+              type: Optional[str] = None, priority: Optional[str] = None,
+              contains: Optional[str] = None, limit: Optional[int] = None,
+              newest_first: bool = False) -> Iterator[Dict[str, Any]]:
+        """Stream matching entries in timestamp order, reading only their byte ranges"""
+        self.sync()
+        where, params = [], []
+        since, until = parse_time(since), parse_time(until)
+        if since:
+            where.append("e.ts >= ?")
+            params.append(since)
+        if until:
+            where.append("e.ts <= ?")
+            params.append(until)
+        for column, value in (("sender", sender), ("recipient", recipient), ("type", type), ("priority", priority)):
+            if value:
+                where.append(f"e.{column} = ?")
+                params.append(value)
+        order = "DESC" if newest_first else "ASC"
+        sql = ("SELECT s.name, e.offset, e.length FROM entries e JOIN segments s ON s.id = e.segment_id"
+               + (" WHERE " + " AND ".join(where) if where else "")
+               + f" ORDER BY e.ts {order}, e.segment_id {order}, e.offset {order}")
+        if limit and not contains:
+            sql += f" LIMIT {int(limit)}"
+
+        handles: Dict[str, Any] = {}
+        emitted = 0
+        needle = contains.lower() if contains else None
+        # Private read connection: the generator may be consumed slowly or from another thread
+        reader = sqlite3.connect(str(self.index_path))
+        try:
+            cursor = reader.execute(sql, params)
+            rows = cursor.fetchmany(1000)
+            while rows:
+                for name, offset, length in rows:
+                    f = handles.get(name)
+                    if f is None:
+                        try:
+                            f = handles[name] = open(self._segment_path(name), "rb")
+                        except FileNotFoundError:
+                            continue
+                    f.seek(offset)
+                    entry = json.loads(f.read(length))
+                    if needle and needle not in str(entry.get("message", "")).lower():
+                        continue
+                    yield entry
+                    emitted += 1
+                    if limit and emitted >= limit:
+                        return
+                rows = cursor.fetchmany(1000)
+        finally:
+            reader.close()
+            for f in handles.values():
+                f.close()
+
+    def stats(self) -> Dict[str, Any]:
+        self.sync()
+        with self._mutex:
+            segments = self.conn.execute(
+                "SELECT s.name, s.indexed_bytes, COUNT(e.offset), MIN(e.ts), MAX(e.ts) "
+                "FROM segments s LEFT JOIN entries e ON e.segment_id = s.id GROUP BY s.id ORDER BY s.id"
+            ).fetchall()
+        return {
+            "log": str(self.log_path),
+            "index": str(self.index_path),
+            "max_bytes": self.max_bytes,
+            "segments": [
+                {"name": n, "bytes": b, "entries": c, "first": first, "last": last}
+                for n, b, c, first, last in segments
+            ],
+            "entries": sum(s[2] for s in segments),
+        }
@@ -0,0 +1,332 @@
+"""
+project_scan - Cached, .gitignore-aware file listings for rhncrs://projects/<id>
+Ignored and heavyweight directories (node_modules, .git, hidden dirs, anything
+matched by a .gitignore) are pruned before they are entered. Each directory's
+listing is cached against its mtime, so a rescan costs one stat() per kept
+directory; with watchdog installed a clean project isn't rescanned at all.
+Only kept directories are watched (one non-recursive watch each), so pruned
+trees cost no inotify watches and their churn never dirties the scan.
+"""
+
+import fnmatch
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from rhncrs.markdown import extract_title, parse_frontmatter
+from rhncrs.watch import Watcher
+
+# Pruned regardless of .gitignore (hidden directories are always pruned too)
+PRUNE_DIRS = {"node_modules", "__pycache__", "venv", "site-packages", "bower_components"}
+
+# (base dir relative to project, compiled pattern, negated, directory-only, anchored)
+Rule = Tuple[str, "re.Pattern[str]", bool, bool, bool]
+
+
+def translate_gitignore(pattern: str) -> str:
+    """Translate one gitignore glob to a regex body (no anchors)"""
+    out, i = [], 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            close = pattern.find("]", i + 1)
+            if close < 0:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:close].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = close
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+def parse_gitignore(text: str, base: str) -> List[Rule]:
+    rules: List[Rule] = []
+    for raw in text.splitlines():
+        line = raw.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        if line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        anchored = "/" in line
+        line = line.lstrip("/")
+        rules.append((base, re.compile(translate_gitignore(line) + r"\Z"), negate, dir_only, anchored))
+    return rules
+
+
+def is_ignored(rules: Tuple[Rule, ...], rel: str, name: str, is_dir: bool) -> bool:
+    """Last matching rule wins, as in git"""
+    ignored = False
+    for base, regex, negate, dir_only, anchored in rules:
+        if dir_only and not is_dir:
+            continue
+        if anchored:
+            if base:
+                if not rel.startswith(base + "/"):
+                    continue
+                target = rel[len(base) + 1:]
+            else:
+                target = rel
+        else:
+            target = name
+        if regex.match(target):
+            ignored = not negate
+    return ignored
+
+
+def readme_summary(text: str, max_chars: int = 1200) -> Dict[str, Any]:
+    """Title, headings and the opening paragraphs of a README"""
+    frontmatter, body = parse_frontmatter(text)
+    headings = [line.lstrip("#").strip() for line in body.splitlines()
+                if line.startswith("#") and line.lstrip("#").startswith(" ")]
+    paragraphs, size = [], 0
+    for block in re.split(r"\n\s*\n", body):
+        block = block.strip()
+        if not block or block.startswith("#") or block.startswith("```"):
+            continue
+        paragraphs.append(block)
+        size += len(block)
+        if size >= max_chars:
+            break
+    summary = "\n\n".join(paragraphs)
+    return {
+        "title": extract_title(frontmatter, body, None),
+        "headings": headings[:40],
+        "summary": summary[:max_chars] + ("…" if len(summary) > max_chars else ""),
+    }
+
+
+class _Dir:
+    __slots__ = ("stamp", "rules", "files", "subdirs", "pruned")
+
+    def __init__(self, stamp, rules, files, subdirs, pruned):
+        self.stamp = stamp
+        self.rules = rules        # inherited + this directory's .gitignore
+        self.files = files        # names of kept files
+        self.subdirs = subdirs    # names of kept subdirectories
+        self.pruned = pruned      # number of subdirectories skipped
+
+
+class ProjectScan:
+    """Incrementally maintained file listing of one project directory"""
+
+    def __init__(self, root: Path, watch: bool = True):
+        self.root = Path(root)
+        self._dirs: Dict[str, _Dir] = {}
+        self._files: List[str] = []
+        self._filtered: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self._dirty = True
+        self._watcher: Optional[Watcher] = None
+        self._watch = watch
+        self.last_scan: Dict[str, Any] = {}
+
+    def _on_event(self, event_type: str, src: str, dest: Optional[str]) -> None:
+        # Hidden and always-pruned entries never reach a listing (.gitignore changes do)
+        names = [os.path.basename(p) for p in (src, dest) if p]
+        if all(n in PRUNE_DIRS or (n.startswith(".") and n != ".gitignore") for n in names):
+            return
+        self._dirty = True
+
+    @staticmethod
+    def _stamp(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            dir_mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        try:
+            ignore_mtime = os.stat(os.path.join(path, ".gitignore")).st_mtime_ns
+        except OSError:
+            ignore_mtime = 0
+        return dir_mtime, ignore_mtime
+
+    def _walk(self, rel: str, inherited: Tuple[Rule, ...], seen: Dict[str, _Dir], stats: Dict[str, int]) -> bool:
+        """Refresh `rel` and below; returns True if any listing changed"""
+        path = os.path.join(str(self.root), rel) if rel else str(self.root)
+        stamp = self._stamp(path)
+        if stamp is None:
+            return True
+        cached = self._dirs.get(rel)
+        changed = False
+        if cached is not None and cached.stamp == stamp and cached.rules[:len(inherited)] == inherited:
+            entry = cached
+            stats["cached"] += 1
+        else:
+            changed = True
+            rules = inherited
+            ignore_file = os.path.join(path, ".gitignore")
+            if stamp[1]:
+                try:
+                    with open(ignore_file, encoding="utf-8", errors="replace") as f:
+                        rules = inherited + tuple(parse_gitignore(f.read(), rel))
+                except OSError:
+                    pass
+            files, subdirs, pruned = [], [], 0
+            try:
+                entries = list(os.scandir(path))
+            except OSError:
+                entries = []
+            for e in entries:
+                name = e.name
+                child = f"{rel}/{name}" if rel else name
+                try:
+                    is_dir = e.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if is_dir:
+                    if name.startswith(".") or name in PRUNE_DIRS or is_ignored(rules, child, name, True):
+                        pruned += 1
+                    else:
+                        subdirs.append(name)
+                elif not name.startswith(".") and not is_ignored(rules, child, name, False):
+                    files.append(name)
+            entry = _Dir(stamp, rules, sorted(files), sorted(subdirs), pruned)
+            stats["scanned"] += 1
+        seen[rel] = entry
+        stats["pruned"] += entry.pruned
+        for name in entry.subdirs:
+            if self._walk(f"{rel}/{name}" if rel else name, entry.rules, seen, stats):
+                changed = True
+        return changed
+
+    def refresh(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._watch and self._watcher is None:
+                watcher = Watcher([self.root], self._on_event, recursive=False)
+                if watcher.start():
+                    self._watcher = watcher
+            if self._watcher is not None and not self._dirty and self._dirs:
+                self.last_scan = dict(self.last_scan, source="watch-cache", elapsed_ms=0.0)
+                return self.last_scan
+            # Clear before walking so events during the walk trigger another pass
+            self._dirty = False
+            start = time.perf_counter()
+            seen: Dict[str, _Dir] = {}
+            stats = {"scanned": 0, "cached": 0, "pruned": 0}
+            changed = self._walk("", (), seen, stats)
+            if changed or len(seen) != len(self._dirs):
+                self._dirs = seen
+                files = []
+                for rel in sorted(seen):
+                    prefix = f"{rel}/" if rel else ""
+                    files.extend(prefix + name for name in seen[rel].files)
+                self._files = files
+                self._filtered = {}
+            if self._watcher is not None:
+                try:
+                    added = self._watcher.watch_only(self.root / rel for rel in seen)
+                except OSError:
+                    # Out of watches: fall back to mtime rescans on every refresh
+                    self._watcher.stop()
+                    self._watcher, self._watch = None, False
+                    added = 0
+                if added:
+                    # Directories first watched now could have changed since the walk
+                    self._dirty = True
+            self.last_scan = {
+                "source": "mtime",
+                "dirs": len(seen),
+                "dirs_rescanned": stats["scanned"],
+                "dirs_pruned": stats["pruned"],
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+            }
+            return self.last_scan
+
+    def files(self, glob: str = "*") -> List[str]:
+        """Kept files whose name matches `glob` (or whose path does, if it has a slash)"""
+        with self._lock:
+            cached = self._filtered.get(glob)
+            if cached is None:
+                if glob in ("*", "**"):
+                    cached = self._files
+                elif "/" in glob:
+                    cached = [f for f in self._files if fnmatch.fnmatch(f, glob)]
+                else:
+                    cached = [f for f in self._files if fnmatch.fnmatch(f.rsplit("/", 1)[-1], glob)]
+                self._filtered[glob] = cached
+            return cached
+
+    def page(self, glob: str = "*.md", page: int = 1, per_page: int = 200) -> Dict[str, Any]:
+        """One page of matching files; only the returned entries are stat()ed"""
+        self.refresh()
+        matches = self.files(glob)
+        page = max(1, page)
+        start = (page - 1) * per_page
+        entries = []
+        for rel in matches[start:start + per_page]:
+            try:
+                st = os.stat(self.root / rel)
+            except OSError:
+                continue
+            entries.append({
+                "path": rel,
+                "size": st.st_size,
+                "mtime": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(st.st_mtime)),
+            })
+        return {
+            "glob": glob,
+            "total_files": len(matches),
+            "page": page,
+            "per_page": per_page,
+            "next_page": page + 1 if start + per_page < len(matches) else None,
+            "files": entries,
+            "scan": self.last_scan,
+        }
+
+    def stop(self) -> None:
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+
+
+class ProjectScanner:
+    """One ProjectScan per project id, created on first use"""
+
+    def __init__(self, root: Path, watch: bool = True):
+        self.root = Path(root)
+        self.watch = watch
+        self._scans: Dict[str, ProjectScan] = {}
+        self._lock = threading.Lock()
+
+    def get(self, project_id: str, path: Optional[Path] = None) -> ProjectScan:
+        root = Path(path) if path is not None else self.root / project_id
+        with self._lock:
+            scan = self._scans.get(project_id)
+            if scan is not None and scan.root != root:
+                # The registry repointed this project: drop the old scan and its watches
+                scan.stop()
+                scan = None
+            if scan is None:
+                scan = self._scans[project_id] = ProjectScan(root, self.watch)
+            return scan
+
+    def stop(self) -> None:
+        with self._lock:
+            for scan in self._scans.values():
+                scan.stop()
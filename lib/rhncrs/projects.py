@@ -0,0 +1,129 @@
+"""
+projects - Project registry shared by populate_vault.py and the MCP server
+Loads lib/projects.json, adds repos auto-discovered under PROJECT_ROOT, and
+caches the result. Reloads only when the registry file or PROJECT_ROOT's
+mtime changes, checked at most once per `check_interval`.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_REGISTRY = Path(__file__).resolve().parent.parent / "projects.json"
+
+# A directory under PROJECT_ROOT counts as a repo if it has one of these
+REPO_MARKERS = (".git", "package.json", "pyproject.toml", "README.md")
+
+
+def title_from_id(project_id: str) -> str:
+    return " ".join(part.capitalize() for part in project_id.replace("_", "-").split("-") if part)
+
+
+class ProjectRegistry:
+    """Configured + discovered projects, cached and hot-reloaded"""
+
+    def __init__(self, registry_path: Path = DEFAULT_REGISTRY, project_root: Optional[Path] = None,
+                 check_interval: float = 1.0):
+        self.registry_path = Path(registry_path)
+        self.project_root = Path(project_root) if project_root else None
+        self.check_interval = check_interval
+        self.version = 0
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._stamps: Optional[Tuple[Any, Any]] = None
+        self._checked = 0.0
+        self._config: Dict[str, Any] = {}
+        self._projects: Dict[str, Dict[str, Any]] = {}
+        self._list_json = ""
+
+    # ─── Loading ─────────────────────────────────────────────
+
+    @staticmethod
+    def _mtime(path: Optional[Path]) -> Optional[int]:
+        try:
+            return os.stat(path).st_mtime_ns if path else None
+        except OSError:
+            return None
+
+    def _discover(self, known: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        found = []
+        try:
+            entries = sorted(os.scandir(self.project_root), key=lambda e: e.name)
+        except OSError:
+            return found
+        for entry in entries:
+            if entry.name.startswith(".") or entry.name in known or not entry.is_dir():
+                continue
+            if any(os.path.exists(os.path.join(entry.path, m)) for m in REPO_MARKERS):
+                found.append({"id": entry.name, "name": title_from_id(entry.name), "discovered": True})
+        return found
+
+    def _load(self) -> None:
+        try:
+            config = json.loads(self.registry_path.read_text())
+            self.error = None
+        except FileNotFoundError:
+            config = {}
+        except json.JSONDecodeError as e:
+            # Keep serving the last good registry while the file is being edited
+            self.error = f"{self.registry_path}: {e}"
+            if self._projects:
+                return
+            config = {}
+        vault_dir = config.get("vault_projects_dir", "1_Projects")
+        projects: Dict[str, Dict[str, Any]] = {}
+        for raw in config.get("projects", []):
+            if not raw.get("id"):
+                continue
+            projects[raw["id"]] = dict(raw)
+        if self.project_root is not None and config.get("discover", True):
+            for entry in self._discover(projects):
+                projects[entry["id"]] = entry
+        for project in projects.values():
+            project.setdefault("name", title_from_id(project["id"]))
+            project.setdefault("description", "")
+            if self.project_root is not None:
+                path = Path(project.get("path", project["id"])).expanduser()
+                project["path"] = str(path if path.is_absolute() else self.project_root / path)
+            if project.get("vault_folder"):
+                project["vault_path"] = f"{vault_dir}/{project['vault_folder']}"
+        self._config = config
+        self._projects = projects
+        self._list_json = json.dumps({"projects": list(projects.values())}, indent=2)
+        self.version += 1
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reload if the registry file or the project root changed; returns True if reloaded"""
+        now = time.monotonic()
+        if not force and self._stamps is not None and now - self._checked < self.check_interval:
+            return False
+        with self._lock:
+            self._checked = now
+            stamps = (self._mtime(self.registry_path), self._mtime(self.project_root))
+            if not force and stamps == self._stamps:
+                return False
+            self._stamps = stamps
+            self._load()
+            return True
+
+    # ─── Queries (all served from the cache) ─────────────────
+
+    @property
+    def vault_projects_dir(self) -> str:
+        self.refresh()
+        return self._config.get("vault_projects_dir", "1_Projects")
+
+    def projects(self) -> Dict[str, Dict[str, Any]]:
+        self.refresh()
+        return self._projects
+
+    def get(self, project_id: str) -> Optional[Dict[str, Any]]:
+        self.refresh()
+        return self._projects.get(project_id)
+
+    def list_json(self) -> str:
+        self.refresh()
+        return self._list_json
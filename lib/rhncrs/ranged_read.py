@@ -0,0 +1,259 @@
+"""
+ranged_read - Bounded, seekable reads of vault and project files
+Reads a byte or line window with seek() and never loads more than `max_bytes`,
+so a multi-GB log costs the same memory as a short note. Binaries are detected
+from the first block before anything is decoded; truncated reads hand back an
+opaque cursor that resumes exactly where the window stopped.
+"""
+
+import base64
+import binascii
+import io
+import json
+import mimetypes
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from rhncrs.vault_io import VaultError, human_size
+
+SNIFF_BYTES = 8192
+SCAN_BLOCK = 1024 * 1024
+
+# Extensions that are text even if they contain odd bytes
+TEXT_EXTENSIONS = {".md", ".txt", ".json", ".jsonl", ".yml", ".yaml", ".toml", ".csv", ".log", ".sh", ".py"}
+
+
+class RangeError(VaultError):
+    """Bad range arguments or an unusable cursor"""
+
+
+def is_binary(head: bytes, suffix: str = "") -> bool:
+    """NUL bytes or mostly non-text bytes in the first block mean binary"""
+    if not head:
+        return False
+    if b"\x00" in head:
+        return True
+    if suffix.lower() in TEXT_EXTENSIONS:
+        return False
+    try:
+        head.decode("utf-8")
+        return False
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off by the sniff window is still text
+        if e.start >= len(head) - 3:
+            return False
+    control = sum(1 for b in head if b < 9 or 13 < b < 32)
+    return control / len(head) > 0.1
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    raw = json.dumps(state, separators=(",", ":")).encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, binascii.Error):
+        raise RangeError(f"Error: Invalid cursor: {cursor}")
+    if not isinstance(state, dict) or "o" not in state:
+        raise RangeError(f"Error: Invalid cursor: {cursor}")
+    return state
+
+
+def utf8_boundary(data: bytes) -> int:
+    """Length of `data` without a trailing partial UTF-8 sequence"""
+    for back in range(1, min(4, len(data)) + 1):
+        byte = data[-back]
+        if byte < 0x80:
+            return len(data)
+        if byte >= 0xC0:
+            need = 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+            return len(data) if back >= need else len(data) - back
+    return len(data)
+
+
+def seek_line(f, line: int) -> Tuple[int, int]:
+    """Byte offset where 1-based `line` starts, scanning in fixed blocks; returns (offset, line)"""
+    f.seek(0)
+    current, pos = 1, 0
+    while current < line:
+        block = f.read(SCAN_BLOCK)
+        if not block:
+            break
+        needed = line - current
+        count = block.count(b"\n")
+        if count < needed:
+            current += count
+            pos += len(block)
+            continue
+        idx = -1
+        for _ in range(needed):
+            idx = block.index(b"\n", idx + 1)
+        return pos + idx + 1, line
+    return pos, current
+
+
+def read_window(path: Path, offset: Optional[int] = None, length: Optional[int] = None,
+                start_line: Optional[int] = None, end_line: Optional[int] = None,
+                max_bytes: int = 256 * 1024, cursor: Optional[str] = None,
+                encoding: str = "text", cached: Optional[Tuple[os.stat_result, Optional[bytes]]] = None
+                ) -> Dict[str, Any]:
+    """Read one bounded window of `path`.
+
+    Byte mode uses offset/length, line mode uses 1-based inclusive start_line/end_line.
+    A cursor from a previous truncated read overrides both. `cached` is a (stat, bytes)
+    pair from ReadCache; when the bytes are present the file isn't opened at all.
+    """
+    if max_bytes <= 0:
+        raise RangeError("Error: max_bytes must be positive")
+    st, blob = cached if cached is not None else (path.stat(), None)
+    size = st.st_size
+    stamp = [st.st_mtime_ns, size]
+
+    end = size       # exclusive byte limit of the requested range
+    line = None      # line number at `offset` (line mode only)
+    changed = False
+    if cursor:
+        state = decode_cursor(cursor)
+        offset, end, line, end_line = state["o"], min(state.get("e", size), size), state.get("l"), state.get("el")
+        changed = state.get("s") != stamp
+    elif start_line is not None or end_line is not None:
+        if offset is not None or length is not None:
+            raise RangeError("Error: Use either offset/length or start_line/end_line, not both")
+        start_line = max(1, int(start_line or 1))
+        if end_line is not None and end_line < start_line:
+            raise RangeError("Error: end_line is before start_line")
+    else:
+        offset = max(0, int(offset or 0))
+        if offset > size:
+            raise RangeError(f"Error: offset {offset} is past the end of the file ({size} bytes)")
+        if length is not None:
+            end = min(size, offset + max(0, int(length)))
+
+    with (io.BytesIO(blob) if blob is not None else open(path, "rb")) as f:
+        head = f.read(SNIFF_BYTES)
+        binary = is_binary(head, path.suffix)
+        result: Dict[str, Any] = {
+            "size": size,
+            "binary": binary,
+            "mime": mimetypes.guess_type(path.name)[0] or ("application/octet-stream" if binary else "text/plain"),
+        }
+        if changed:
+            result["file_changed"] = True
+        if binary and encoding != "base64":
+            result.update(offset=0, end=0, truncated=False, cursor=None, text=None)
+            return result
+
+        if start_line is not None and not cursor:
+            offset, line = seek_line(f, start_line)
+        if offset > size:
+            offset = size
+
+        f.seek(offset)
+        want = max(0, min(end - offset, max_bytes))
+        if line is not None and end_line is not None:
+            # Only read as far as the last requested line
+            data = bytearray()
+            current = line
+            while len(data) < want:
+                block = f.read(min(SCAN_BLOCK, want - len(data)))
+                if not block:
+                    break
+                stop = None
+                search_from = 0
+                while current <= end_line:
+                    idx = block.find(b"\n", search_from)
+                    if idx < 0:
+                        break
+                    if current == end_line:
+                        stop = idx + 1
+                    current += 1
+                    search_from = idx + 1
+                if stop is not None:
+                    data += block[:stop]
+                    end = offset + len(data)
+                    break
+                data += block
+            data = bytes(data)
+        else:
+            data = f.read(want)
+
+    read_end = offset + len(data)
+    truncated = read_end < min(end, size)
+    if truncated and encoding != "base64":
+        cut = len(data)
+        if line is not None:
+            # Prefer to stop on a line boundary so numbering stays exact
+            newline = data.rfind(b"\n")
+            if newline >= 0:
+                cut = newline + 1
+        cut = utf8_boundary(data[:cut])
+        data = data[:cut]
+        read_end = offset + len(data)
+
+    next_line = None
+    if line is not None:
+        next_line = line + data.count(b"\n")
+        result["start_line"] = line
+        result["end_line"] = next_line - (1 if data.endswith(b"\n") or not data else 0)
+
+    result.update(offset=offset, end=read_end, truncated=truncated)
+    result["cursor"] = encode_cursor({
+        "o": read_end, "e": end, "l": next_line, "el": end_line, "s": stamp
+    }) if truncated else None
+    if encoding == "base64":
+        result["base64"] = base64.b64encode(data).decode("ascii")
+        result["text"] = None
+    else:
+        result["text"] = data.decode("utf-8", errors="replace")
+    return result
+
+
+def split_chunks(text: str, chunk_chars: int) -> List[str]:
+    """Split text into pieces of at most `chunk_chars`, preferring line breaks"""
+    if len(text) <= chunk_chars:
+        return [text]
+    chunks = []
+    start = 0
+    while start < len(text):
+        stop = min(len(text), start + chunk_chars)
+        if stop < len(text):
+            newline = text.rfind("\n", start, stop)
+            if newline > start:
+                stop = newline + 1
+        chunks.append(text[start:stop])
+        start = stop
+    return chunks
+
+
+def describe_window(rel: str, window: Dict[str, Any]) -> str:
+    """One-line footer telling the agent what it got and how to get the rest"""
+    if window["binary"] and window.get("base64") is None:
+        etag = f", etag={window['etag']}" if window.get("etag") else ""
+        return (f"[binary file {rel}: {human_size(window['size'])}, {window['mime']}{etag} - "
+                f"not shown; pass encoding=base64 with offset/length to fetch bytes]")
+    parts = [f"bytes {window['offset']}-{window['end']} of {window['size']}"]
+    if "start_line" in window:
+        parts.append(f"lines {window['start_line']}-{window['end_line']}")
+    if window.get("etag"):
+        parts.append(f"etag={window['etag']}")
+    if window.get("file_changed"):
+        parts.append("file changed since cursor was issued")
+    if window["truncated"]:
+        parts.append(f"truncated; continue with cursor={window['cursor']}")
+    return f"[{rel}: {', '.join(parts)}]"
+
+
+def resolve_under(root: Path, rel: str) -> Path:
+    """Join `rel` onto `root`, refusing absolute paths and `..` escapes (symlinks included)"""
+    rel = (rel or "").strip()
+    if not rel or os.path.isabs(rel):
+        raise RangeError(f"Error: Invalid path: {rel}")
+    base = root.resolve()
+    target = (base / rel).resolve()
+    if target != base and base not in target.parents:
+        raise RangeError(f"Error: Path escapes {root.name}: {rel}")
+    return target
@@ -0,0 +1,112 @@
+"""
+read_cache - Bounded LRU of file contents with content-hash etags
+Entries are validated against (mtime_ns, size, inode) on every lookup, so a
+note rewritten by anyone (server, shell scripts, iCloud) is never served stale.
+Small files keep their bytes in memory; larger ones only keep a weak etag
+derived from their stat stamp, so a ranged read never hashes the whole file.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+HASH_BLOCK = 1024 * 1024
+
+
+class _Entry(NamedTuple):
+    stamp: Tuple[int, int, int]
+    etag: str
+    data: Optional[bytes]
+
+
+def content_etag(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def file_etag(path: Path, limit: int) -> str:
+    """Content hash of a file; past `limit` bytes a weak etag from its stat stamp instead"""
+    st = os.stat(path)
+    if st.st_size > limit:
+        stamp = f"{st.st_mtime_ns}:{st.st_size}:{st.st_ino}".encode()
+        return "W/" + hashlib.blake2b(stamp, digest_size=16).hexdigest()
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ReadCache:
+    """Thread-safe LRU keyed by resolved path; `load()` returns (stat, bytes or None, etag)"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entry_bytes: int = 1024 * 1024,
+                 max_entries: int = 20000, hash_limit: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.max_entries = max_entries
+        self.hash_limit = hash_limit
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0, "not_modified": 0}
+
+    def load(self, path: Path) -> Tuple[os.stat_result, Optional[bytes], str]:
+        key = str(path)
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.stamp == stamp:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return st, entry.data, entry.etag
+            self._stats["stale" if entry is not None else "misses"] += 1
+
+        data = None
+        if st.st_size <= self.max_entry_bytes and self.max_bytes > 0:
+            with open(path, "rb") as f:
+                data = f.read()
+            etag = content_etag(data)
+            after = os.stat(path)
+            if (after.st_mtime_ns, after.st_size, after.st_ino) != stamp or len(data) != st.st_size:
+                # Changed while we read it: serve what we got, cache nothing
+                return after, data, etag
+        else:
+            # Not cached, so don't pay to hash it: files past the entry limit get a weak etag
+            etag = file_etag(path, min(self.hash_limit, self.max_entry_bytes))
+        self._store(key, _Entry(stamp, etag, data))
+        return st, data, etag
+
+    def _store(self, key: str, entry: _Entry) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None and old.data is not None:
+                self._bytes -= len(old.data)
+            self._entries[key] = entry
+            if entry.data is not None:
+                self._bytes += len(entry.data)
+            while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                _, evicted = self._entries.popitem(last=False)
+                if evicted.data is not None:
+                    self._bytes -= len(evicted.data)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, path: Path) -> None:
+        with self._lock:
+            old = self._entries.pop(str(path), None)
+            if old is not None and old.data is not None:
+                self._bytes -= len(old.data)
+
+    def note_not_modified(self) -> None:
+        with self._lock:
+            self._stats["not_modified"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats, entries=len(self._entries), bytes=self._bytes)
+        lookups = stats["hits"] + stats["misses"] + stats["stale"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
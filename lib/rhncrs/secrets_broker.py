@@ -0,0 +1,288 @@
+"""
+secrets_broker - Short-lived in-memory cache of decrypted secrets behind a user-only Unix socket
+Once a project has been decrypted (one unlock), decrypt-env, infra-push and
+the MCP server ask the broker for it instead of re-running age and writing
+plaintext to /tmp. Repeat lookups cost a socket round trip instead of an age
+process.
+
+Protocol: one JSON object per line each way. Each request has an "op":
+- get {project, decrypt?}
+- put {project, content}
+- keys {project, decrypt?}: key names only
+- list
+- forget {project?}
+- ping
+- stop
+
+Content travels base64-encoded. With decrypt=true a miss is filled by
+decrypting with the SSH identity, which never prompts.
+
+Safety:
+- the socket lives in a 0700 directory and is itself 0600
+- on Linux, peers with another uid are refused (SO_PEERCRED)
+- an entry lives for a fixed TTL from the moment it was unlocked; reads
+  don't extend it
+- an entry is dropped as soon as its .env.enc changes on disk
+- expired entries are overwritten before release
+- the broker exits after sitting empty for one TTL
+"""
+
+import base64
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from rhncrs.vault_secrets import SecretsError, age_decrypt, default_identity, env_keys
+
+DEFAULT_TTL = 900.0
+REAP_INTERVAL = 5.0
+MAX_REQUEST_BYTES = 4 * 1024 * 1024
+
+
+class BrokerUnavailable(Exception):
+    """Raised by BrokerClient when no broker is listening"""
+
+
+def enc_stat(path: Path) -> Optional[tuple]:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class Entry:
+    __slots__ = ("content", "expires", "stat", "unlocked")
+
+    def __init__(self, content: bytes, expires: float, stat: Optional[tuple]):
+        self.content = bytearray(content)
+        self.expires = expires
+        self.stat = stat
+        self.unlocked = time.time()
+
+    def wipe(self) -> None:
+        for i in range(len(self.content)):
+            self.content[i] = 0
+        self.content = bytearray()
+
+
+class SecretsBroker:
+    """The cache itself; SecretsBroker.serve() puts it behind the socket"""
+
+    def __init__(self, secrets_dir: Path, ttl: float = DEFAULT_TTL, identity: Optional[Path] = None):
+        self.secrets_dir = Path(secrets_dir)
+        self.ttl = ttl
+        self.identity = identity or default_identity()
+        self._entries: Dict[str, Entry] = {}
+        self._lock = threading.Lock()
+        self._idle_since = time.monotonic()
+        self._server: Optional[socketserver.BaseServer] = None
+        self.hits = self.misses = 0
+
+    def enc_path(self, project: str) -> Path:
+        if not project or "/" in project or project.startswith("."):
+            raise SecretsError(f"invalid project name: {project!r}")
+        return self.secrets_dir / f"{project}.env.enc"
+
+    def _drop(self, project: str) -> None:
+        entry = self._entries.pop(project, None)
+        if entry is not None:
+            entry.wipe()
+        if not self._entries:
+            self._idle_since = time.monotonic()
+
+    def _live(self, project: str) -> Optional[Entry]:
+        entry = self._entries.get(project)
+        if entry is None:
+            return None
+        if entry.expires <= time.monotonic() or entry.stat != enc_stat(self.enc_path(project)):
+            # Expired, or re-encrypted since it was unlocked (vault-secrets edit, infra-pull)
+            self._drop(project)
+            return None
+        return entry
+
+    def put(self, project: str, content: bytes) -> Dict[str, Any]:
+        enc = self.enc_path(project)
+        with self._lock:
+            self._drop(project)
+            self._entries[project] = Entry(content, time.monotonic() + self.ttl, enc_stat(enc))
+        return {"ok": True, "project": project, "ttl": self.ttl}
+
+    def get(self, project: str, decrypt: bool = False) -> Optional[bytes]:
+        with self._lock:
+            entry = self._live(project)
+            if entry is not None:
+                self.hits += 1
+                return bytes(entry.content)
+            self.misses += 1
+        if not decrypt:
+            return None
+        content = age_decrypt(self.enc_path(project), self.identity)
+        self.put(project, content)
+        return content
+
+    def list(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            for project in list(self._entries):
+                self._live(project)
+            entries = [{"project": p, "expires_in": round(e.expires - now, 1),
+                        "unlocked": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(e.unlocked))}
+                       for p, e in sorted(self._entries.items())]
+        return {"ok": True, "pid": os.getpid(), "ttl": self.ttl, "hits": self.hits, "misses": self.misses,
+                "cached": entries}
+
+    def forget(self, project: Optional[str] = None) -> Dict[str, Any]:
+        with self._lock:
+            names = [project] if project else list(self._entries)
+            dropped = [p for p in names if p in self._entries]
+            for p in dropped:
+                self._drop(p)
+        return {"ok": True, "forgotten": dropped}
+
+    def reap(self) -> bool:
+        """Drop expired entries; True once the broker has sat empty for a whole TTL"""
+        with self._lock:
+            for project in list(self._entries):
+                self._live(project)
+            return not self._entries and time.monotonic() - self._idle_since >= self.ttl
+
+    # ─── Socket ──────────────────────────────────────────────
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get("op")
+        project = request.get("project")
+        try:
+            if op == "ping":
+                return {"ok": True, "pid": os.getpid()}
+            elif op == "get":
+                content = self.get(project, bool(request.get("decrypt")))
+                if content is None:
+                    return {"ok": False, "miss": True}
+                return {"ok": True, "content": base64.b64encode(content).decode()}
+            elif op == "put":
+                return self.put(project, base64.b64decode(request.get("content", "")))
+            elif op == "keys":
+                content = self.get(project, bool(request.get("decrypt")))
+                if content is None:
+                    return {"ok": False, "miss": True}
+                return {"ok": True, "project": project, "keys": env_keys(content)}
+            elif op == "list":
+                return self.list()
+            elif op == "forget":
+                return self.forget(project)
+            elif op == "stop":
+                self.forget()
+                threading.Thread(target=self._server.shutdown, daemon=True).start()
+                return {"ok": True}
+            return {"ok": False, "error": f"unknown op: {op}"}
+        except SecretsError as e:
+            return {"ok": False, "error": str(e)}
+
+    def serve(self, socket_path: Path) -> None:
+        """Serve until stopped or idle; removes the socket on the way out"""
+        broker = self
+        socket_path.parent.mkdir(parents=True, exist_ok=True)
+        os.chmod(socket_path.parent, 0o700)
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                if hasattr(socket, "SO_PEERCRED"):
+                    creds = self.request.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+                    if struct.unpack("3i", creds)[1] != os.getuid():
+                        return
+                for line in iter(lambda: self.rfile.readline(MAX_REQUEST_BYTES), b""):
+                    try:
+                        reply = broker.handle(json.loads(line))
+                    except ValueError:
+                        reply = {"ok": False, "error": "bad request"}
+                    self.wfile.write((json.dumps(reply) + "\n").encode())
+                    self.wfile.flush()
+
+        class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+
+        if socket_path.exists():
+            socket_path.unlink()
+        old_umask = os.umask(0o177)
+        try:
+            self._server = Server(str(socket_path), Handler)
+        finally:
+            os.umask(old_umask)
+
+        def reaper():
+            while True:
+                time.sleep(REAP_INTERVAL)
+                if self.reap():
+                    self._server.shutdown()
+                    return
+
+        threading.Thread(target=reaper, daemon=True).start()
+        try:
+            self._server.serve_forever(poll_interval=0.5)
+        finally:
+            self.forget()
+            self._server.server_close()
+            try:
+                socket_path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class BrokerClient:
+    """One connection to the broker; every call is a single request/reply"""
+
+    def __init__(self, socket_path: Path, timeout: float = 5.0):
+        self.socket_path = Path(socket_path)
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._file = None
+
+    def _connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(str(self.socket_path))
+        except OSError as e:
+            sock.close()
+            raise BrokerUnavailable(str(e))
+        self._sock, self._file = sock, sock.makefile("rb")
+
+    def request(self, op: str, **fields: Any) -> Dict[str, Any]:
+        if self._sock is None:
+            self._connect()
+        try:
+            self._sock.sendall((json.dumps(dict(fields, op=op)) + "\n").encode())
+            line = self._file.readline()
+        except OSError as e:
+            self.close()
+            raise BrokerUnavailable(str(e))
+        if not line:
+            self.close()
+            raise BrokerUnavailable("broker closed the connection")
+        return json.loads(line)
+
+    def get(self, project: str, decrypt: bool = False) -> Optional[bytes]:
+        reply = self.request("get", project=project, decrypt=decrypt)
+        if reply.get("ok"):
+            return base64.b64decode(reply["content"])
+        if reply.get("error"):
+            raise SecretsError(reply["error"])
+        return None
+
+    def put(self, project: str, content: bytes) -> None:
+        reply = self.request("put", project=project, content=base64.b64encode(content).decode())
+        if not reply.get("ok"):
+            raise SecretsError(reply.get("error", "put failed"))
+
+    def close(self) -> None:
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+            self._sock = self._file = None
@@ -0,0 +1,178 @@
+"""
+secrets_manifest - What was last synced for every secret, so infra-pull and infra-push only move changed projects
+For each project the manifest remembers:
+- the remote .env path
+- a fingerprint of the content last synced
+- the size and mtime of the vault's <project>.env.enc right after that sync
+
+Pull compares fingerprints against the sha256 the remote collector reports;
+push compares them against a remote sha256sum. An unchanged project costs one
+hash line and is neither fetched, re-encrypted nor rewritten, so iCloud sees
+no churn. The .enc stat tells whether the vault copy was edited since (e.g.
+by vault-secrets edit) without decrypting it.
+
+The manifest never holds content hashes in the clear. A fingerprint is a
+BLAKE2b of the sha256, keyed with a random per-machine key. Both files live
+in RHNCRS_STATE_DIR, outside the synced vault, mode 0600.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import secrets
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from rhncrs.vault_io import atomic_write_text
+
+KEY_BYTES = 32
+
+# Change kinds, in report order
+NEW = "new"                    # on the VPS, never synced
+CHANGED = "changed"            # VPS copy differs from what was last synced
+CONFLICT = "conflict"          # VPS and vault copies both changed since the last sync
+LOCAL_CHANGED = "local-changed"  # vault copy edited since the last sync; infra-push it
+UNCHANGED = "unchanged"
+GONE = "gone"                  # synced before, no longer found on the VPS
+PULL_KINDS = (NEW, CHANGED, CONFLICT, LOCAL_CHANGED, UNCHANGED, GONE)
+MARKS = {NEW: "+", CHANGED: "~", CONFLICT: "!", LOCAL_CHANGED: "*", UNCHANGED: "=", GONE: "-"}
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def enc_stat(path: Path) -> Optional[Dict[str, int]]:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+class SecretsManifest:
+    """Load, diff and update the per-project sync manifest"""
+
+    def __init__(self, path: Path, secrets_dir: Path):
+        self.path = Path(path)
+        self.secrets_dir = Path(secrets_dir)
+        self.key_path = self.path.with_suffix(".key")
+        self.lock_path = self.path.with_suffix(".lock")
+        self._key: Optional[bytes] = None
+
+    # ─── Plumbing ────────────────────────────────────────────
+
+    @property
+    def key(self) -> bytes:
+        if self._key is None:
+            try:
+                self._key = bytes.fromhex(self.key_path.read_text().strip())
+            except FileNotFoundError:
+                self.key_path.parent.mkdir(parents=True, exist_ok=True)
+                key = secrets.token_bytes(KEY_BYTES)
+                fd = os.open(self.key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                with os.fdopen(fd, "w") as f:
+                    f.write(key.hex() + "\n")
+                self._key = key
+        return self._key
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def fingerprint(self, sha256: str) -> str:
+        return hashlib.blake2b(sha256.lower().encode(), key=self.key, digest_size=16).hexdigest()
+
+    def enc_path(self, project: str) -> Path:
+        return self.secrets_dir / f"{project}.env.enc"
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            return json.loads(self.path.read_text()).get("projects", {})
+        except FileNotFoundError:
+            return {}
+
+    def _save(self, projects: Dict[str, Dict[str, Any]]) -> None:
+        if not self.path.exists():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            os.close(os.open(self.path, os.O_WRONLY | os.O_CREAT, 0o600))
+        atomic_write_text(self.path, json.dumps({"version": 1, "projects": projects}, indent=2, sort_keys=True) + "\n")
+
+    # ─── Diffing ─────────────────────────────────────────────
+
+    def local_changed(self, project: str, entry: Optional[Dict[str, Any]] = None) -> bool:
+        """Has the vault copy been rewritten since it was last synced?"""
+        entry = entry if entry is not None else self.load().get(project)
+        return bool(entry) and enc_stat(self.enc_path(project)) != entry.get("enc")
+
+    def plan_pull(self, remote: Dict[str, str], force: bool = False) -> List[Dict[str, Any]]:
+        """One change entry per project, given {remote path: sha256} from the collector"""
+        manifest = self.load()
+        changes, seen = [], set()
+        for path, sha in sorted(remote.items()):
+            project = Path(path).parent.name
+            if not project or project in seen:
+                # Two .env files in same-named directories map to one secret; first one wins
+                continue
+            seen.add(project)
+            entry = manifest.get(project)
+            change = {"project": project, "remote": path, "sha256": sha}
+            if entry is None or not self.enc_path(project).exists():
+                change["kind"] = NEW
+            elif entry.get("fingerprint") != self.fingerprint(sha):
+                change["kind"] = CONFLICT if self.local_changed(project, entry) else CHANGED
+            else:
+                change["kind"] = LOCAL_CHANGED if self.local_changed(project, entry) else UNCHANGED
+            # --force: take the VPS copy even over vault edits
+            change["fetch"] = force or change["kind"] in (NEW, CHANGED)
+            changes.append(change)
+        for project, entry in sorted(manifest.items()):
+            if project not in seen and entry.get("remote"):
+                changes.append({"project": project, "remote": entry["remote"], "kind": GONE, "fetch": False})
+        return changes
+
+    def matches(self, project: str, sha256: str) -> bool:
+        """Push fast path: remote content equals the last sync and the vault copy wasn't touched since"""
+        entry = self.load().get(project)
+        return bool(entry) and entry.get("fingerprint") == self.fingerprint(sha256) \
+            and not self.local_changed(project, entry)
+
+    # ─── Writes ──────────────────────────────────────────────
+
+    def record(self, project: str, remote: str, sha256: str) -> Dict[str, Any]:
+        """Remember that the vault copy of project and the remote file now both hold content sha256"""
+        with self._locked():
+            projects = self.load()
+            entry = {
+                "remote": remote,
+                "fingerprint": self.fingerprint(sha256),
+                "enc": enc_stat(self.enc_path(project)),
+                "synced": utc_now(),
+            }
+            projects[project] = entry
+            self._save(projects)
+        return entry
+
+
+def summarize(changes: List[Dict[str, Any]]) -> str:
+    """Counts per change kind for the terminal and the daily log (1 new, 2 changed, 9 unchanged)"""
+    counts = {kind: sum(1 for c in changes if c["kind"] == kind) for kind in PULL_KINDS}
+    parts = [f"{counts[kind]} {kind}" for kind in PULL_KINDS if counts[kind]]
+    return ", ".join(parts) if parts else "none found"
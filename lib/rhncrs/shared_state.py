@@ -0,0 +1,206 @@
+"""
+shared_state - Append-only, compacted shared-state log for agent coordination
+Replaces rewriting the whole of 90_Admin/shared-state.json on every update.
+
+Files (in the state directory):
+    shared-state.jsonl           append-only log, one entry per line
+    shared-state.snapshot.json   last `retain` entries at the time of the last compaction
+    shared-state.archive.jsonl   entries compacted out of the snapshot (full history)
+    shared-state.lock            flock(2) target serialising writers across processes
+    shared-state.json            legacy whole-file state, imported once if present
+"""
+
+import fcntl
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from rhncrs.vault_io import atomic_write_text
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class SharedStateLog:
+    """Sequenced message log safe for concurrent writers (Claude, Gemini, CLI)"""
+
+    def __init__(self, directory: Path, name: str = "shared-state",
+                 compact_bytes: int = 1024 * 1024, retain: int = 500):
+        self.directory = Path(directory)
+        self.log_path = self.directory / f"{name}.jsonl"
+        self.snapshot_path = self.directory / f"{name}.snapshot.json"
+        self.archive_path = self.directory / f"{name}.archive.jsonl"
+        self.lock_path = self.directory / f"{name}.lock"
+        self.legacy_path = self.directory / f"{name}.json"
+        self.compact_bytes = compact_bytes
+        self.retain = retain
+
+        self._mutex = threading.Lock()
+        # Tail-follow cache of the log: (inode, bytes consumed, parsed entries)
+        self._log_cache: Tuple[Optional[int], int, List[Dict[str, Any]]] = (None, 0, [])
+        self._snapshot_cache: Tuple[Optional[Tuple[int, int]], Dict[str, Any]] = (None, {})
+
+    # ─── Locking & loading ───────────────────────────────────
+
+    @contextmanager
+    def _locked(self, shared: bool = False) -> Iterator[None]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._mutex, open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _snapshot(self) -> Dict[str, Any]:
+        try:
+            st = self.snapshot_path.stat()
+        except FileNotFoundError:
+            return {"last_seq": 0, "messages": []}
+        key = (st.st_ino, st.st_mtime_ns)
+        if self._snapshot_cache[0] != key:
+            self._snapshot_cache = (key, json.loads(self.snapshot_path.read_text()))
+            # A new snapshot means the log was compacted behind our back
+            self._log_cache = (None, 0, [])
+        return self._snapshot_cache[1]
+
+    def _log_entries(self) -> List[Dict[str, Any]]:
+        """Entries in the live log, reading only bytes appended since the last call"""
+        try:
+            st = self.log_path.stat()
+        except FileNotFoundError:
+            self._log_cache = (None, 0, [])
+            return []
+        inode, consumed, entries = self._log_cache
+        if inode != st.st_ino or st.st_size < consumed:
+            inode, consumed, entries = st.st_ino, 0, []
+        if st.st_size > consumed:
+            with open(self.log_path, "rb") as f:
+                f.seek(consumed)
+                chunk = f.read(st.st_size - consumed)
+            # Only consume complete lines; a writer may be mid-append
+            end = chunk.rfind(b"\n") + 1
+            entries = entries + [json.loads(line) for line in chunk[:end].splitlines() if line.strip()]
+            consumed += end
+        self._log_cache = (inode, consumed, entries)
+        return entries
+
+    def _migrate_legacy(self) -> None:
+        """Import the old whole-file shared-state.json once (caller holds the lock)"""
+        if self.snapshot_path.exists() or self.log_path.exists() or not self.legacy_path.exists():
+            return
+        try:
+            legacy = json.loads(self.legacy_path.read_text())
+        except (OSError, json.JSONDecodeError):
+            return
+        messages = []
+        for seq, msg in enumerate(legacy.get("messages", []), start=1):
+            messages.append({
+                "seq": seq,
+                "timestamp": None,
+                "legacy_timestamp": msg.get("timestamp"),
+                "from": msg.get("from"),
+                "message": msg.get("message"),
+                "data": msg.get("data", {}),
+            })
+        self._write_snapshot({"last_seq": len(messages), "messages": messages})
+
+    def _write_snapshot(self, snapshot: Dict[str, Any]) -> None:
+        atomic_write_text(self.snapshot_path, json.dumps(snapshot, indent=2))
+
+    def _last_seq(self) -> int:
+        entries = self._log_entries()
+        if entries:
+            return entries[-1]["seq"]
+        return self._snapshot().get("last_seq", 0)
+
+    # ─── Writes ──────────────────────────────────────────────
+
+    def append(self, message: str, data: Optional[Dict[str, Any]] = None,
+               author: Optional[str] = None) -> Dict[str, Any]:
+        with self._locked():
+            self._migrate_legacy()
+            entry = {
+                "seq": self._last_seq() + 1,
+                "timestamp": utc_now(),
+                "from": author,
+                "message": message,
+                "data": data or {},
+            }
+            line = json.dumps(entry, separators=(",", ":")) + "\n"
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(line)
+            if self.log_path.stat().st_size >= self.compact_bytes:
+                self._compact_locked()
+            return entry
+
+    def compact(self) -> Dict[str, int]:
+        with self._locked():
+            return self._compact_locked()
+
+    def _compact_locked(self) -> Dict[str, int]:
+        """Fold the log into the snapshot, moving overflow into the archive"""
+        log_entries = self._log_entries()
+        if not log_entries:
+            return {"archived": 0, "retained": len(self._snapshot().get("messages", []))}
+        messages = self._snapshot().get("messages", []) + log_entries
+        overflow, retained = messages[:-self.retain], messages[-self.retain:]
+        if overflow:
+            with open(self.archive_path, "a", encoding="utf-8") as f:
+                for entry in overflow:
+                    f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._write_snapshot({"last_seq": log_entries[-1]["seq"], "messages": retained})
+        # Replace (not truncate) the log so tail-following readers see a new inode
+        atomic_write_text(self.log_path, "")
+        self._log_cache = (None, 0, [])
+        return {"archived": len(overflow), "retained": len(retained)}
+
+    # ─── Reads ───────────────────────────────────────────────
+
+    def _archive_since(self, since_seq: int, before_seq: int, limit: int) -> List[Dict[str, Any]]:
+        """Up to `limit` + 1 archived entries in (since_seq, before_seq) - only for stale clients"""
+        if not self.archive_path.exists():
+            return []
+        out = []
+        with open(self.archive_path, encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                if since_seq < entry["seq"] < before_seq:
+                    out.append(entry)
+                    if len(out) > limit:
+                        break
+        return out
+
+    def read(self, since_seq: Optional[int] = None, limit: int = 50) -> Dict[str, Any]:
+        """Entries after `since_seq` (oldest first), or the latest `limit` entries if None"""
+        limit = max(1, int(limit))
+        if not (self.log_path.exists() or self.snapshot_path.exists()):
+            if not self.legacy_path.exists():
+                return {"initialized": False, "last_seq": 0, "messages": [], "has_more": False}
+            with self._locked():
+                self._migrate_legacy()
+        # Shared lock: never observe a snapshot and log from different compactions
+        with self._locked(shared=True):
+            snapshot = self._snapshot()
+            recent = snapshot.get("messages", []) + self._log_entries()
+        last_seq = recent[-1]["seq"] if recent else snapshot.get("last_seq", 0)
+
+        if since_seq is None:
+            messages = recent[-limit:]
+            has_more = bool(messages) and messages[0]["seq"] > 1
+        else:
+            first_recent = recent[0]["seq"] if recent else last_seq + 1
+            older = self._archive_since(since_seq, first_recent, limit) if since_seq + 1 < first_recent else []
+            pending = older + [e for e in recent if e["seq"] > since_seq]
+            messages = pending[:limit]
+            has_more = len(pending) > limit
+        return {
+            "initialized": True,
+            "last_seq": last_seq,
+            "messages": messages,
+            "has_more": has_more,
+        }
@@ -0,0 +1,520 @@
+"""
+taskq - Indexed task queue with leases for Gemini -> Claude delegations
+Tasks live in collab/tasks.sqlite; claims are a single IMMEDIATE transaction,
+so two agents (or two parallel delegations) can never take the same task or
+overwrite each other's result. A claim holds a lease; when it expires without
+a renew/complete the task is claimable again.
+
+The markdown handoff (collab/handoffs/<date>_Task_<id>.md) is a view,
+re-rendered from the database after every change to the task.
+"""
+
+import fcntl
+import json
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from rhncrs.context_pack import DEFAULT_BUDGET, SeenCache, build_pack, format_report
+from rhncrs.vault_io import atomic_write_text
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    created TEXT NOT NULL,
+    updated TEXT NOT NULL,
+    delegated_by TEXT NOT NULL,
+    assigned_to TEXT NOT NULL,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    reason TEXT,
+    context_files TEXT NOT NULL DEFAULT '[]',
+    context TEXT NOT NULL DEFAULT '',
+    handoff_file TEXT,
+    claimed_by TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    version INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS tasks_queue ON tasks(assigned_to, status, priority DESC, created);
+CREATE INDEX IF NOT EXISTS tasks_lease ON tasks(status, lease_expires);
+CREATE INDEX IF NOT EXISTS tasks_created ON tasks(created);
+CREATE TABLE IF NOT EXISTS task_events (
+    id INTEGER PRIMARY KEY,
+    task_id TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    author TEXT NOT NULL,
+    type TEXT NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS task_events_task ON task_events(task_id, id);
+"""
+
+STATUSES = ("pending", "in_progress", "completed", "blocked", "failed")
+FINAL_STATUSES = ("completed", "blocked", "failed")
+PRIORITIES = {"low": 0, "normal": 1, "high": 2, "urgent": 3}
+DEFAULT_LEASE = 15 * 60
+
+
+class TaskError(Exception):
+    """Unknown task, or a claim/complete that lost to another agent"""
+
+    def __init__(self, message: str, task: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.task = task
+
+
+def iso(epoch: Optional[float]) -> Optional[str]:
+    if epoch is None:
+        return None
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def priority_value(priority: Any) -> int:
+    if isinstance(priority, int):
+        return priority
+    if priority is None:
+        return PRIORITIES["normal"]
+    key = str(priority).strip().lower()
+    if key.lstrip("-").isdigit():
+        return int(key)
+    if key not in PRIORITIES:
+        raise ValueError(f"Unknown priority: {priority} (expected one of {', '.join(PRIORITIES)})")
+    return PRIORITIES[key]
+
+
+def priority_name(value: int) -> str:
+    for name, number in PRIORITIES.items():
+        if number == value:
+            return name
+    return str(value)
+
+
+def legacy_sections(handoff: Optional[str]) -> Tuple[str, str]:
+    """(context files block, response text) of a handoff written by the old delegate_task"""
+    try:
+        text = Path(handoff).read_text() if handoff else ""
+    except OSError:
+        return "", ""
+    context = text.split("\n## Context Files\n", 1)[-1].split("\n## Execution Instructions\n", 1)[0] \
+        if "\n## Context Files\n" in text else ""
+    response = text.split("\n## Response\n", 1)[1] if "\n## Response\n" in text else ""
+    response = re.sub(r"<!--.*?-->", "", response, flags=re.S).strip()
+    return context.strip(), response
+
+
+class TaskQueue:
+    """SQLite-backed delegation queue shared by the shell tools and the MCP server"""
+
+    COLUMNS = ("id", "created", "updated", "delegated_by", "assigned_to", "status", "priority",
+               "description", "reason", "context_files", "context", "handoff_file", "claimed_by",
+               "lease_expires", "attempts", "result", "version")
+
+    def __init__(self, db_path: Path, handoffs_dir: Optional[Path] = None,
+                 context_budget: int = DEFAULT_BUDGET, seen: Optional[SeenCache] = None):
+        self.db_path = Path(db_path)
+        self.handoffs_dir = Path(handoffs_dir) if handoffs_dir else None
+        self.context_budget = context_budget
+        self.seen = seen
+        self._conn: Optional[sqlite3.Connection] = None
+        self._mutex = threading.RLock()
+
+    # ─── Plumbing ────────────────────────────────────────────
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            # isolation_level=None: transactions are explicit BEGIN IMMEDIATE ... COMMIT
+            conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        with self._mutex:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _write(self, fn, *args: Any) -> Any:
+        """Run fn(conn, now, *args) in one IMMEDIATE transaction, then re-render touched handoffs"""
+        with self._mutex:
+            conn = self.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result, touched = fn(conn, time.time(), *args)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            for task_id in touched:
+                self.render(task_id)
+            return result
+
+    def _row(self, conn: sqlite3.Connection, task_id: str) -> Optional[Dict[str, Any]]:
+        row = conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return dict(zip(self.COLUMNS, row)) if row else None
+
+    @staticmethod
+    def _public(task: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Any]:
+        out = {k: v for k, v in task.items() if k != "context"}
+        out["priority"] = priority_name(task["priority"])
+        out["context_files"] = json.loads(task["context_files"] or "[]")
+        expires = task.get("lease_expires")
+        out["lease_expires"] = iso(expires)
+        if task["status"] == "in_progress" and expires is not None:
+            out["lease_expired"] = expires < (now if now is not None else time.time())
+        return out
+
+    def _update(self, conn: sqlite3.Connection, task: Dict[str, Any], now: float, **fields: Any) -> Dict[str, Any]:
+        fields["updated"] = iso(now)
+        fields["version"] = task["version"] + 1
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        conn.execute(f"UPDATE tasks SET {assignments} WHERE id = ?", (*fields.values(), task["id"]))
+        return dict(task, **fields)
+
+    @staticmethod
+    def _event(conn: sqlite3.Connection, task_id: str, now: float, author: str, type: str, message: str) -> None:
+        conn.execute("INSERT INTO task_events (task_id, ts, author, type, message) VALUES (?, ?, ?, ?, ?)",
+                     (task_id, iso(now), author, type, message))
+
+    def _owned(self, conn: sqlite3.Connection, task_id: str, agent: Optional[str], now: float,
+               expect_version: Optional[int]) -> Dict[str, Any]:
+        task = self._row(conn, task_id)
+        if task is None:
+            raise TaskError(f"Unknown task: {task_id}")
+        if expect_version is not None and task["version"] != expect_version:
+            raise TaskError(f"Task {task_id} is at version {task['version']}, not {expect_version}",
+                            self._public(task, now))
+        live_lease = task["status"] == "in_progress" and (task["lease_expires"] or 0) >= now
+        if live_lease and agent and task["claimed_by"] not in (None, agent):
+            raise TaskError(f"Task {task_id} is leased by {task['claimed_by']} until {iso(task['lease_expires'])}",
+                            self._public(task, now))
+        return task
+
+    # ─── Operations ──────────────────────────────────────────
+
+    def enqueue(self, description: str, delegated_by: str = "gemini", assigned_to: str = "claude",
+                priority: Any = "normal", reason: Optional[str] = None,
+                context_files: Optional[List[str]] = None, task_id: Optional[str] = None,
+                context_budget: Optional[int] = None) -> Dict[str, Any]:
+        """Add a pending task; the id is a timestamp, suffixed `_2`, `_3`, ... on collision.
+
+        Context files are packed into the handoff under the token budget (see context_pack).
+        """
+        if not description or not description.strip():
+            raise ValueError("Task description is required")
+        files = list(context_files or [])
+        context, report, sent = "", None, []
+        if files:
+            budget = self.context_budget if context_budget is None else context_budget
+            context, report, sent = build_pack(files, budget, description, assigned_to, self.seen)
+            context = context.rstrip("\n") + f"\n\n_{format_report(report)}_\n"
+        value = priority_value(priority)
+
+        def insert(conn, now):
+            base = task_id or datetime.fromtimestamp(now).strftime("%Y%m%d_%H%M%S")
+            new_id, n = base, 1
+            while conn.execute("SELECT 1 FROM tasks WHERE id = ?", (new_id,)).fetchone():
+                if task_id:
+                    raise TaskError(f"Task already exists: {task_id}")
+                n += 1
+                new_id = f"{base}_{n}"
+            handoff = None
+            if self.handoffs_dir is not None:
+                date = datetime.fromtimestamp(now).strftime("%Y-%m-%d")
+                handoff = str(self.handoffs_dir / f"{date}_Task_{new_id}.md")
+            created = iso(now)
+            conn.execute(
+                "INSERT INTO tasks (id, created, updated, delegated_by, assigned_to, status, priority, "
+                "description, reason, context_files, context, handoff_file) "
+                "VALUES (?, ?, ?, ?, ?, 'pending', ?, ?, ?, ?, ?, ?)",
+                (new_id, created, created, delegated_by, assigned_to, value, description.strip(),
+                 reason, json.dumps(files), context, handoff))
+            task = self._public(self._row(conn, new_id), now)
+            if report:
+                task["context_report"] = report
+            return task, [new_id]
+
+        task = self._write(insert)
+        # Only now is the context really handed off; a failed insert must not mark it as seen
+        if self.seen is not None and sent:
+            self.seen.record(assigned_to, sent)
+        return task
+
+    def claim(self, agent: str, task_id: Optional[str] = None, lease: float = DEFAULT_LEASE,
+              assigned_to: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Lease the highest-priority claimable task (pending, or in progress with an expired lease).
+
+        With `task_id`, claim that task (renewing the lease if `agent` already holds it) or raise
+        TaskError. Returns None when the queue is empty.
+        """
+        queue = assigned_to or agent
+
+        def take(conn, now):
+            if task_id:
+                task = self._row(conn, task_id)
+                if task is None:
+                    raise TaskError(f"Unknown task: {task_id}")
+                expired = task["status"] == "in_progress" and (task["lease_expires"] or 0) < now
+                if task["status"] == "in_progress" and task["claimed_by"] == agent:
+                    # Re-claiming your own task just renews the lease
+                    task = self._update(conn, task, now, lease_expires=now + lease)
+                    return self._public(task, now), []
+                if task["status"] != "pending" and not expired:
+                    raise TaskError(f"Task {task_id} is {task['status']}"
+                                    + (f" (leased by {task['claimed_by']})" if task["status"] == "in_progress" else ""),
+                                    self._public(task, now))
+            else:
+                # Two index probes instead of one OR scan: best pending task, best expired lease
+                pending = conn.execute(
+                    "SELECT id, priority, created FROM tasks WHERE assigned_to = ? AND status = 'pending' "
+                    "ORDER BY priority DESC, created LIMIT 1", (queue,)).fetchone()
+                expired = conn.execute(
+                    "SELECT id, priority, created FROM tasks WHERE status = 'in_progress' AND lease_expires < ? "
+                    "AND assigned_to = ? ORDER BY priority DESC, created LIMIT 1", (now, queue)).fetchone()
+                candidates = [c for c in (pending, expired) if c]
+                if not candidates:
+                    return None, []
+                best = min(candidates, key=lambda c: (-c[1], c[2]))
+                task = self._row(conn, best[0])
+            if task["status"] == "in_progress":
+                self._event(conn, task["id"], now, agent, "lease_expired",
+                            f"Lease held by {task['claimed_by']} expired at {iso(task['lease_expires'])}")
+            task = self._update(conn, task, now, status="in_progress", claimed_by=agent,
+                                lease_expires=now + lease, attempts=task["attempts"] + 1)
+            self._event(conn, task["id"], now, agent, "claimed", f"Claimed by {agent} (attempt {task['attempts']})")
+            return self._public(task, now), [task["id"]]
+
+        return self._write(take)
+
+    def renew(self, task_id: str, agent: str, lease: float = DEFAULT_LEASE) -> Dict[str, Any]:
+        """Extend a live lease held by `agent` (or re-take one that expired and wasn't reclaimed)"""
+        def extend(conn, now):
+            task = self._owned(conn, task_id, agent, now, None)
+            if task["status"] != "in_progress":
+                raise TaskError(f"Task {task_id} is {task['status']}", self._public(task, now))
+            task = self._update(conn, task, now, claimed_by=agent, lease_expires=now + lease)
+            return self._public(task, now), []
+
+        return self._write(extend)
+
+    def complete(self, task_id: str, agent: str, result: Optional[str] = None, status: str = "completed",
+                 expect_version: Optional[int] = None, reopen: bool = False) -> Dict[str, Any]:
+        """Finish a task (completed/blocked/failed) or release it back to pending.
+
+        Rejected if another agent holds a live lease, `expect_version` doesn't match, or the task
+        is already final (completed/blocked/failed) - pass `reopen` to change a final task.
+        """
+        if status not in FINAL_STATUSES + ("pending",):
+            raise ValueError(f"Unknown status: {status} (expected one of {', '.join(FINAL_STATUSES)}, pending)")
+
+        def finish(conn, now):
+            task = self._owned(conn, task_id, agent, now, expect_version)
+            if task["status"] in FINAL_STATUSES and not reopen:
+                raise TaskError(f"Task {task_id} is already {task['status']} (reopen to change it)",
+                                self._public(task, now))
+            fields: Dict[str, Any] = {"status": status, "lease_expires": None}
+            if status == "pending":
+                fields["claimed_by"] = None
+            else:
+                fields["claimed_by"] = task["claimed_by"] or agent
+            if result is not None:
+                fields["result"] = result
+                self._event(conn, task_id, now, agent, status, result)
+            else:
+                self._event(conn, task_id, now, agent, status, f"Marked {status} by {agent}")
+            return self._public(self._update(conn, task, now, **fields), now), [task_id]
+
+        return self._write(finish)
+
+    def respond(self, task_id: str, author: str, message: str, type: str = "response") -> Dict[str, Any]:
+        """Attach a response to a task; type `completed` also completes it"""
+        if type == "completed":
+            return self.complete(task_id, author, message)
+
+        def add(conn, now):
+            task = self._owned(conn, task_id, author, now, None)
+            self._event(conn, task_id, now, author, type, message)
+            return self._public(self._update(conn, task, now), now), [task_id]
+
+        return self._write(add)
+
+    def get(self, task_id: str, events: bool = True) -> Optional[Dict[str, Any]]:
+        with self._mutex:
+            task = self._row(self.conn, task_id)
+            if task is None:
+                return None
+            out = self._public(task)
+            if events:
+                out["events"] = self.events(task_id)
+            return out
+
+    def events(self, task_id: str) -> List[Dict[str, Any]]:
+        with self._mutex:
+            rows = self.conn.execute(
+                "SELECT ts, author, type, message FROM task_events WHERE task_id = ? ORDER BY id", (task_id,)
+            ).fetchall()
+        return [{"ts": ts, "author": author, "type": type, "message": message} for ts, author, type, message in rows]
+
+    def list(self, status: Optional[Iterable[str]] = None, assigned_to: Optional[str] = None,
+             limit: int = 50, offset: int = 0) -> Dict[str, Any]:
+        """Tasks by priority then age, plus per-status counts; `status` may be a list or comma string"""
+        if isinstance(status, str):
+            status = [s.strip() for s in status.split(",") if s.strip()]
+        where, params = [], []  # type: List[str], List[Any]
+        if status:
+            where.append(f"status IN ({', '.join('?' * len(status))})")
+            params.extend(status)
+        if assigned_to:
+            where.append("assigned_to = ?")
+            params.append(assigned_to)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        limit = max(1, min(int(limit), 1000))
+        offset = max(0, int(offset))
+        now = time.time()
+        with self._mutex:
+            conn = self.conn
+            rows = conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM tasks {clause} "
+                "ORDER BY priority DESC, created LIMIT ? OFFSET ?", (*params, limit, offset)).fetchall()
+            total = conn.execute(f"SELECT COUNT(*) FROM tasks {clause}", params).fetchone()[0]
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+        tasks = [self._public(dict(zip(self.COLUMNS, row)), now) for row in rows]
+        page: Dict[str, Any] = {"total": total, "offset": offset, "counts": counts, "tasks": tasks}
+        if offset + len(tasks) < total:
+            page["next_offset"] = offset + len(tasks)
+        return page
+
+    def import_legacy(self, tasks_dir: Path) -> int:
+        """Load pre-queue tasks/<id>.json entries (their handoff files are left as they are)"""
+        imported = 0
+        for path in sorted(Path(tasks_dir).glob("*.json")):
+            try:
+                entry = json.loads(path.read_text())
+            except (OSError, json.JSONDecodeError):
+                continue
+            task_id = str(entry.get("task_id") or path.stem)
+            status = entry.get("status") if entry.get("status") in STATUSES else "pending"
+
+            context, response = legacy_sections(entry.get("handoff_file"))
+
+            def insert(conn, now, entry=entry, task_id=task_id, status=status):
+                if conn.execute("SELECT 1 FROM tasks WHERE id = ?", (task_id,)).fetchone():
+                    return 0, []
+                created = entry.get("created") or iso(now)
+                conn.execute(
+                    "INSERT INTO tasks (id, created, updated, delegated_by, assigned_to, status, priority, "
+                    "description, reason, context_files, context, handoff_file) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (task_id, created, created, entry.get("delegated_by", "gemini"),
+                     entry.get("assigned_to", "claude"), "pending" if status == "in_progress" else status,
+                     priority_value(entry.get("priority")), entry.get("description") or "(no description)",
+                     entry.get("reason"), json.dumps(entry.get("context_files") or []), context,
+                     entry.get("handoff_file")))
+                if response:
+                    # Responses appended to the old handoff survive the first re-render
+                    conn.execute("INSERT INTO task_events (task_id, ts, author, type, message) VALUES (?, ?, ?, ?, ?)",
+                                 (task_id, created, entry.get("assigned_to", "claude"), "response", response))
+                return 1, []
+
+            imported += self._write(insert)
+        return imported
+
+    # ─── Handoff view ────────────────────────────────────────
+
+    def render(self, task_id: str) -> Optional[str]:
+        """Rewrite the task's handoff markdown from the database; returns its path
+
+        Rendering reads the row under an flock, so when two processes race the
+        last writer always renders the latest committed version.
+        """
+        if self.handoffs_dir is None:
+            return None
+        self.handoffs_dir.mkdir(parents=True, exist_ok=True)
+        with self._mutex, open(self.handoffs_dir / ".render.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                task = self._row(self.conn, task_id)
+                if task is None or not task["handoff_file"]:
+                    return None
+                atomic_write_text(Path(task["handoff_file"]), render_handoff(task, self.events(task_id)))
+                return task["handoff_file"]
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def render_handoff(task: Dict[str, Any], events: List[Dict[str, Any]]) -> str:
+    delegated_by = task["delegated_by"]
+    assigned_to = task["assigned_to"]
+    reason = task["reason"] or f"Task requires {assigned_to.capitalize()}'s capabilities"
+    lines = [
+        "---",
+        f"task_id: {task['id']}",
+        f"created: {task['created']}",
+        f"updated: {task['updated']}",
+        f"delegated_by: {delegated_by}",
+        f"assigned_to: {assigned_to}",
+        f"status: {task['status']}",
+        f"priority: {priority_name(task['priority'])}",
+    ]
+    if task["claimed_by"]:
+        lines.append(f"claimed_by: {task['claimed_by']}")
+    if task["status"] == "in_progress" and task["lease_expires"]:
+        lines.append(f"lease_expires: {iso(task['lease_expires'])}")
+    lines += [
+        f"version: {task['version']}",
+        "---",
+        "",
+        f"# Task Delegation: {task['description'].splitlines()[0]}",
+        "",
+        "## Context",
+        "",
+        f"**Delegated By:** {delegated_by.capitalize()}",
+        f"**Reason for Delegation:** {reason}",
+        f"**Created:** {task['created']}",
+        "",
+        "## Task Description",
+        "",
+        task["description"],
+        "",
+        "## Context Files",
+        "",
+        task["context"].rstrip() if task["context"] else "No context files provided.",
+        "",
+        "## Execution Instructions",
+        "",
+        "This file is generated from the task queue (collab/tasks.sqlite); edits here are overwritten.",
+        "",
+        f"- Claim: `taskq claim {assigned_to}` or the `task_claim` MCP tool",
+        f"- Respond: `respond_to_gemini \"...\" --task-id {task['id']}` (`--type completed` to finish)",
+        f"- Finish: `taskq complete {task['id']} {assigned_to} --status completed|blocked|failed --result \"...\"` or `task_complete`",
+        "",
+        "## Response",
+        "",
+    ]
+    responses = [e for e in events if e["type"] not in ("claimed", "lease_expired")]
+    if not responses:
+        lines.append(f"<!-- {assigned_to.capitalize()}: respond with respond_to_gemini --task-id {task['id']} -->")
+        lines.append("")
+    for event in responses:
+        lines += [
+            "---",
+            "",
+            f"### {event['author'].capitalize()} ({event['type']})",
+            "",
+            f"**Timestamp:** {event['ts']}",
+            "",
+            event["message"],
+            "",
+        ]
+    return "\n".join(lines)
@@ -0,0 +1,448 @@
+"""
+thread - Bounded, rotating collab/dialogues/active_thread.md
+active_thread.md only holds the current segment. Once it passes a size or
+message-count limit it is renamed to active_thread.NNNN.md and a fresh
+segment starts. A SQLite sidecar indexes every message (segment, byte offset,
+sender, type, ...), and thread-summary.md keeps a compact per-segment digest,
+so "summary + last N messages" costs the same no matter how old the thread is.
+
+Files (in dialogues/):
+    active_thread.md            current segment (appended by send_message / respond_to_gemini)
+    active_thread.NNNN.md       rotated segments, oldest = 0001
+    active_thread.idx.sqlite    message index + per-segment digests
+    active_thread.lock          flock(2) target for appends/rotation
+    thread-summary.md           rolling summary of the rotated segments
+"""
+
+import fcntl
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from rhncrs.vault_io import atomic_write_text
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    indexed_bytes INTEGER NOT NULL DEFAULT 0,
+    messages INTEGER,
+    first_ts TEXT,
+    last_ts TEXT,
+    digest TEXT
+);
+CREATE TABLE IF NOT EXISTS messages (
+    seq INTEGER PRIMARY KEY,
+    segment_id INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    ts TEXT,
+    sender TEXT,
+    recipient TEXT,
+    type TEXT,
+    priority TEXT,
+    task_id TEXT,
+    preview TEXT
+);
+CREATE INDEX IF NOT EXISTS messages_segment ON messages(segment_id, seq);
+"""
+
+SENDER_ICONS = {"gemini": "🔷", "claude": "🔶"}
+HEADER_RE = re.compile(r"^### \S+ (?P<sender>\S.*?)\s*$")
+META_RE = re.compile(r"^\*\*\[(?P<ts>[^\]]+)\]\*\* → (?P<to>[^|]+?)\s*(?:\| (?P<rest>.*))?$")
+# Messages kept per segment digest, and segment digests kept in full in the summary
+DIGEST_ITEMS = 10
+SUMMARY_SEGMENTS = 12
+PREVIEW_CHARS = 160
+HIGHLIGHT_TYPES = ("question", "request", "completed", "decision")
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def format_message(message: str, sender: str, recipient: str, type: str,
+                   timestamp: str, priority: Optional[str] = None, task_id: Optional[str] = None) -> str:
+    """The markdown block send_message/respond_to_gemini have always appended"""
+    meta = [f"**[{timestamp}]** → {recipient.capitalize()}", f"Type: {type}"]
+    if priority:
+        meta.append(f"Priority: {priority}")
+    if task_id:
+        meta.append(f"Task: {task_id}")
+    icon = SENDER_ICONS.get(sender.lower(), "🔹")
+    return f"\n### {icon} {sender.capitalize()}\n\n{' | '.join(meta)}\n\n{message.rstrip()}\n\n---\n\n"
+
+
+def parse_message(text: str) -> Dict[str, Any]:
+    """Header fields and a one-line preview of one indexed message block"""
+    lines = text.strip("\n").splitlines()
+    header = HEADER_RE.match(lines[0]) if lines else None
+    entry: Dict[str, Any] = {"sender": header.group("sender").lower() if header else None}
+    body: List[str] = []
+    for i, line in enumerate(lines[1:], 1):
+        meta = META_RE.match(line)
+        if meta:
+            entry["ts"] = meta.group("ts")
+            entry["recipient"] = meta.group("to").strip().lower()
+            for part in (meta.group("rest") or "").split("|"):
+                key, sep, value = part.partition(":")
+                if sep:
+                    entry[key.strip().lower().replace(" ", "_")] = value.strip()
+            body = lines[i + 1:]
+            break
+    while body and body[-1].strip() in ("", "---"):
+        body.pop()
+    first = next((line.strip() for line in body if line.strip()), "")
+    entry["preview"] = first[:PREVIEW_CHARS] + ("…" if len(first) > PREVIEW_CHARS else "")
+    return entry
+
+
+def iter_messages(f, start: int) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+    """Yield (offset, length, fields) for message blocks from `start`.
+
+    A block starts at a `### <icon> <Agent>` line followed by a `**[ts]** → ...` line
+    (so headings inside a message don't split it), and runs to the next block. The
+    last block is only yielded once it is closed by its `---`, so a half-written
+    append is picked up on the next sync instead.
+    """
+    f.seek(start)
+    lines: List[Tuple[int, bytes]] = []
+    offset = start
+    for line in f:
+        lines.append((offset, line))
+        offset += len(line)
+    end = offset
+
+    starts = []
+    for i, (pos, line) in enumerate(lines):
+        if not line.startswith(b"### ") or not HEADER_RE.match(line.decode("utf-8", "replace").rstrip("\n")):
+            continue
+        following = next((l for _, l in lines[i + 1:i + 4] if l.strip()), b"")
+        if META_RE.match(following.decode("utf-8", "replace").rstrip("\n")):
+            starts.append(pos)
+    for n, pos in enumerate(starts):
+        stop = starts[n + 1] if n + 1 < len(starts) else end
+        f.seek(pos)
+        text = f.read(stop - pos).decode("utf-8", errors="replace")
+        if n + 1 == len(starts) and not text.rstrip().endswith("---"):
+            return
+        yield pos, stop - pos, parse_message(text)
+
+
+class ThreadLog:
+    """Append, rotate, index, summarize and tail the active collaboration thread"""
+
+    def __init__(self, thread_path: Path, max_bytes: int = 256 * 1024, max_messages: int = 200):
+        self.thread_path = Path(thread_path)
+        self.directory = self.thread_path.parent
+        self.stem = self.thread_path.stem
+        self.index_path = self.directory / f"{self.stem}.idx.sqlite"
+        self.lock_path = self.directory / f"{self.stem}.lock"
+        self.summary_path = self.directory / "thread-summary.md"
+        self.max_bytes = max_bytes
+        self.max_messages = max_messages
+        self._conn: Optional[sqlite3.Connection] = None
+        self._mutex = threading.RLock()
+
+    # ─── Plumbing ────────────────────────────────────────────
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.index_path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._mutex, open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _rotated_names(self) -> List[str]:
+        pattern = re.compile(re.escape(self.stem) + r"\.(\d{4,})\.md$")
+        names = [p.name for p in self.directory.glob(f"{self.stem}.*.md") if pattern.match(p.name)]
+        return sorted(names, key=lambda n: int(pattern.match(n).group(1)))
+
+    def _segment_id(self, name: str) -> Tuple[int, int]:
+        row = self.conn.execute("SELECT id, indexed_bytes FROM segments WHERE name = ?", (name,)).fetchone()
+        if row:
+            return row[0], row[1]
+        cur = self.conn.execute("INSERT INTO segments (name) VALUES (?)", (name,))
+        return cur.lastrowid, 0
+
+    # ─── Indexing ────────────────────────────────────────────
+
+    def _index_segment(self, name: str) -> int:
+        path = self.directory / name
+        if not path.exists():
+            return 0
+        seg_id, indexed = self._segment_id(name)
+        size = path.stat().st_size
+        if size < indexed:
+            # Truncated/replaced behind our back - rebuild this segment
+            self.conn.execute("DELETE FROM messages WHERE segment_id = ?", (seg_id,))
+            indexed = 0
+        if size == indexed:
+            return 0
+        rows = []
+        end = indexed
+        with open(path, "rb") as f:
+            for offset, length, entry in iter_messages(f, indexed):
+                rows.append((seg_id, offset, length, entry.get("ts"), entry.get("sender"), entry.get("recipient"),
+                             entry.get("type"), entry.get("priority"), entry.get("task"), entry.get("preview")))
+                end = offset + length
+        if rows:
+            self.conn.executemany(
+                "INSERT INTO messages (segment_id, offset, length, ts, sender, recipient, type, priority, "
+                "task_id, preview) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.execute("UPDATE segments SET indexed_bytes = ? WHERE id = ?", (end, seg_id))
+        return end - indexed
+
+    def sync(self) -> int:
+        """Index messages appended since the last sync (including by older scripts); returns bytes indexed"""
+        with self._mutex:
+            conn = self.conn
+            # Only the active segment grows; rotated ones were indexed before their rename
+            active = conn.execute("SELECT indexed_bytes FROM segments WHERE name = ?",
+                                  (self.thread_path.name,)).fetchone()
+            try:
+                size = self.thread_path.stat().st_size
+            except FileNotFoundError:
+                return 0
+            if active and active[0] == size:
+                return 0
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                total = self._index_segment(self.thread_path.name)
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            return total
+
+    def reindex(self) -> int:
+        with self._locked():
+            with self.conn:
+                self.conn.execute("DELETE FROM messages")
+                self.conn.execute("DELETE FROM segments")
+            total = 0
+            with self.conn:
+                for name in self._rotated_names():
+                    total += self._index_segment(name)
+                    self._store_digest(name)
+                total += self._index_segment(self.thread_path.name)
+            self._write_summary()
+            return total
+
+    # ─── Writes ──────────────────────────────────────────────
+
+    def append(self, message: str, sender: str, recipient: str, type: str = "info",
+               priority: Optional[str] = None, task_id: Optional[str] = None,
+               timestamp: Optional[str] = None) -> Dict[str, Any]:
+        timestamp = timestamp or utc_now()
+        block = format_message(message, sender, recipient, type, timestamp, priority, task_id)
+        with self._locked():
+            if not self.thread_path.exists():
+                self._start_segment(timestamp)
+            with open(self.thread_path, "ab") as f:
+                f.write(block.encode("utf-8"))
+            self.sync()
+            rotated = self._maybe_rotate()
+        entry = {"timestamp": timestamp, "from": sender, "to": recipient, "type": type,
+                 "thread": str(self.thread_path)}
+        if rotated:
+            entry["rotated_to"] = rotated
+        return entry
+
+    def _start_segment(self, timestamp: str, previous: Optional[str] = None) -> None:
+        header = f"# Active Collaboration Thread\n\n**Started:** {timestamp}\n"
+        if previous:
+            header += f"**Continues:** {previous} (digest in {self.summary_path.name})\n"
+        atomic_write_text(self.thread_path, header + "\n---\n\n")
+
+    def _maybe_rotate(self) -> Optional[str]:
+        size = self.thread_path.stat().st_size
+        if size < self.max_bytes:
+            row = self.conn.execute(
+                "SELECT COUNT(*) FROM messages m JOIN segments s ON s.id = m.segment_id WHERE s.name = ?",
+                (self.thread_path.name,)).fetchone()
+            if row[0] < self.max_messages:
+                return None
+        return self._rotate_locked()
+
+    def rotate(self) -> Optional[str]:
+        with self._locked():
+            return self._rotate_locked()
+
+    def _rotate_locked(self) -> Optional[str]:
+        if not self.thread_path.exists():
+            return None
+        self.sync()
+        seg_id, _ = self._segment_id(self.thread_path.name)
+        if not self.conn.execute("SELECT 1 FROM messages WHERE segment_id = ? LIMIT 1", (seg_id,)).fetchone():
+            return None
+        rotated = self._rotated_names()
+        number = int(rotated[-1][len(self.stem) + 1:-len(".md")]) + 1 if rotated else 1
+        new_name = f"{self.stem}.{number:04d}.md"
+        os.rename(self.thread_path, self.directory / new_name)
+        # The index follows the rename: same segment id, new name
+        with self.conn:
+            self.conn.execute("UPDATE segments SET name = ? WHERE id = ?", (new_name, seg_id))
+            self._store_digest(new_name)
+        self._write_summary()
+        self._start_segment(utc_now(), new_name)
+        return new_name
+
+    # ─── Summary ─────────────────────────────────────────────
+
+    def _store_digest(self, name: str) -> None:
+        """Compute a rotated segment's digest once; the summary is assembled from these"""
+        seg_id, _ = self._segment_id(name)
+        conn = self.conn
+        count, first, last = conn.execute(
+            "SELECT COUNT(*), MIN(ts), MAX(ts) FROM messages WHERE segment_id = ?", (seg_id,)).fetchone()
+        senders = conn.execute("SELECT sender, COUNT(*) FROM messages WHERE segment_id = ? GROUP BY sender "
+                               "ORDER BY COUNT(*) DESC", (seg_id,)).fetchall()
+        types = conn.execute("SELECT type, COUNT(*) FROM messages WHERE segment_id = ? GROUP BY type "
+                             "ORDER BY COUNT(*) DESC", (seg_id,)).fetchall()
+        marks = ", ".join("?" * len(HIGHLIGHT_TYPES))
+        highlights = conn.execute(
+            f"SELECT * FROM (SELECT seq, ts, sender, type, priority, task_id, preview FROM messages "
+            f"WHERE segment_id = ? AND (type IN ({marks}) OR priority = 'high') ORDER BY seq DESC LIMIT ?) "
+            "ORDER BY seq", (seg_id, *HIGHLIGHT_TYPES, DIGEST_ITEMS)).fetchall()
+        lines = [
+            f"### {name} · {first} → {last}",
+            "",
+            f"{count} messages ({', '.join(f'{s} {n}' for s, n in senders)}) · "
+            + ", ".join(f"{t} {n}" for t, n in types),
+        ]
+        if highlights:
+            lines.append("")
+        for seq, ts, sender, type, priority, task_id, preview in highlights:
+            mark = "✓" if type == "completed" else ("❗" if priority == "high" else "❓")
+            task = f" (task {task_id})" if task_id else ""
+            lines.append(f"- {mark} #{seq} {ts} {sender} [{type}]{task}: {preview}")
+        conn.execute("UPDATE segments SET messages = ?, first_ts = ?, last_ts = ?, digest = ? WHERE id = ?",
+                     (count, first, last, "\n".join(lines) + "\n", seg_id))
+
+    def _write_summary(self) -> None:
+        # Rotated segments only, from their stored digests: O(segments), never O(messages)
+        rows = self.conn.execute(
+            "SELECT name, digest, messages, first_ts, last_ts FROM segments "
+            "WHERE digest IS NOT NULL AND messages > 0 ORDER BY id").fetchall()
+        if not rows:
+            return
+        older, recent = rows[:-SUMMARY_SEGMENTS], rows[-SUMMARY_SEGMENTS:]
+        total = sum(r[2] for r in rows)
+        lines = [
+            "# Thread Summary",
+            "",
+            f"**Updated:** {utc_now()}",
+            f"**Archived:** {len(rows)} segments, {total} messages ({rows[0][3]} → {rows[-1][4]})",
+            "",
+        ]
+        if older:
+            lines += [
+                "## Earlier",
+                "",
+                f"{len(older)} segments ({older[0][0]} … {older[-1][0]}), {sum(r[2] for r in older)} messages, "
+                f"{older[0][3]} → {older[-1][4]}. Query them with `msglog query` or `collab-thread tail --before`.",
+                "",
+            ]
+        lines += ["## Segments", ""]
+        lines += [digest for _, digest, _, _, _ in recent if digest]
+        atomic_write_text(self.summary_path, "\n".join(lines).rstrip("\n") + "\n")
+
+    def summary(self) -> str:
+        try:
+            return self.summary_path.read_text()
+        except FileNotFoundError:
+            return ""
+
+    # ─── Queries ─────────────────────────────────────────────
+
+    def tail(self, last: int = 20, before: Optional[int] = None) -> Dict[str, Any]:
+        """The newest `last` messages (older than seq `before`), read by offset from their segments"""
+        self.sync()
+        last = max(1, min(int(last), 500))
+        where, params = "", []  # type: str, List[Any]
+        if before is not None:
+            where, params = "WHERE m.seq < ?", [int(before)]
+        with self._mutex:
+            rows = self.conn.execute(
+                f"SELECT m.seq, s.name, m.offset, m.length, m.ts, m.sender, m.type FROM messages m "
+                f"JOIN segments s ON s.id = m.segment_id {where} ORDER BY m.seq DESC LIMIT ?",
+                (*params, last)).fetchall()
+            total = self.conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        messages = []
+        handles: Dict[str, Any] = {}
+        try:
+            for seq, name, offset, length, ts, sender, type in reversed(rows):
+                f = handles.get(name)
+                if f is None:
+                    try:
+                        f = handles[name] = open(self.directory / name, "rb")
+                    except FileNotFoundError:
+                        continue
+                f.seek(offset)
+                text = f.read(length).decode("utf-8", errors="replace").strip("\n")
+                messages.append({"seq": seq, "segment": name, "ts": ts, "from": sender, "type": type, "text": text})
+        finally:
+            for f in handles.values():
+                f.close()
+        page: Dict[str, Any] = {"total": total, "messages": messages}
+        if rows and rows[-1][0] > 1:
+            page["before"] = rows[-1][0]
+        return page
+
+    def render_tail(self, last: int = 20, before: Optional[int] = None, summary: bool = True) -> str:
+        """Summary + last N messages as one markdown document (the rhncrs://collab/thread resource)"""
+        page = self.tail(last, before)
+        parts = []
+        if summary and before is None:
+            digest = self.summary()
+            if digest:
+                parts.append(digest.rstrip("\n") + "\n\n---\n")
+        shown = page["messages"]
+        heading = f"# Last {len(shown)} of {page['total']} messages"
+        if shown:
+            heading += f" (#{shown[0]['seq']}–#{shown[-1]['seq']})"
+        parts.append(heading + "\n")
+        parts += [m["text"] + "\n" for m in shown]
+        if page.get("before"):
+            parts.append(f"_Older: ?last={last}&before={page['before']}_\n")
+        return "\n".join(parts)
+
+    def stats(self) -> Dict[str, Any]:
+        self.sync()
+        with self._mutex:
+            segments = self.conn.execute(
+                "SELECT s.name, s.indexed_bytes, COUNT(m.seq), MIN(m.ts), MAX(m.ts) "
+                "FROM segments s LEFT JOIN messages m ON m.segment_id = s.id GROUP BY s.id ORDER BY s.id"
+            ).fetchall()
+        return {
+            "thread": str(self.thread_path),
+            "index": str(self.index_path),
+            "summary": str(self.summary_path),
+            "max_bytes": self.max_bytes,
+            "max_messages": self.max_messages,
+            "segments": [
+                {"name": n, "bytes": b, "messages": c, "first": first, "last": last}
+                for n, b, c, first, last in segments
+            ],
+            "messages": sum(s[2] for s in segments),
+        }
@@ -0,0 +1,295 @@
+"""
+vault_batch - Run an ordered list of vault operations in one MCP call
+Operations on unrelated paths run concurrently; anything touching the same
+path (or a parent/child of it) keeps its order. With atomic=True all
+mutations are validated and staged first, then applied together and rolled
+back if any step fails.
+"""
+
+import asyncio
+import os
+import posixpath
+import shutil
+import stat
+import tempfile
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from rhncrs.vault_io import NEW_FILE_MODE, VaultError, VaultIO
+
+OPS = ("read", "write", "list", "exists", "mkdir", "mv", "rm")
+MUTATING = ("write", "mkdir", "mv", "rm")
+MAX_OPS = 500
+
+
+class BatchError(VaultError):
+    """The batch itself is malformed (nothing was run)"""
+
+
+def normalize(rel: Any) -> str:
+    rel = posixpath.normpath(str(rel or ".").strip())
+    return "." if rel in ("", "/") else rel
+
+
+def op_paths(op: Dict[str, Any]) -> List[str]:
+    if op["op"] == "mv":
+        return [normalize(op.get("path")), normalize(op.get("dest"))]
+    return [normalize(op.get("path"))]
+
+
+def overlaps(a: str, b: str) -> bool:
+    return a == b or a == "." or b == "." or a.startswith(b + "/") or b.startswith(a + "/")
+
+
+def validate(ops: Any) -> List[Dict[str, Any]]:
+    if not isinstance(ops, list) or not ops:
+        raise BatchError("Error: ops must be a non-empty list")
+    if len(ops) > MAX_OPS:
+        raise BatchError(f"Error: at most {MAX_OPS} operations per batch")
+    for i, op in enumerate(ops):
+        if not isinstance(op, dict) or op.get("op") not in OPS:
+            raise BatchError(f"Error: op #{i}: expected one of {', '.join(OPS)}")
+        if op["op"] != "list" and not op.get("path"):
+            raise BatchError(f"Error: op #{i} ({op['op']}): path is required")
+        if op["op"] == "write" and not isinstance(op.get("content"), str):
+            raise BatchError(f"Error: op #{i} (write): content must be a string")
+        if op["op"] == "mv" and not op.get("dest"):
+            raise BatchError(f"Error: op #{i} (mv): dest is required")
+    return ops
+
+
+def dependencies(ops: List[Dict[str, Any]]) -> List[List[int]]:
+    """For each op, the earlier ops it must wait for (same/overlapping path, one side mutating)"""
+    paths = [op_paths(op) for op in ops]
+    deps: List[List[int]] = []
+    for i, op in enumerate(ops):
+        mine = []
+        for j in range(i):
+            if op["op"] not in MUTATING and ops[j]["op"] not in MUTATING:
+                continue
+            if any(overlaps(a, b) for a in paths[i] for b in paths[j]):
+                mine.append(j)
+        deps.append(mine)
+    return deps
+
+
+def result_entry(index: int, op: Dict[str, Any], ok: bool, result: Any) -> Dict[str, Any]:
+    entry = {"index": index, "op": op["op"], "path": op.get("path"), "ok": ok}
+    if op["op"] == "mv":
+        entry["dest"] = op.get("dest")
+    entry["result" if ok else "error"] = result
+    return entry
+
+
+RunOp = Callable[[Dict[str, Any]], Awaitable[Tuple[bool, Any]]]
+
+
+async def run_concurrent(ops: List[Dict[str, Any]], run_op: RunOp, limit: int = 16,
+                         skip: Optional[List[bool]] = None) -> List[Optional[Dict[str, Any]]]:
+    """Run ops as a dependency DAG; `skip[i]` leaves op i out (its dependents still run)"""
+    deps = dependencies(ops)
+    done = [asyncio.Event() for _ in ops]
+    results: List[Optional[Dict[str, Any]]] = [None] * len(ops)
+    gate = asyncio.Semaphore(max(1, limit))
+
+    async def run(i: int) -> None:
+        try:
+            for j in deps[i]:
+                await done[j].wait()
+            if skip and skip[i]:
+                return
+            async with gate:
+                try:
+                    ok, result = await run_op(ops[i])
+                except (VaultError, ValueError) as e:
+                    ok, result = False, str(e)
+                except OSError as e:
+                    ok, result = False, f"Error: {e.strerror or e}"
+            results[i] = result_entry(i, ops[i], ok, result)
+        finally:
+            done[i].set()
+
+    await asyncio.gather(*(run(i) for i in range(len(ops))))
+    return results
+
+
+class Transaction:
+    """All-or-nothing application of write/mkdir/mv/rm against a VaultIO root"""
+
+    def __init__(self, vault: VaultIO):
+        self.vault = vault
+        self._staged: Dict[int, str] = {}         # op index -> temp file holding new content
+        self._created_dirs: List[Path] = []       # directories we made (removed on abort)
+        self._undo: List[Callable[[], None]] = []
+        self._finalize: List[Callable[[], None]] = []
+
+    def _mkdirs(self, path: Path) -> None:
+        missing = []
+        while not path.exists():
+            missing.append(path)
+            path = path.parent
+        for directory in reversed(missing):
+            directory.mkdir()
+            self._created_dirs.append(directory)
+
+    def _temp_name(self, target: Path, tag: str) -> str:
+        fd, name = tempfile.mkstemp(prefix=f".{target.name}.", suffix=f".{tag}.tmp", dir=str(target.parent))
+        os.close(fd)
+        return name
+
+    def stage(self, ops: List[Dict[str, Any]]) -> None:
+        """Resolve every path and write new contents to temp files; raises before touching targets"""
+        root = self.vault.root.resolve()
+        for i, op in enumerate(ops):
+            kind = op["op"]
+            if kind not in MUTATING:
+                continue
+            for rel in op_paths(op):
+                if self.vault.resolve(rel) == root and kind in ("rm", "mv"):
+                    raise VaultError(f"Error: op #{i}: refusing to {kind} the vault root")
+            if kind == "write":
+                target = self.vault.resolve(op["path"])
+                if target.is_dir():
+                    raise VaultError(f"Error: op #{i}: path is a directory: {op['path']}")
+                self._mkdirs(target.parent)
+                content = op["content"] if op["content"].endswith("\n") else op["content"] + "\n"
+                name = self._temp_name(target, "stage")
+                self._staged[i] = name
+                with open(name, "w", encoding="utf-8") as f:
+                    f.write(content)
+
+    def _write(self, i: int, op: Dict[str, Any]) -> None:
+        target = self.vault.resolve(op["path"])
+        staged = self._staged.pop(i)
+        os.chmod(staged, stat.S_IMODE(target.stat().st_mode) if target.exists() else NEW_FILE_MODE)
+        if target.exists():
+            backup = self._temp_name(target, "bak")
+            os.replace(target, backup)
+            self._undo.append(lambda: os.replace(backup, target))
+            self._finalize.append(lambda: os.unlink(backup))
+        else:
+            self._undo.append(lambda: os.unlink(target))
+        os.replace(staged, target)
+
+    def _mv(self, i: int, op: Dict[str, Any]) -> None:
+        src, dest = self.vault.resolve(op["path"]), self.vault.resolve(op["dest"])
+        if not src.exists():
+            raise VaultError(f"Error: op #{i}: source does not exist: {op['path']}")
+        if dest.exists():
+            raise VaultError(f"Error: op #{i}: destination exists: {op['dest']}")
+        self._mkdirs(dest.parent)
+        os.rename(src, dest)
+        self._undo.append(lambda: os.rename(dest, src))
+
+    def _rm(self, i: int, op: Dict[str, Any]) -> None:
+        target = self.vault.resolve(op["path"])
+        if not target.exists():
+            raise VaultError(f"Error: op #{i}: file does not exist: {op['path']}")
+        # Park it under a temp name; only deleted once the whole batch has succeeded
+        trash = self._temp_name(target, "rm")
+        os.unlink(trash)
+        os.rename(target, trash)
+        self._undo.append(lambda: os.rename(trash, target))
+        self._finalize.append(lambda: shutil.rmtree(trash) if os.path.isdir(trash) else os.unlink(trash))
+
+    def commit(self, ops: List[Dict[str, Any]]) -> Dict[int, str]:
+        """Apply all mutations in order; on any failure undo everything and re-raise"""
+        messages: Dict[int, str] = {}
+        try:
+            for i, op in enumerate(ops):
+                kind = op["op"]
+                if kind == "write":
+                    self._write(i, op)
+                    messages[i] = f"✓ Written: {op['path']}"
+                elif kind == "mkdir":
+                    self._mkdirs(self.vault.resolve(op["path"]))
+                    messages[i] = f"✓ Created: {op['path']}"
+                elif kind == "mv":
+                    self._mv(i, op)
+                    messages[i] = f"✓ Moved: {op['path']} → {op['dest']}"
+                elif kind == "rm":
+                    self._rm(i, op)
+                    messages[i] = f"✓ Removed: {op['path']}"
+        except BaseException:
+            self.abort()
+            raise
+        for fn in self._finalize:
+            try:
+                fn()
+            except OSError:
+                pass
+        return messages
+
+    def abort(self) -> None:
+        for fn in reversed(self._undo):
+            try:
+                fn()
+            except OSError:
+                pass
+        self._undo = []
+        for name in self._staged.values():
+            try:
+                os.unlink(name)
+            except OSError:
+                pass
+        self._staged = {}
+        for directory in reversed(self._created_dirs):
+            try:
+                directory.rmdir()
+            except OSError:
+                pass
+        self._created_dirs = []
+
+
+def apply_atomic(vault: VaultIO, ops: List[Dict[str, Any]]) -> Dict[int, str]:
+    """Stage then commit every mutation in `ops`; raises VaultError/OSError with nothing applied"""
+    txn = Transaction(vault)
+    try:
+        txn.stage(ops)
+    except BaseException:
+        txn.abort()
+        raise
+    return txn.commit(ops)
+
+
+async def run_batch(vault: VaultIO, ops: List[Dict[str, Any]], run_op: RunOp,
+                    atomic: bool = False, limit: int = 16) -> Dict[str, Any]:
+    """Execute a batch; returns {"ok", "atomic", "results"} with one entry per op, in order"""
+    validate(ops)
+    if not atomic:
+        results = await run_concurrent(ops, run_op, limit)
+        return {"ok": all(r["ok"] for r in results), "atomic": False, "results": results}
+
+    for i, op in enumerate(ops):
+        if op["op"] == "write" and op.get("mode") not in (None, "overwrite"):
+            raise BatchError(f"Error: op #{i}: atomic batches only support whole-file writes (mode: overwrite)")
+
+    # Reads that precede any overlapping mutation see the pre-batch state; the rest run after commit
+    deps = dependencies(ops)
+    post = [op["op"] not in MUTATING and any(ops[j]["op"] in MUTATING for j in deps[i])
+            for i, op in enumerate(ops)]
+    pre = [op["op"] in MUTATING or post[i] for i, op in enumerate(ops)]
+    results = await run_concurrent(ops, run_op, limit, skip=pre)
+
+    loop = asyncio.get_running_loop()
+    try:
+        messages = await loop.run_in_executor(None, apply_atomic, vault, ops)
+        committed = True
+    except (VaultError, OSError) as e:
+        messages, committed = {}, False
+        reason = str(e) if isinstance(e, VaultError) else f"Error: {e.strerror or e}"
+    for i, op in enumerate(ops):
+        if op["op"] in MUTATING:
+            results[i] = result_entry(i, op, True, messages[i]) if committed \
+                else result_entry(i, op, False, f"Not applied (batch rolled back): {reason}")
+
+    if committed:
+        after = await run_concurrent(ops, run_op, limit, skip=[not p for p in post])
+        for i, entry in enumerate(after):
+            if entry is not None:
+                results[i] = entry
+    else:
+        for i, op in enumerate(ops):
+            if post[i]:
+                results[i] = result_entry(i, op, False, "Not run: batch rolled back")
+    return {"ok": committed and all(r["ok"] for r in results), "atomic": True, "results": results}
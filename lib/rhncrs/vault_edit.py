@@ -0,0 +1,205 @@
+"""
+vault_edit - In-place note edits for vault_write: append, unified-diff patch,
+section replace (by heading or frontmatter field)
+Each edit is a pure text transform `(current text or None) -> (new text, message)`;
+VaultIO.edit applies them through its per-file write coalescer.
+"""
+
+import re
+from typing import Callable, List, Optional, Tuple
+
+from rhncrs.markdown import HEADING_RE
+from rhncrs.vault_io import VaultError
+
+MODES = ("overwrite", "append", "patch", "section")
+
+HUNK_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+FENCE_LINE_RE = re.compile(r"^\s*(```|~~~)")
+
+Edit = Callable[[Optional[str]], Tuple[str, str]]
+
+
+class EditError(VaultError):
+    """An edit does not apply to the current file (nothing was written)"""
+
+
+def _lines(text: Optional[str]) -> List[str]:
+    return (text or "").splitlines()
+
+
+def _join(lines: List[str]) -> str:
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+# ─── Append ──────────────────────────────────────────────────
+
+def append_text(text: Optional[str], content: str) -> str:
+    if not text:
+        return content
+    return text + ("" if text.endswith("\n") else "\n") + content
+
+
+# ─── Unified diff ────────────────────────────────────────────
+
+def parse_hunks(diff: str) -> List[Tuple[int, List[str], List[str]]]:
+    """Hunks as (old start line, old lines, new lines); file headers are ignored"""
+    hunks: List[Tuple[int, List[str], List[str]]] = []
+    current = None
+    for line in diff.splitlines():
+        match = HUNK_RE.match(line)
+        if match:
+            current = (int(match.group(1)), [], [])
+            hunks.append(current)
+            continue
+        if current is None or line.startswith("\\"):
+            continue  # ---/+++/diff/index headers, "\ No newline at end of file"
+        tag, body = (line[0], line[1:]) if line else (" ", "")
+        if tag == " ":
+            current[1].append(body)
+            current[2].append(body)
+        elif tag == "-":
+            current[1].append(body)
+        elif tag == "+":
+            current[2].append(body)
+        else:
+            raise EditError(f"Error: Malformed patch line: {line[:80]}")
+    if not hunks:
+        raise EditError("Error: Patch contains no @@ hunks")
+    return hunks
+
+
+def _find_block(lines: List[str], block: List[str], expected: int, floor: int) -> int:
+    """Index of `block` in `lines` at or after `floor`, nearest to `expected` first"""
+    last = len(lines) - len(block)
+    expected = min(max(expected, floor), max(last, floor))
+    for distance in range(0, max(last - floor, 0) + 1):
+        for start in (expected - distance, expected + distance):
+            if floor <= start <= last and lines[start:start + len(block)] == block:
+                return start
+    return -1
+
+
+def apply_patch(text: Optional[str], diff: str) -> Tuple[str, int]:
+    """Apply a unified diff; hunks may have drifted (matched by content near their line number)"""
+    lines = _lines(text)
+    offset = 0
+    floor = 0
+    hunks = parse_hunks(diff)
+    for number, (old_start, old, new) in enumerate(hunks, 1):
+        # "-0,0" / "-N,0" hunks insert after line N
+        expected = old_start - 1 + offset if old else old_start + offset
+        if old:
+            start = _find_block(lines, old, expected, floor)
+            if start < 0:
+                raise EditError(f"Error: Patch hunk #{number} does not apply (expected near line {old_start})")
+        else:
+            start = min(max(expected, floor), len(lines))
+        lines[start:start + len(old)] = new
+        offset = start - (old_start - 1 if old else old_start) + len(new) - len(old)
+        floor = start + len(new)
+    return _join(lines), len(hunks)
+
+
+# ─── Sections ────────────────────────────────────────────────
+
+def _headings(lines: List[str]) -> List[Tuple[int, int, str]]:
+    """(line index, level, title) for headings outside code fences"""
+    found = []
+    fence = None
+    for i, line in enumerate(lines):
+        match = FENCE_LINE_RE.match(line)
+        if match:
+            fence = None if fence == match.group(1) else (fence or match.group(1))
+            continue
+        if fence:
+            continue
+        match = HEADING_RE.match(line)
+        if match:
+            found.append((i, len(match.group(1)), match.group(2).strip()))
+    return found
+
+
+def replace_section(text: Optional[str], heading: str, content: str) -> Tuple[str, bool]:
+    """Replace the body under `heading` ("## Status" or just "Status"); appends the section if missing"""
+    match = re.match(r"^(#{1,6})\s+(.*)$", heading.strip())
+    level = len(match.group(1)) if match else None
+    title = (match.group(2) if match else heading).strip()
+    lines = _lines(text)
+    body = content.rstrip("\n").splitlines()
+    headings = _headings(lines)
+    for n, (index, found_level, found_title) in enumerate(headings):
+        if found_title.lower() != title.lower() or (level and found_level != level):
+            continue
+        end = len(lines)
+        for next_index, next_level, _ in headings[n + 1:]:
+            if next_level <= found_level:
+                end = next_index
+                break
+        replacement = [""] + body if body else []
+        if end < len(lines):
+            replacement.append("")
+        lines[index + 1:end] = replacement
+        return _join(lines), True
+    while lines and not lines[-1].strip():
+        lines.pop()
+    if lines:
+        lines.append("")
+    lines += [f"{'#' * (level or 2)} {title}", ""] + body
+    return _join(lines), False
+
+
+def set_frontmatter_field(text: Optional[str], field: str, value: str) -> Tuple[str, bool]:
+    """Set a top-level frontmatter key (value is raw YAML); creates the frontmatter if needed"""
+    if not re.match(r"^[\w.-]+$", field):
+        raise EditError(f"Error: Invalid frontmatter field: {field}")
+    value = value.rstrip("\n")
+    new = [f"{field}:"] + [f"  {v}" for v in value.splitlines()] if "\n" in value else [f"{field}: {value}".rstrip()]
+    lines = _lines(text)
+    if not lines or lines[0].strip() != "---":
+        return _join(["---"] + new + ["---"] + lines), False
+    try:
+        close = next(i for i in range(1, len(lines)) if lines[i].strip() == "---")
+    except StopIteration:
+        raise EditError("Error: Unterminated frontmatter")
+    for i in range(1, close):
+        key = lines[i].split(":", 1)[0]
+        if not lines[i][:1].isspace() and ":" in lines[i] and key.strip() == field:
+            end = i + 1
+            # Continuation lines: indented values and "- item" lists
+            while end < close and (lines[end][:1].isspace() or lines[end].startswith("- ")):
+                end += 1
+            lines[i:end] = new
+            return _join(lines), True
+    lines[close:close] = new
+    return _join(lines), False
+
+
+# ─── Edit factory ────────────────────────────────────────────
+
+def make_edit(rel: str, mode: str, content: str, heading: Optional[str] = None,
+              field: Optional[str] = None) -> Edit:
+    """Build the text transform for a vault_write mode"""
+    if mode == "overwrite":
+        return lambda text: (content, f"✓ Written: {rel}")
+    if mode == "append":
+        return lambda text: (append_text(text, content), f"✓ Appended: {rel}")
+    if mode == "patch":
+        def patch(text: Optional[str]) -> Tuple[str, str]:
+            if text is None:
+                raise EditError(f"Error: File does not exist: {rel}")
+            patched, hunks = apply_patch(text, content)
+            return patched, f"✓ Patched: {rel} ({hunks} hunk{'s' if hunks != 1 else ''})"
+        return patch
+    if mode == "section":
+        if field:
+            def frontmatter(text: Optional[str]) -> Tuple[str, str]:
+                updated, existed = set_frontmatter_field(text, field, content)
+                return updated, f"✓ {'Updated' if existed else 'Added'} frontmatter {field}: {rel}"
+            return frontmatter
+        if heading:
+            def section(text: Optional[str]) -> Tuple[str, str]:
+                updated, existed = replace_section(text, heading, content)
+                return updated, f"✓ {'Replaced' if existed else 'Added'} section {heading.strip()}: {rel}"
+            return section
+        raise EditError("Error: section mode needs a heading or a frontmatter field")
+    raise EditError(f"Error: Unknown write mode: {mode} (expected one of {', '.join(MODES)})")
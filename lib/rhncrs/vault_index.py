@@ -0,0 +1,297 @@
+"""
+vault_index - Persistent in-memory index of the vault (paths, sizes, mtimes, tree)
+Built once at startup, kept current by file watches plus a periodic reconcile,
+so rhncrs://vault/stats and rhncrs://vault/structure never walk the disk.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from rhncrs.vault_io import human_size
+from rhncrs.watch import PeriodicTask, Watcher
+
+# Temp files written by atomic_write_text() are never indexed
+TMP_SUFFIX = ".tmp"
+
+
+def extension_of(name: str) -> str:
+    """Extension as `find | grep -o '\\.[^.]*$'` reports it (empty if none)"""
+    dot = name.rfind(".")
+    return name[dot:] if dot > 0 or (dot == 0 and name.count(".") > 1) else ""
+
+
+class VaultIndex:
+    """Thread-safe index of every file and directory under the vault root"""
+
+    def __init__(self, root: Path, structure_depth: int = 2, reconcile_interval: float = 300.0):
+        self.root = Path(root)
+        self.structure_depth = structure_depth
+        self.reconcile_interval = reconcile_interval
+
+        self.files: Dict[str, Tuple[int, float]] = {}   # rel path -> (size, mtime)
+        self.dirs: Dict[str, float] = {}                # rel dir -> mtime
+        self.ext_counts: Counter = Counter()
+        self.total_size = 0
+        self.version = 0
+        self._dir_files: Dict[str, Set[str]] = {}      # rel dir -> direct child files
+        self._dir_subdirs: Dict[str, Set[str]] = {}    # rel dir -> direct child dirs
+        self._mutations = 0
+        self.built_at: Optional[float] = None
+
+        self._lock = threading.RLock()
+        self._ready = threading.Event()
+        self._cache: Dict[str, Tuple[int, str]] = {}   # name -> (version, json)
+        self._watcher: Optional[Watcher] = None
+        self._reconciler: Optional[PeriodicTask] = None
+
+    # ─── Lifecycle ───────────────────────────────────────────
+
+    def start(self) -> None:
+        """Build in the background, then follow file events and reconcile periodically"""
+        def boot():
+            self.build()
+            self._watcher = Watcher([self.root], self._on_event)
+            self._watcher.start()
+            self._reconciler = PeriodicTask(self.reconcile_interval, self.reconcile, "vault-reconcile")
+            self._reconciler.start()
+
+        threading.Thread(target=boot, name="vault-index", daemon=True).start()
+
+    def stop(self) -> None:
+        if self._watcher:
+            self._watcher.stop()
+        if self._reconciler:
+            self._reconciler.stop()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    @property
+    def watching(self) -> bool:
+        return bool(self._watcher and self._watcher.active)
+
+    # ─── Mutations ───────────────────────────────────────────
+
+    def _rel(self, path: str) -> Optional[str]:
+        try:
+            rel = os.path.relpath(path, self.root)
+        except ValueError:
+            return None
+        if rel.startswith(".."):
+            return None
+        return "." if rel == "." else rel
+
+    @staticmethod
+    def _parent(rel: str) -> str:
+        return os.path.dirname(rel) or "."
+
+    def _put_file(self, rel: str, size: int, mtime: float) -> None:
+        old = self.files.get(rel)
+        if old == (size, mtime):
+            return
+        if old is None:
+            self.ext_counts[extension_of(os.path.basename(rel))] += 1
+            self._dir_files.setdefault(self._parent(rel), set()).add(rel)
+        else:
+            self.total_size -= old[0]
+        self.files[rel] = (size, mtime)
+        self.total_size += size
+        self._mutations += 1
+
+    def _drop_file(self, rel: str) -> None:
+        old = self.files.pop(rel, None)
+        if old is None:
+            return
+        self.total_size -= old[0]
+        ext = extension_of(os.path.basename(rel))
+        self.ext_counts[ext] -= 1
+        if self.ext_counts[ext] <= 0:
+            del self.ext_counts[ext]
+        siblings = self._dir_files.get(self._parent(rel))
+        if siblings:
+            siblings.discard(rel)
+        self._mutations += 1
+
+    def _put_dir(self, rel: str, mtime: float) -> None:
+        if rel not in self.dirs:
+            if rel != ".":
+                self._dir_subdirs.setdefault(self._parent(rel), set()).add(rel)
+            self._mutations += 1
+        self.dirs[rel] = mtime
+
+    def _drop_tree(self, rel: str) -> None:
+        for sub in list(self._dir_subdirs.pop(rel, ())):
+            self._drop_tree(sub)
+        for path in list(self._dir_files.pop(rel, ())):
+            self._drop_file(path)
+        if self.dirs.pop(rel, None) is not None:
+            self._mutations += 1
+        siblings = self._dir_subdirs.get(self._parent(rel))
+        if siblings:
+            siblings.discard(rel)
+
+    def _scan_dir(self, rel: str, recursive: bool) -> None:
+        """(Re)read one directory's entries; caller holds the lock"""
+        abs_dir = self.root if rel == "." else self.root / rel
+        try:
+            st = os.stat(abs_dir)
+            entries = list(os.scandir(abs_dir))
+        except OSError:
+            self._drop_tree(rel)
+            return
+        self._put_dir(rel, st.st_mtime)
+        prefix = "" if rel == "." else rel + os.sep
+        seen: Set[str] = set()
+        for entry in entries:
+            child = prefix + entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    seen.add(child)
+                    if recursive or child not in self.dirs:
+                        self._scan_dir(child, recursive=True)
+                elif not entry.name.endswith(TMP_SUFFIX):
+                    est = entry.stat(follow_symlinks=False)
+                    seen.add(child)
+                    self._put_file(child, est.st_size, est.st_mtime)
+            except OSError:
+                continue
+        # Forget direct children that disappeared
+        for path in list(self._dir_files.get(rel, ())):
+            if path not in seen:
+                self._drop_file(path)
+        for path in list(self._dir_subdirs.get(rel, ())):
+            if path not in seen:
+                self._drop_tree(path)
+
+    def build(self) -> None:
+        with self._lock:
+            self.files.clear()
+            self.dirs.clear()
+            self._dir_files.clear()
+            self._dir_subdirs.clear()
+            self.ext_counts.clear()
+            self.total_size = 0
+            if self.root.is_dir():
+                self._scan_dir(".", recursive=True)
+            self.built_at = time.time()
+            self.version += 1
+        self._ready.set()
+
+    def update_path(self, rel: str) -> None:
+        """Re-stat one vault-relative path (file or directory) after a change"""
+        rel = os.path.normpath(rel)
+        if rel.startswith(".."):
+            return
+        abs_path = self.root / rel
+        with self._lock:
+            before = self._mutations
+            if abs_path.is_dir():
+                parent = self._parent(rel)
+                if parent not in self.dirs:
+                    self._scan_dir(parent, recursive=False)
+                self._scan_dir(rel, recursive=True)
+            elif abs_path.is_file():
+                if not abs_path.name.endswith(TMP_SUFFIX):
+                    # Make sure parent directories are known first
+                    missing = []
+                    parent = self._parent(rel)
+                    while parent not in self.dirs and parent != ".":
+                        missing.append(parent)
+                        parent = self._parent(parent)
+                    for path in reversed(missing):
+                        self._put_dir(path, (self.root / path).stat().st_mtime)
+                    st = abs_path.stat()
+                    self._put_file(rel, st.st_size, st.st_mtime)
+            else:
+                self._drop_file(rel)
+                self._drop_tree(rel)
+            if self._mutations != before:
+                self.version += 1
+
+    def reconcile(self) -> None:
+        """Full mtime/size comparison against disk, catching missed events"""
+        with self._lock:
+            before = self._mutations
+            if self.root.is_dir():
+                self._scan_dir(".", recursive=True)
+            if self._mutations != before:
+                self.version += 1
+
+    def _on_event(self, event_type: str, src: str, dest: Optional[str]) -> None:
+        for path in (src, dest):
+            if path:
+                rel = self._rel(path)
+                if rel is not None and rel != ".":
+                    self.update_path(rel)
+
+    # ─── Queries ─────────────────────────────────────────────
+
+    def _cached(self, name: str, compute) -> str:
+        with self._lock:
+            hit = self._cache.get(name)
+            if hit and hit[0] == self.version:
+                return hit[1]
+            payload = json.dumps(compute(), indent=2)
+            self._cache[name] = (self.version, payload)
+            return payload
+
+    def snapshot(self) -> Dict[str, Tuple[int, float]]:
+        with self._lock:
+            return dict(self.files)
+
+    def stats(self) -> str:
+        def compute():
+            return {
+                "location": str(self.root),
+                "total_files": len(self.files),
+                "total_directories": len(self.dirs),
+                "markdown_files": self.ext_counts.get(".md", 0),
+                "total_size_bytes": self.total_size,
+                "total_size": human_size(self.total_size),
+                "files_by_type": dict(self.ext_counts.most_common()),
+                "indexed_at": self.built_at,
+                "watching": self.watching,
+                "version": self.version,
+            }
+        return self._cached("stats", compute)
+
+    def structure(self) -> str:
+        def compute():
+            # Recursive file counts, aggregated bottom-up over directories only
+            counts: Counter = Counter()
+            for rel in sorted(self.dirs, key=lambda d: d.count(os.sep), reverse=True):
+                counts[rel] += len(self._dir_files.get(rel, ()))
+                if rel != ".":
+                    counts[self._parent(rel)] += counts[rel]
+
+            tree: Dict[str, dict] = {}
+            for rel in sorted(self.dirs):
+                if rel == "." or rel.split(os.sep)[0].startswith("."):
+                    continue
+                parts = rel.split(os.sep)
+                if len(parts) > self.structure_depth:
+                    continue
+                node = tree
+                for part in parts[:-1]:
+                    node = node.setdefault(part, {"files": 0, "children": {}})["children"]
+                node.setdefault(parts[-1], {"files": 0, "children": {}})["files"] = counts.get(rel, 0)
+            return {
+                "root": str(self.root),
+                "depth": self.structure_depth,
+                "total_files": len(self.files),
+                "directories": tree,
+            }
+        return self._cached("structure", compute)
+
+    def list_markdown(self) -> List[str]:
+        with self._lock:
+            return [p for p in self.files if p.endswith(".md")]
@@ -0,0 +1,295 @@
+"""
+vault_io - In-process async I/O engine for the Obsidian vault
+Replaces forking obsidian-vault-manager.sh for every MCP vault call. Writes go
+through a per-file coalescer: edits that arrive while one is pending are
+applied together and land as a single atomic rename.
+"""
+
+import asyncio
+import os
+import shutil
+import stat
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+
+
+class VaultError(Exception):
+    """Raised for user-facing vault errors (bad path, missing file, ...)"""
+
+
+def human_size(size: int) -> str:
+    """Format a byte count the way `ls -lh` does"""
+    value = float(size)
+    for unit in ("B", "K", "M", "G", "T"):
+        if value < 1024 or unit == "T":
+            if unit == "B":
+                return f"{int(value)}B"
+            return f"{value:.1f}{unit}"
+        value /= 1024
+    return f"{size}B"
+
+
+# mkstemp creates 0600 files; new notes should get the usual umask-derived mode
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+NEW_FILE_MODE = 0o666 & ~_UMASK
+
+
+def atomic_write_text(path: Path, content: str, errors: str = "strict") -> None:
+    """Write a file via temp file + rename so readers never see a partial note"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", errors=errors) as f:
+            f.write(content)
+        os.chmod(tmp_name, stat.S_IMODE(path.stat().st_mode) if path.exists() else NEW_FILE_MODE)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+# (current text or None if the file is missing) -> (new text, result message)
+Edit = Callable[[Optional[str]], Tuple[str, str]]
+
+
+class VaultIO:
+    """Path-safe vault operations, offloaded to a thread pool for asyncio callers"""
+
+    def __init__(self, root: Path, max_workers: int = 8, coalesce_window: float = 0.0):
+        self.root = Path(root)
+        self.coalesce_window = coalesce_window
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vault-io")
+        self._pending: Dict[Path, List[Tuple[Edit, "asyncio.Future[str]"]]] = {}
+        self._flushing: Set[Path] = set()
+        self.write_stats = {"edits": 0, "disk_writes": 0, "unchanged": 0}
+
+    # ─── Path handling ───────────────────────────────────────
+
+    def resolve(self, rel: str) -> Path:
+        """Resolve a vault-relative path, refusing anything that escapes the vault"""
+        rel = (rel or ".").strip()
+        if os.path.isabs(rel):
+            raise VaultError(f"Error: Absolute paths are not allowed: {rel}")
+        root = self.root.resolve()
+        target = (root / rel).resolve()
+        if target != root and root not in target.parents:
+            raise VaultError(f"Error: Path escapes the vault: {rel}")
+        return target
+
+    def relative(self, path: Path) -> str:
+        return str(path.relative_to(self.root.resolve()))
+
+    async def _offload(self, fn: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    # ─── Synchronous primitives (run inside the pool) ────────
+
+    def read_sync(self, rel: str) -> str:
+        path = self.resolve(rel)
+        if not path.is_file():
+            raise VaultError(f"Error: File does not exist: {rel}")
+        return path.read_text(encoding="utf-8", errors="replace")
+
+    def write_sync(self, rel: str, content: str) -> str:
+        if not rel:
+            raise VaultError("Error: No file specified")
+        path = self.resolve(rel)
+        if path.is_dir():
+            raise VaultError(f"Error: Path is a directory: {rel}")
+        # The shell manager used `echo`, which always terminates the file with a newline
+        if not content.endswith("\n"):
+            content += "\n"
+        atomic_write_text(path, content)
+        return f"✓ Written: {rel}"
+
+    def edit_sync(self, rel: str, edits: List[Edit]) -> List[Union[str, VaultError]]:
+        """Apply edits in order to one file and write it once (skipped if nothing changed)"""
+        if not rel:
+            raise VaultError("Error: No file specified")
+        path = self.resolve(rel)
+        if path.is_dir():
+            raise VaultError(f"Error: Path is a directory: {rel}")
+        # surrogateescape: bytes that aren't UTF-8 survive an edit unchanged instead of failing it
+        current = path.read_text(encoding="utf-8", errors="surrogateescape") if path.is_file() else None
+        text = current
+        outcomes: List[Union[str, VaultError]] = []
+        for edit in edits:
+            try:
+                text, message = edit(text)
+            except VaultError as e:
+                outcomes.append(e)
+                continue
+            outcomes.append(message)
+        if text is not None:
+            if not text.endswith("\n"):
+                text += "\n"
+            if text != current:
+                try:
+                    atomic_write_text(path, text, errors="surrogateescape")
+                except UnicodeEncodeError:
+                    raise VaultError(f"Error: Content is not valid UTF-8: {rel}")
+                self.write_stats["disk_writes"] += 1
+            else:
+                # Identical content: don't touch the file (no mtime bump, no iCloud upload)
+                self.write_stats["unchanged"] += 1
+        self.write_stats["edits"] += len(edits)
+        return outcomes
+
+    def list_sync(self, rel: str = ".") -> str:
+        path = self.resolve(rel)
+        if not path.is_dir():
+            raise VaultError(f"Error: Directory does not exist: {rel}")
+        entries = []
+        total_blocks = 0
+        for entry in sorted(os.scandir(path), key=lambda e: e.name):
+            if entry.name.startswith("."):
+                continue
+            st = entry.stat(follow_symlinks=False)
+            total_blocks += getattr(st, "st_blocks", 0)
+            mtime = time.strftime("%b %d %H:%M", time.localtime(st.st_mtime))
+            entries.append(
+                f"{stat.filemode(st.st_mode)} {st.st_nlink:>3} {human_size(st.st_size):>6} {mtime} {entry.name}"
+            )
+        header = f"total {human_size(total_blocks * 512)}"
+        return "\n".join([header] + entries) + "\n"
+
+    def tree_sync(self, rel: str = ".", depth: int = 3, dirs_only: bool = False) -> str:
+        path = self.resolve(rel)
+        if not path.is_dir():
+            raise VaultError(f"Error: Directory does not exist: {rel}")
+        lines = [str(path)]
+        counts = {"dirs": 0, "files": 0}
+
+        def walk(directory: Path, prefix: str, level: int) -> None:
+            if level > depth:
+                return
+            try:
+                children = sorted(
+                    (e for e in os.scandir(directory) if not e.name.startswith(".")),
+                    key=lambda e: e.name,
+                )
+            except OSError:
+                return
+            if dirs_only:
+                children = [e for e in children if e.is_dir(follow_symlinks=False)]
+            for i, entry in enumerate(children):
+                last = i == len(children) - 1
+                lines.append(f"{prefix}{'└── ' if last else '├── '}{entry.name}")
+                if entry.is_dir(follow_symlinks=False):
+                    counts["dirs"] += 1
+                    walk(Path(entry.path), prefix + ("    " if last else "│   "), level + 1)
+                else:
+                    counts["files"] += 1
+
+        walk(path, "", 1)
+        summary = f"{counts['dirs']} directories"
+        if not dirs_only:
+            summary += f", {counts['files']} files"
+        return "\n".join(lines + ["", summary]) + "\n"
+
+    def mkdir_sync(self, rel: str) -> str:
+        if not rel:
+            raise VaultError("Error: No directory specified")
+        self.resolve(rel).mkdir(parents=True, exist_ok=True)
+        return f"✓ Created: {rel}"
+
+    def mv_sync(self, src: str, dest: str) -> str:
+        if not src or not dest:
+            raise VaultError("Error: Source and destination required")
+        src_path = self.resolve(src)
+        dest_path = self.resolve(dest)
+        if not src_path.exists():
+            raise VaultError(f"Error: Source does not exist: {src}")
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.move(str(src_path), str(dest_path))
+        return f"✓ Moved: {src} → {dest}"
+
+    def rm_sync(self, rel: str) -> str:
+        if not rel:
+            raise VaultError("Error: No file specified")
+        path = self.resolve(rel)
+        if path == self.root.resolve():
+            raise VaultError("Error: Refusing to remove the vault root")
+        if not path.exists():
+            raise VaultError(f"Error: File does not exist: {rel}")
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+        return f"✓ Removed: {rel}"
+
+    def exists_sync(self, rel: str) -> Tuple[bool, str]:
+        if self.resolve(rel).exists():
+            return True, f"✓ Exists: {rel}"
+        return False, f"✗ Does not exist: {rel}"
+
+    # ─── Async API ───────────────────────────────────────────
+
+    async def read(self, rel: str) -> str:
+        return await self._offload(self.read_sync, rel)
+
+    async def write(self, rel: str, content: str) -> str:
+        return await self.edit(rel, lambda text: (content, f"✓ Written: {rel}"))
+
+    async def edit(self, rel: str, edit: Edit) -> str:
+        """Queue an edit; edits to the same file within the coalesce window share one write"""
+        if not rel:
+            raise VaultError("Error: No file specified")
+        key = self.resolve(rel)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(key, []).append((edit, future))
+        if key not in self._flushing:
+            self._flushing.add(key)
+            loop.create_task(self._flush(key, rel))
+        return await future
+
+    async def _flush(self, key: Path, rel: str) -> None:
+        try:
+            if self.coalesce_window > 0:
+                await asyncio.sleep(self.coalesce_window)
+            # Edits queued while a write is in flight go out together in the next round
+            while self._pending.get(key):
+                batch = self._pending.pop(key)
+                try:
+                    outcomes = await self._offload(self.edit_sync, rel, [edit for edit, _ in batch])
+                except Exception as e:
+                    outcomes = [e] * len(batch)
+                for (_, future), outcome in zip(batch, outcomes):
+                    if future.done():
+                        continue
+                    if isinstance(outcome, BaseException):
+                        future.set_exception(outcome)
+                    else:
+                        future.set_result(outcome)
+        finally:
+            self._flushing.discard(key)
+
+    async def list(self, rel: str = ".") -> str:
+        return await self._offload(self.list_sync, rel)
+
+    async def tree(self, rel: str = ".", depth: int = 3, dirs_only: bool = False) -> str:
+        return await self._offload(self.tree_sync, rel, depth, dirs_only)
+
+    async def mkdir(self, rel: str) -> str:
+        return await self._offload(self.mkdir_sync, rel)
+
+    async def mv(self, src: str, dest: str) -> str:
+        return await self._offload(self.mv_sync, src, dest)
+
+    async def rm(self, rel: str) -> str:
+        return await self._offload(self.rm_sync, rel)
+
+    async def exists(self, rel: str) -> Tuple[bool, str]:
+        return await self._offload(self.exists_sync, rel)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
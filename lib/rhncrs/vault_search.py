@@ -0,0 +1,497 @@
+"""
+vault_search - Full-text + frontmatter search and wikilink graph over the vault (SQLite)
+The index lives on disk and is refreshed incrementally by mtime/size, so only
+notes that changed since the last query are re-read. Wikilinks are stored as
+raw targets and resolved the way Obsidian does (basename or path suffix,
+shortest path wins), so a note created later picks up links made before it.
+
+Query syntax:
+    free text terms              all must match (FTS5, prefix match with trailing *)
+    "exact phrase"               phrase match
+    tag:#project/infra-core      tag or any child tag (#project/infra-core/...)
+    type:architecture            frontmatter field filters: type, project, status
+                                 (whole value, case-insensitive; any item of a list)
+    path:1_Projects/             path prefix
+"""
+
+import os
+import shlex
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from rhncrs.markdown import (
+    as_list, extract_tags, extract_title, extract_wikilinks, normalize_tag, parse_frontmatter,
+)
+
+FIELD_FILTERS = ("type", "project", "status")
+
+# Stop counting matches beyond this; "total" is then reported as a lower bound
+COUNT_CAP = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    title TEXT,
+    type TEXT,
+    project TEXT,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS notes_type ON notes(type);
+CREATE INDEX IF NOT EXISTS notes_project ON notes(project);
+CREATE INDEX IF NOT EXISTS notes_status ON notes(status);
+CREATE TABLE IF NOT EXISTS note_tags (
+    note_id INTEGER NOT NULL,
+    tag TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS note_tags_tag ON note_tags(tag, note_id);
+CREATE INDEX IF NOT EXISTS note_tags_note ON note_tags(note_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+    title, body, tags, links, tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS links (
+    source_id INTEGER NOT NULL,
+    target TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS links_source ON links(source_id);
+CREATE INDEX IF NOT EXISTS links_target ON links(target, source_id);
+CREATE TABLE IF NOT EXISTS note_keys (
+    note_id INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    plen INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS note_keys_key ON note_keys(key, plen, note_id);
+CREATE INDEX IF NOT EXISTS note_keys_note ON note_keys(note_id);
+CREATE TABLE IF NOT EXISTS key_owner (
+    key TEXT PRIMARY KEY,
+    note_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS key_owner_note ON key_owner(note_id);
+"""
+
+# Bumped when the schema gains data that older indexes never stored (forces a rebuild)
+SCHEMA_VERSION = 2
+
+# Above this many touched link keys, rebuild key_owner in one statement
+BULK_RESOLVE = 2000
+
+# SQLite host-parameter batches for IN (...) lists
+IN_BATCH = 500
+
+MAX_NEIGHBORHOOD_DEPTH = 3
+
+
+def is_indexable(rel: str) -> bool:
+    """Markdown notes outside hidden folders (.obsidian, .trash, ...)"""
+    return rel.endswith(".md") and not rel.startswith(".") and os.sep + "." not in rel
+
+
+def link_key(target: str) -> str:
+    """Normalize a wikilink target: case-insensitive, no .md, no leading slash"""
+    key = target.strip().replace("\\", "/").lstrip("/").lower()
+    return key[:-3] if key.endswith(".md") else key
+
+
+def note_keys(rel: str) -> List[str]:
+    """Every link target that can name this note: basename and each longer path suffix"""
+    parts = link_key(rel).split("/")
+    return ["/".join(parts[i:]) for i in range(len(parts) - 1, -1, -1)]
+
+
+def batches(items: List[Any], size: int = IN_BATCH) -> Iterable[List[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def parse_query(query: str) -> Tuple[List[str], Dict[str, List[str]]]:
+    """Split a query into free-text terms and field filters"""
+    try:
+        tokens = shlex.split(query)
+    except ValueError:
+        tokens = query.split()
+    terms: List[str] = []
+    filters: Dict[str, List[str]] = {}
+    for token in tokens:
+        key, sep, value = token.partition(":")
+        if sep and value and key.lower() in FIELD_FILTERS + ("tag", "path"):
+            filters.setdefault(key.lower(), []).append(value)
+        else:
+            terms.append(token)
+    return terms, filters
+
+
+def fts_expression(terms: List[str]) -> str:
+    """Quote user terms so FTS5 operators/punctuation can't break the query"""
+    parts = []
+    for term in terms:
+        prefix = term.endswith("*")
+        term = term.rstrip("*").replace('"', '""')
+        if term:
+            parts.append(f'"{term}"' + ("*" if prefix else ""))
+    return " ".join(parts)
+
+
+class VaultSearch:
+    """On-disk inverted index over note bodies, frontmatter and wikilinks"""
+
+    def __init__(self, db_path: Path, root: Path):
+        self.db_path = Path(db_path)
+        self.root = Path(root)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # Notes indexed before the link graph existed have no links/keys: re-parse them all
+            with self._conn:
+                for table in ("notes", "note_tags", "notes_fts", "links", "note_keys", "key_owner"):
+                    self._conn.execute(f"DELETE FROM {table}")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._lock = threading.RLock()
+        self.indexed_version: Optional[int] = None
+        self._known_cache: Optional[Dict[str, Tuple[int, float, int]]] = None
+        self.last_refresh: Dict[str, Any] = {}
+        # Bumped whenever a refresh changes any note; whole-vault graph queries are cached per version
+        self.graph_version = 0
+        self._orphan_cache: Dict[Tuple[int, str, bool], List[Dict[str, Any]]] = {}
+
+    # ─── Indexing ────────────────────────────────────────────
+
+    def _known(self) -> Dict[str, Tuple[int, float, int]]:
+        """{path: (size, mtime, id)} for indexed notes, loaded from disk once"""
+        if self._known_cache is None:
+            rows = self._conn.execute("SELECT id, path, size, mtime FROM notes")
+            self._known_cache = {r["path"]: (r["size"], r["mtime"], r["id"]) for r in rows}
+        return self._known_cache
+
+    def _delete(self, note_id: int, touched: Set[str]) -> None:
+        touched.update(r[0] for r in self._conn.execute("SELECT key FROM note_keys WHERE note_id = ?", (note_id,)))
+        self._conn.execute("DELETE FROM notes WHERE id = ?", (note_id,))
+        self._conn.execute("DELETE FROM note_tags WHERE note_id = ?", (note_id,))
+        self._conn.execute("DELETE FROM notes_fts WHERE rowid = ?", (note_id,))
+        self._conn.execute("DELETE FROM links WHERE source_id = ?", (note_id,))
+        self._conn.execute("DELETE FROM note_keys WHERE note_id = ?", (note_id,))
+
+    def _resolve_keys(self, touched: Set[str]) -> None:
+        """Recompute which note owns each touched link key (shortest path wins)"""
+        if len(touched) > BULK_RESOLVE:
+            self._conn.execute("DELETE FROM key_owner")
+            self._conn.execute(
+                "INSERT INTO key_owner (key, note_id) SELECT key, note_id FROM ("
+                " SELECT key, note_id, ROW_NUMBER() OVER (PARTITION BY key ORDER BY plen, note_id) AS rn"
+                " FROM note_keys) WHERE rn = 1"
+            )
+            return
+        for key in touched:
+            row = self._conn.execute(
+                "SELECT note_id FROM note_keys WHERE key = ? ORDER BY plen, note_id LIMIT 1", (key,)
+            ).fetchone()
+            if row is None:
+                self._conn.execute("DELETE FROM key_owner WHERE key = ?", (key,))
+            else:
+                self._conn.execute("INSERT OR REPLACE INTO key_owner (key, note_id) VALUES (?, ?)", (key, row[0]))
+
+    def _upsert(self, rel: str, size: int, mtime: float, old_id: Optional[int],
+                touched: Set[str]) -> Optional[Dict[str, Any]]:
+        try:
+            text = (self.root / rel).read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            return None
+        frontmatter, body = parse_frontmatter(text)
+        tags = extract_tags(frontmatter, body)
+        links = extract_wikilinks(text)
+        title = extract_title(frontmatter, body, Path(rel).stem)
+        fields = {k: ", ".join(as_list(frontmatter.get(k))) or None for k in FIELD_FILTERS}
+        if old_id is not None:
+            self._delete(old_id, touched)
+        cur = self._conn.execute(
+            "INSERT INTO notes (path, mtime, size, title, type, project, status) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (rel, mtime, size, title, fields["type"], fields["project"], fields["status"]),
+        )
+        note_id = cur.lastrowid
+        self._conn.executemany(
+            "INSERT INTO note_tags (note_id, tag) VALUES (?, ?)", [(note_id, t) for t in tags]
+        )
+        self._conn.execute(
+            "INSERT INTO notes_fts (rowid, title, body, tags, links) VALUES (?, ?, ?, ?, ?)",
+            (note_id, title, body, " ".join(tags), " ".join(links)),
+        )
+        targets = {link_key(link) for link in links} - {""}
+        self._conn.executemany("INSERT INTO links (source_id, target) VALUES (?, ?)",
+                               [(note_id, t) for t in targets])
+        keys = note_keys(rel)
+        self._conn.executemany("INSERT INTO note_keys (note_id, key, plen) VALUES (?, ?, ?)",
+                               [(note_id, k, len(rel)) for k in keys])
+        touched.update(keys)
+        return {"id": note_id, "path": rel, "frontmatter": frontmatter, "tags": tags, "links": links}
+
+    def refresh(self, files: Dict[str, Tuple[int, float]], version: Optional[int] = None) -> Dict[str, Any]:
+        """Bring the index in line with a {rel path: (size, mtime)} snapshot of the vault"""
+        with self._lock:
+            if version is not None and version == self.indexed_version:
+                return {"changed": [], "removed": []}
+            start = time.perf_counter()
+            known = self._known()
+            notes = {p: v for p, v in files.items() if is_indexable(p)}
+            removed = [p for p in known if p not in notes]
+            changed = [p for p, (size, mtime) in notes.items()
+                       if p not in known or known[p][:2] != (size, mtime)]
+            parsed = []
+            touched: Set[str] = set()
+            try:
+                with self._conn:
+                    for path in removed:
+                        self._delete(known.pop(path)[2], touched)
+                    for path in changed:
+                        size, mtime = notes[path]
+                        note = self._upsert(path, size, mtime, known.get(path, (0, 0, None))[2], touched)
+                        if note is not None:
+                            known[path] = (size, mtime, note["id"])
+                            parsed.append(note)
+                    if touched:
+                        self._resolve_keys(touched)
+                if removed or changed:
+                    self.graph_version += 1
+                    self._orphan_cache.clear()
+            except sqlite3.Error:
+                # Rolled back - reload the truth from disk on the next refresh
+                self._known_cache = None
+                raise
+            self.indexed_version = version
+            self.last_refresh = {
+                "changed": len(changed),
+                "removed": len(removed),
+                "notes": len(notes),
+                "seconds": round(time.perf_counter() - start, 4),
+                "at": time.time(),
+            }
+            return {"changed": parsed, "removed": removed}
+
+    # ─── Queries ─────────────────────────────────────────────
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        terms, filters = parse_query(query)
+        limit = max(1, min(int(limit), 100))
+        offset = max(0, int(offset))
+
+        where: List[str] = []
+        params: List[Any] = []
+        for field in FIELD_FILTERS:
+            for value in filters.get(field, []):
+                # Whole value, case-insensitive; list fields are stored ", "-joined so match one item
+                where.append(f"(', ' || n.{field} || ', ') LIKE ? ESCAPE '\\'")
+                params.append("%, " + value.strip().replace("\\", "\\\\").replace("%", "\\%")
+                              .replace("_", "\\_") + ", %")
+        for value in filters.get("path", []):
+            where.append("n.path LIKE ? ESCAPE '\\'")
+            params.append(value.replace("%", "\\%").replace("_", "\\_") + "%")
+        for value in filters.get("tag", []):
+            tag = normalize_tag(value)
+            where.append(
+                "n.id IN (SELECT note_id FROM note_tags WHERE tag = ? OR tag LIKE ? ESCAPE '\\')"
+            )
+            params.extend([tag, tag.replace("%", "\\%").replace("_", "\\_") + "/%"])
+
+        expression = fts_expression(terms)
+        if expression:
+            base = ("FROM notes_fts JOIN notes n ON n.id = notes_fts.rowid "
+                    "WHERE notes_fts MATCH ?" + "".join(f" AND {w}" for w in where))
+            base_params = [expression] + params
+            select = ("SELECT n.path, n.title, n.type, n.project, n.status, n.mtime, "
+                      "bm25(notes_fts, 10.0, 1.0, 5.0, 2.0) AS score, "
+                      "snippet(notes_fts, 1, '**', '**', '…', 16) AS snippet ")
+            order = " ORDER BY score LIMIT ? OFFSET ?"
+        else:
+            base = "FROM notes n" + (" WHERE " + " AND ".join(where) if where else "")
+            base_params = params
+            select = ("SELECT n.path, n.title, n.type, n.project, n.status, n.mtime, "
+                      "NULL AS score, NULL AS snippet ")
+            order = " ORDER BY n.mtime DESC LIMIT ? OFFSET ?"
+
+        with self._lock:
+            try:
+                total = self._conn.execute(
+                    f"SELECT COUNT(*) FROM (SELECT 1 {base} LIMIT {COUNT_CAP})", base_params
+                ).fetchone()[0]
+                rows = self._conn.execute(select + base + order, base_params + [limit, offset]).fetchall()
+            except sqlite3.OperationalError as e:
+                return {"query": query, "error": f"Invalid search query: {e}"}
+            tags = self._tags_for([r["path"] for r in rows])
+
+        results = [{
+            "path": r["path"],
+            "title": r["title"],
+            "type": r["type"],
+            "project": r["project"],
+            "status": r["status"],
+            "tags": tags.get(r["path"], []),
+            "snippet": r["snippet"],
+            "score": round(-r["score"], 4) if r["score"] is not None else None,
+        } for r in rows]
+        return {
+            "query": query,
+            "total": total,
+            "total_is_lower_bound": total >= COUNT_CAP,
+            "offset": offset,
+            "limit": limit,
+            "next_offset": offset + len(results) if offset + len(results) < total else None,
+            "results": results,
+        }
+
+    def _tags_for(self, paths: Iterable[str]) -> Dict[str, List[str]]:
+        paths = list(paths)
+        if not paths:
+            return {}
+        marks = ",".join("?" * len(paths))
+        rows = self._conn.execute(
+            f"SELECT n.path, t.tag FROM note_tags t JOIN notes n ON n.id = t.note_id WHERE n.path IN ({marks})",
+            paths,
+        )
+        tags: Dict[str, List[str]] = {}
+        for row in rows:
+            tags.setdefault(row["path"], []).append(row["tag"])
+        return tags
+
+    # ─── Link graph ──────────────────────────────────────────
+
+    def _note(self, ref: str) -> Optional[Tuple[int, str]]:
+        """A note by vault path ('00_Atlas/Home.md') or by link target ('Home')"""
+        ref = ref.strip().lstrip("/")
+        for path in (ref, ref + ".md"):
+            row = self._conn.execute("SELECT id, path FROM notes WHERE path = ?", (path,)).fetchone()
+            if row is not None:
+                return row[0], row[1]
+        row = self._conn.execute(
+            "SELECT n.id, n.path FROM key_owner o JOIN notes n ON n.id = o.note_id WHERE o.key = ?",
+            (link_key(ref),),
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    @staticmethod
+    def _page(items: List[Any], key: str, limit: int, offset: int, extra: Dict[str, Any]) -> Dict[str, Any]:
+        limit = max(1, min(int(limit), 1000))
+        offset = max(0, int(offset))
+        page = items[offset:offset + limit]
+        return dict(extra, total=len(items), offset=offset,
+                    next_offset=offset + len(page) if offset + len(page) < len(items) else None,
+                    **{key: page})
+
+    def backlinks(self, ref: str, limit: int = 100, offset: int = 0) -> Dict[str, Any]:
+        """Notes linking to `ref`"""
+        with self._lock:
+            note = self._note(ref)
+            if note is None:
+                return {"path": ref, "error": f"Note not found: {ref}"}
+            rows = self._conn.execute(
+                "SELECT DISTINCT s.path, s.title FROM key_owner o JOIN links l ON l.target = o.key "
+                "JOIN notes s ON s.id = l.source_id WHERE o.note_id = ? AND s.id != ? ORDER BY s.path",
+                (note[0], note[0]),
+            ).fetchall()
+        items = [{"path": r["path"], "title": r["title"]} for r in rows]
+        return self._page(items, "backlinks", limit, offset, {"path": note[1]})
+
+    def outlinks(self, ref: str) -> Dict[str, Any]:
+        """Links out of `ref`, resolved to notes where possible"""
+        with self._lock:
+            note = self._note(ref)
+            if note is None:
+                return {"path": ref, "error": f"Note not found: {ref}"}
+            rows = self._conn.execute(
+                "SELECT l.target, n.path, n.title FROM links l LEFT JOIN key_owner o ON o.key = l.target "
+                "LEFT JOIN notes n ON n.id = o.note_id WHERE l.source_id = ? ORDER BY l.target",
+                (note[0],),
+            ).fetchall()
+        return {
+            "path": note[1],
+            "outlinks": [{"target": r["target"], "path": r["path"], "title": r["title"]}
+                         for r in rows if r["path"] is not None],
+            "unresolved": [r["target"] for r in rows if r["path"] is None],
+        }
+
+    def orphans(self, path_prefix: str = "", no_outlinks: bool = False,
+                limit: int = 100, offset: int = 0) -> Dict[str, Any]:
+        """Notes nothing links to (and, with no_outlinks, that link to nothing either)"""
+        where = ["NOT EXISTS (SELECT 1 FROM key_owner o JOIN links l ON l.target = o.key "
+                 "WHERE o.note_id = n.id AND l.source_id != n.id)"]
+        params: List[Any] = []
+        if no_outlinks:
+            where.append("NOT EXISTS (SELECT 1 FROM links l JOIN key_owner o ON o.key = l.target "
+                         "WHERE l.source_id = n.id AND o.note_id != n.id)")
+        if path_prefix:
+            where.append("n.path LIKE ? ESCAPE '\\'")
+            params.append(path_prefix.replace("%", "\\%").replace("_", "\\_") + "%")
+        with self._lock:
+            key = (self.graph_version, path_prefix, no_outlinks)
+            items = self._orphan_cache.get(key)
+            if items is None:
+                rows = self._conn.execute(
+                    f"SELECT n.path, n.title FROM notes n WHERE {' AND '.join(where)} ORDER BY n.path", params
+                ).fetchall()
+                items = self._orphan_cache[key] = [{"path": r["path"], "title": r["title"]} for r in rows]
+        return self._page(items, "orphans", limit, offset, {"path_prefix": path_prefix, "no_outlinks": no_outlinks})
+
+    def neighborhood(self, ref: str, depth: int = 1, direction: str = "both", limit: int = 200) -> Dict[str, Any]:
+        """Breadth-first walk of the link graph out to `depth` hops, capped at `limit` notes"""
+        depth = max(1, min(int(depth), MAX_NEIGHBORHOOD_DEPTH))
+        limit = max(1, min(int(limit), 2000))
+        with self._lock:
+            note = self._note(ref)
+            if note is None:
+                return {"path": ref, "error": f"Note not found: {ref}"}
+            distance = {note[0]: 0}
+            edges: Set[Tuple[int, int]] = set()
+            frontier = [note[0]]
+            truncated = False
+            for hop in range(1, depth + 1):
+                following = []
+                for chunk in batches(frontier):
+                    marks = ",".join("?" * len(chunk))
+                    rows: List[Any] = []
+                    if direction in ("out", "both"):
+                        rows += self._conn.execute(
+                            "SELECT l.source_id, o.note_id FROM links l JOIN key_owner o ON o.key = l.target "
+                            f"WHERE l.source_id IN ({marks})", chunk).fetchall()
+                    if direction in ("in", "both"):
+                        rows += self._conn.execute(
+                            "SELECT l.source_id, o.note_id FROM key_owner o JOIN links l ON l.target = o.key "
+                            f"WHERE o.note_id IN ({marks})", chunk).fetchall()
+                    for source, target in rows:
+                        if source == target:
+                            continue
+                        for node in (source, target):
+                            if node not in distance:
+                                if len(distance) >= limit:
+                                    truncated = True
+                                    continue
+                                distance[node] = hop
+                                following.append(node)
+                        if source in distance and target in distance:
+                            edges.add((source, target))
+                frontier = following
+                if not frontier:
+                    break
+            info: Dict[int, Any] = {}
+            for chunk in batches(list(distance)):
+                marks = ",".join("?" * len(chunk))
+                for row in self._conn.execute(f"SELECT id, path, title FROM notes WHERE id IN ({marks})", chunk):
+                    info[row["id"]] = row
+        nodes = sorted(distance.items(), key=lambda item: (item[1], info[item[0]]["path"]))
+        return {
+            "path": note[1],
+            "depth": depth,
+            "direction": direction,
+            "nodes": [{"path": info[n]["path"], "title": info[n]["title"], "distance": d} for n, d in nodes],
+            "edges": sorted([info[s]["path"], info[t]["path"]] for s, t in edges),
+            "truncated": truncated,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,117 @@
+"""
+vault_secrets - The age-encrypted .env files in the vault's 9_System/Secrets
+Each project has <project>.env.enc (encrypted to the SSH key) and usually a
+<project>.env.password.enc copy. This module lists them, decrypts with the
+SSH identity non-interactively, parses env maps (key names only leave this
+process) and validates every project across a worker pool.
+"""
+
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+VAULT_ROOT = Path(os.environ.get("OBSIDIAN_VAULT",
+                                 Path.home() / "Library/Mobile Documents/iCloud~md~obsidian/Documents/rhncrs-collab"))
+SECRETS_DIR = VAULT_ROOT / "9_System" / "Secrets"
+VALIDATE_WORKERS = min(8, os.cpu_count() or 4)
+
+
+class SecretsError(Exception):
+    """Raised when a secret can't be found or decrypted"""
+
+
+def default_identity() -> Path:
+    """~/.ssh/id_ed25519, else ~/.ssh/id_rsa (what decrypt-env has always used)"""
+    key = Path.home() / ".ssh" / "id_ed25519"
+    return key if key.exists() else Path.home() / ".ssh" / "id_rsa"
+
+
+def projects(secrets_dir: Path) -> List[str]:
+    return sorted(p.name[:-len(".env.enc")] for p in Path(secrets_dir).glob("*.env.enc"))
+
+
+def age_decrypt(enc: Path, identity: Path, timeout: float = 30) -> bytes:
+    """Decrypt with the SSH identity only; never prompts (stdin is /dev/null, no tty needed)"""
+    if not enc.exists():
+        raise SecretsError(f"not found: {enc.name}")
+    try:
+        proc = subprocess.run(["age", "-d", "-i", str(identity), str(enc)], stdin=subprocess.DEVNULL,
+                              capture_output=True, timeout=timeout)
+    except FileNotFoundError:
+        raise SecretsError("age is not installed")
+    except subprocess.TimeoutExpired:
+        raise SecretsError(f"age timed out on {enc.name}")
+    if proc.returncode != 0:
+        raise SecretsError(proc.stderr.decode("utf-8", errors="replace").strip() or f"age exited {proc.returncode}")
+    return proc.stdout
+
+
+def env_keys(content: bytes) -> List[str]:
+    """Variable names of a .env file, in order, without values"""
+    keys = []
+    for raw in content.decode("utf-8", errors="replace").splitlines():
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("export "):
+            line = line[len("export "):].lstrip()
+        name, sep, _ = line.partition("=")
+        name = name.strip()
+        if sep and name and name not in keys:
+            keys.append(name)
+    return keys
+
+
+def validate(secrets_dir: Path, identity: Optional[Path] = None, workers: int = VALIDATE_WORKERS,
+             interactive: bool = False) -> Dict[str, Any]:
+    """Decrypt every project with the SSH identity in parallel; plaintext is discarded
+
+    Projects the SSH key can't open are retried one at a time against the
+    password copy when interactive (age prompts on the tty, so never in parallel).
+    """
+    identity = identity or default_identity()
+    names = projects(secrets_dir)
+
+    def check(project: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        result: Dict[str, Any] = {"project": project}
+        try:
+            age_decrypt(Path(secrets_dir) / f"{project}.env.enc", identity)
+            result["ok"], result["method"] = True, "ssh"
+        except SecretsError as e:
+            result["ok"], result["error"] = False, str(e).splitlines()[-1]
+        result["ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(check, names))
+    parallel_ms = (time.perf_counter() - start) * 1000
+
+    for result in results:
+        password = Path(secrets_dir) / f"{result['project']}.env.password.enc"
+        if result["ok"] or not interactive or not password.exists():
+            continue
+        print(f"🔑 {result['project']}: SSH key failed, trying the password copy...", file=sys.stderr)
+        began = time.perf_counter()
+        proc = subprocess.run(["age", "-d", str(password)], stdout=subprocess.DEVNULL)
+        result["ms"] += round((time.perf_counter() - began) * 1000, 1)
+        if proc.returncode == 0:
+            result.update(ok=True, method="password")
+            result.pop("error", None)
+
+    timings = sorted(r["ms"] for r in results)
+    return {
+        "results": results,
+        "passed": sum(1 for r in results if r["ok"]),
+        "failed": sum(1 for r in results if not r["ok"]),
+        "workers": max(1, workers),
+        "wall_ms": round((time.perf_counter() - start) * 1000, 1),
+        "parallel_ms": round(parallel_ms, 1),
+        "sum_ms": round(sum(timings), 1),
+        "max_ms": timings[-1] if timings else 0,
+    }
@@ -0,0 +1,121 @@
+"""
+watch - File-change notifications with an optional watchdog backend
+Falls back to "no events" when watchdog is missing; callers keep a periodic
+reconcile loop so they stay correct either way.
+"""
+
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Optional dependency (install with: pip install watchdog)
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    HAVE_WATCHDOG = True
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+    HAVE_WATCHDOG = False
+
+# callback(event_type, src_path, dest_path) - event_type is created/modified/deleted/moved
+WatchCallback = Callable[[str, str, Optional[str]], None]
+
+
+class _Handler(FileSystemEventHandler):
+    def __init__(self, callback: WatchCallback):
+        super().__init__()
+        self._callback = callback
+
+    def on_any_event(self, event):
+        if event.event_type not in ("created", "modified", "deleted", "moved"):
+            return
+        try:
+            self._callback(event.event_type, event.src_path, getattr(event, "dest_path", None))
+        except Exception:
+            # A failing consumer must never kill the observer thread
+            pass
+
+
+class Watcher:
+    """Watch one or more directories, recursively or only their own entries (no-op without watchdog)"""
+
+    def __init__(self, paths: List[Path], callback: WatchCallback, recursive: bool = True):
+        self.paths = [Path(p) for p in paths]
+        self.callback = callback
+        self.recursive = recursive
+        self._observer = None
+        self._handler = None
+        self._watches: Dict[Path, Any] = {}
+
+    @property
+    def active(self) -> bool:
+        return self._observer is not None
+
+    def start(self) -> bool:
+        if not HAVE_WATCHDOG:
+            return False
+        observer = Observer()
+        handler = _Handler(self.callback)
+        watches = {}
+        for path in self.paths:
+            if path.is_dir():
+                watches[path] = observer.schedule(handler, str(path), recursive=self.recursive)
+        if not watches:
+            return False
+        observer.daemon = True
+        observer.start()
+        self._observer, self._handler, self._watches = observer, handler, watches
+        return True
+
+    def watch_only(self, paths: Iterable[Path]) -> int:
+        """Make `paths` the exact set of watched directories; returns how many were newly added.
+
+        For non-recursive watchers that follow a pruned walk. Directories that vanished are
+        skipped; other OSErrors (e.g. the inotify watch limit) propagate.
+        """
+        if self._observer is None:
+            return 0
+        wanted = {Path(p) for p in paths}
+        for path in set(self._watches) - wanted:
+            try:
+                self._observer.unschedule(self._watches.pop(path))
+            except Exception:
+                pass  # the kernel already dropped the watch with its directory
+        added = 0
+        for path in wanted - set(self._watches):
+            try:
+                self._watches[path] = self._observer.schedule(self._handler, str(path), recursive=self.recursive)
+            except FileNotFoundError:
+                continue
+            added += 1
+        return added
+
+    def stop(self) -> None:
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+            self._watches = {}
+
+
+class PeriodicTask:
+    """Run a function every `interval` seconds on a daemon thread"""
+
+    def __init__(self, interval: float, fn: Callable[[], None], name: str = "periodic"):
+        self.interval = interval
+        self.fn = fn
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.fn()
+            except Exception:
+                pass
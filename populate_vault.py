@@ -1,26 +1,43 @@
 import os
+import re
+import sys
 import json
-import shutil
+import difflib
+import hashlib
+import argparse
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "lib"))
+from rhncrs.vault_io import atomic_write_text  # noqa: E402
+from rhncrs.projects import DEFAULT_REGISTRY, ProjectRegistry  # noqa: E402
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
 
 # --- Configuration ---
 HOME = Path.home()
-VAULT_ROOT = HOME / "Library/Mobile Documents/iCloud~md~obsidian/Documents/rhncrs-collab"
-SOURCE_ROOT = HOME / "Dev/org"
-
-# Mapping: Vault Folder -> Source Repo Name
-PROJECTS = {
-    "11_Rhinoceros_Music": "rhinoceros-music",
-    "12_Rhinocrash": "rhinocrash",
-    "13_Rhncrs_V1": "rhncrsv1",
-    "14_Infrastructure": "infrastructure",
-    "15_Infra_Swarm": "infrastructure-swarm"
-}
+VAULT_ROOT = Path(os.environ.get("OBSIDIAN_VAULT", HOME / "Library/Mobile Documents/iCloud~md~obsidian/Documents/rhncrs-collab"))
+SOURCE_ROOT = Path(os.environ.get("PROJECT_ROOT", HOME / "Dev/org"))
+
+# Projects come from lib/projects.json (shared with the MCP server; RHNCRS_PROJECTS_FILE overrides)
+REGISTRY = ProjectRegistry(Path(os.environ.get("RHNCRS_PROJECTS_FILE", DEFAULT_REGISTRY)), project_root=SOURCE_ROOT)
+
+# Mapping: Vault Folder -> Source Repo Name (registry entries that have a vault folder)
+PROJECTS = {p["vault_folder"]: p["id"] for p in REGISTRY.projects().values() if p.get("vault_folder")}
+PROJECTS_DIR = REGISTRY.vault_projects_dir
 
 TODAY = datetime.now().strftime("%Y-%m-%d")
 
+# Source hashes and per-doc input keys from the last run (hidden, so Obsidian ignores it)
+MANIFEST_PATH = VAULT_ROOT / ".populate-manifest.json"
+
 # --- Templates ---
+# Text between <!-- populate:NAME --> markers is regenerated when the inputs change;
+# everything outside the markers is left alone, so hand-written sections survive.
 TEMPLATES = {
     "Architecture": """---
 type: architecture
@@ -33,10 +50,14 @@ updated: {date}
 # Architecture: {project_title}
 
 ## Overview
+<!-- populate:overview -->
 {overview}
+<!-- /populate:overview -->
 
 ## Tech Stack
+<!-- populate:tech-stack -->
 {tech_stack}
+<!-- /populate:tech-stack -->
 
 ## Components
 - **Core:**
@@ -79,7 +100,9 @@ updated: {date}
 - Access to rhncrs.com VPS
 
 ## Configuration
-See `docker-compose.yml` for service definitions.
+<!-- populate:services -->
+{services}
+<!-- /populate:services -->
 
 ## Deploy Commands
 ```bash
@@ -99,15 +122,19 @@ updated: {date}
 ## Setup
 1. Clone the repository: `git clone ...`
 2. Install dependencies:
+<!-- populate:install -->
    ```bash
    {install_cmd}
    ```
+<!-- /populate:install -->
 
 ## Testing
 Run tests using:
+<!-- populate:test -->
 ```bash
 {test_cmd}
 ```
+<!-- /populate:test -->
 
 ## Workflow
 - Use semantic commit messages.
@@ -115,6 +142,19 @@ Run tests using:
 """
 }
 
+# Source files each generated doc depends on (relative to the repo)
+COMPOSE_FILES = ["docker-compose.yml", "docker-compose.yaml", "compose.yaml", "compose.yml"]
+DOC_INPUTS = {
+    "Architecture.md": ["README.md", "package.json", "pyproject.toml"],
+    "API.md": [],
+    "Deployment.md": COMPOSE_FILES,
+    "Development.md": ["package.json", "pyproject.toml"],
+}
+
+MARKER_RE = re.compile(
+    r"<!-- populate:(?P<name>[\w-]+) -->\n(?P<body>.*?)<!-- /populate:(?P=name) -->", re.S
+)
+
 def read_file_safe(path):
     try:
         with open(path, 'r', encoding='utf-8') as f:
@@ -122,8 +162,7 @@ def read_file_safe(path):
     except FileNotFoundError:
         return None
 
-def parse_package_json(path):
-    content = read_file_safe(path)
+def parse_package_json(content):
     if not content:
         return {}, ""
     try:
@@ -135,53 +174,180 @@ def parse_package_json(path):
     except json.JSONDecodeError:
         return {}, "Error parsing package.json"
 
-def process_project(vault_name, source_name):
-    print(f"🔹 Processing {vault_name} (Source: {source_name})...")
-
-    project_dir = VAULT_ROOT / "1_Projects" / vault_name
-    source_dir = SOURCE_ROOT / source_name
-
-    if not source_dir.exists():
-        print(f"   ⚠️  Source not found: {source_dir}")
-        return
+def parse_pyproject(content):
+    if not content or tomllib is None:
+        return {}, ""
+    try:
+        data = tomllib.loads(content)
+    except tomllib.TOMLDecodeError:
+        return {}, "Error parsing pyproject.toml"
+    deps = data.get("project", {}).get("dependencies", [])
+    return data, "\n".join(f"- {d}" for d in deps)
+
+def parse_compose_services(content):
+    """Top-level service names from a docker-compose file (no YAML dependency)"""
+    services, in_services = [], False
+    for line in (content or "").splitlines():
+        if re.match(r"^services:\s*$", line):
+            in_services = True
+            continue
+        if in_services:
+            if line and not line[0].isspace() and not line.startswith("#"):
+                break
+            match = re.match(r"^  ([A-Za-z0-9_.-]+):\s*$", line)
+            if match:
+                services.append(match.group(1))
+    return services
+
+# --- Change detection ---
+
+def hash_source(path, known):
+    """sha256 of a source file, reusing the manifest entry when size and mtime are unchanged"""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    entry = known.get(str(path))
+    if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+        return entry
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+
+def inputs_key(doc_name, template, source_hashes, vault_name, source_name):
+    """Changes whenever the template, the project mapping or any input file changes"""
+    h = hashlib.sha256()
+    h.update(f"{doc_name}\0{vault_name}\0{source_name}\0".encode())
+    h.update(template.encode())
+    for name in DOC_INPUTS[doc_name]:
+        entry = source_hashes.get(name)
+        h.update(f"{name}={entry['sha256'] if entry else '-'}\0".encode())
+    return h.hexdigest()
+
+def merge_generated(existing, generated):
+    """Swap in freshly generated marker blocks; None if the file has no markers (hand-written)"""
+    if not MARKER_RE.search(existing):
+        return None
+    blocks = {m.group("name"): m.group(0) for m in MARKER_RE.finditer(generated)}
+    merged = MARKER_RE.sub(lambda m: blocks.get(m.group("name"), m.group(0)), existing)
+    if merged != existing:
+        merged = re.sub(r"^updated: .*$", f"updated: {TODAY}", merged, count=1, flags=re.M)
+    return merged
 
-    project_dir.mkdir(parents=True, exist_ok=True)
+# --- Generation ---
 
-    # Analyze Source
-    readme = read_file_safe(source_dir / "README.md") or "No README found."
-    pkg_data, tech_stack = parse_package_json(source_dir / "package.json")
+def render_docs(vault_name, source_name, sources):
+    readme = sources.get("README.md") or "No README found."
+    pkg_data, tech_stack = parse_package_json(sources.get("package.json"))
+    py_data, py_stack = parse_pyproject(sources.get("pyproject.toml"))
+    compose = next((sources[n] for n in COMPOSE_FILES if sources.get(n)), None)
+    services = parse_compose_services(compose)
 
     # Determine Project Title & Tag
     title = vault_name.replace("_", " ").split(" ", 1)[1] if "_" in vault_name else vault_name
     tag = "domain/" + source_name.replace("-", "/")
+    common = dict(project_name=vault_name, project_tag=tag, project_title=title, date=TODAY)
+
+    if pkg_data:
+        install_cmd, test_cmd = "npm install", "npm test"
+    elif py_data:
+        install_cmd, test_cmd = "pip install -e .", "pytest"
+    else:
+        install_cmd, test_cmd = "pip install -r requirements.txt", "pytest"
 
-    # Generate Docs
-    files = {
+    return {
         "Architecture.md": TEMPLATES["Architecture"].format(
-            project_name=vault_name, project_tag=tag, project_title=title, date=TODAY,
-            overview=readme[:500] + "...", tech_stack=tech_stack or "Not specified"
-        ),
-        "API.md": TEMPLATES["API"].format(
-            project_name=vault_name, project_tag=tag, project_title=title, date=TODAY
+            overview=readme[:500] + "...",
+            tech_stack="\n".join(s for s in (tech_stack, py_stack) if s) or "Not specified",
+            **common
         ),
+        "API.md": TEMPLATES["API"].format(**common),
         "Deployment.md": TEMPLATES["Deployment"].format(
-            project_name=vault_name, project_tag=tag, project_title=title, date=TODAY
+            services=("Services in `docker-compose.yml`:\n" + "\n".join(f"- `{s}`" for s in services))
+            if services else "See `docker-compose.yml` for service definitions.",
+            **common
         ),
         "Development.md": TEMPLATES["Development"].format(
-            project_name=vault_name, project_tag=tag, project_title=title, date=TODAY,
-            install_cmd="npm install" if pkg_data else "pip install -r requirements.txt",
-            test_cmd="npm test" if pkg_data else "pytest"
+            install_cmd=install_cmd, test_cmd=test_cmd, **common
         )
     }
 
-    for filename, content in files.items():
-        file_path = project_dir / filename
-        if not file_path.exists():
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            print(f"   ✅ Created {filename}")
+def process_project(vault_name, source_name, manifest, force=False, dry_run=False):
+    """Returns (log lines, source hash entries, doc entries) - no shared state touched"""
+    log = [f"🔹 Processing {vault_name} (Source: {source_name})..."]
+    project_dir = VAULT_ROOT / PROJECTS_DIR / vault_name
+    source_dir = Path(REGISTRY.get(source_name)["path"])
+    new_sources, new_docs = {}, {}
+
+    if not source_dir.exists():
+        log.append(f"   ⚠️  Source not found: {source_dir}")
+        return log, new_sources, new_docs
+
+    # Hash inputs (stat only, unless a file changed since the last run)
+    source_hashes = {}
+    for name in sorted({n for names in DOC_INPUTS.values() for n in names}):
+        path = source_dir / name
+        entry = hash_source(path, manifest.get("sources", {}))
+        if entry:
+            source_hashes[name] = entry
+            new_sources[str(path)] = entry
+
+    templates = {doc: TEMPLATES[doc[:-3]] for doc in DOC_INPUTS}
+    keys = {doc: inputs_key(doc, templates[doc], source_hashes, vault_name, source_name) for doc in DOC_INPUTS}
+    known_docs = manifest.get("docs", {})
+    stale = [
+        doc for doc in DOC_INPUTS
+        if force or not (project_dir / doc).exists()
+        or known_docs.get(f"{vault_name}/{doc}", {}).get("inputs") != keys[doc]
+    ]
+    for doc in DOC_INPUTS:
+        if doc not in stale:
+            new_docs[f"{vault_name}/{doc}"] = known_docs[f"{vault_name}/{doc}"]
+    if not stale:
+        log.append("   ⏭️  Inputs unchanged. Skipping.")
+        return log, new_sources, new_docs
+
+    # Only now read the sources we need
+    sources = {name: read_file_safe(source_dir / name) for name in source_hashes}
+    generated = render_docs(vault_name, source_name, sources)
+
+    for doc in stale:
+        file_path = project_dir / doc
+        existing = read_file_safe(file_path)
+        new_docs[f"{vault_name}/{doc}"] = {"inputs": keys[doc]}
+        if existing is None:
+            content, action = generated[doc], "Created"
+        elif force:
+            content = merge_generated(existing, generated[doc])
+            content, action = (content, "Updated") if content is not None else (generated[doc], "Replaced")
+        elif not MARKER_RE.search(generated[doc]):
+            log.append(f"   ⏭️  {doc} already exists. Skipping.")
+            continue
         else:
-            print(f"   ⏭️  {filename} already exists. Skipping.")
+            content, action = merge_generated(existing, generated[doc]), "Updated"
+            if content is None:
+                log.append(f"   ✋ {doc} has no populate markers (hand-written). Use --force to replace.")
+                continue
+        if content == existing:
+            log.append(f"   ⏭️  {doc} up to date.")
+            continue
+        if dry_run:
+            diff = difflib.unified_diff(
+                (existing or "").splitlines(keepends=True), content.splitlines(keepends=True),
+                fromfile=f"a/{PROJECTS_DIR}/{vault_name}/{doc}", tofile=f"b/{PROJECTS_DIR}/{vault_name}/{doc}"
+            )
+            log.append(f"   📝 Would {'create' if action == 'Created' else 'update'} {doc}")
+            log.extend("      " + line.rstrip("\n") for line in diff)
+        else:
+            atomic_write_text(file_path, content)
+            log.append(f"   ✅ {action} {doc}")
+    return log, new_sources, new_docs
+
+def load_manifest():
+    try:
+        return json.loads(MANIFEST_PATH.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"version": 1, "sources": {}, "docs": {}}
 
 def create_area_placeholders():
     print("🔹 Creating Area Placeholders...")
@@ -218,15 +384,44 @@ def update_system():
             print(f"   ✅ Created Template: {tmpl}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Generate project docs in the vault from source repos")
+    parser.add_argument("--dry-run", action="store_true", help="Show a diff of what would change; write nothing")
+    parser.add_argument("--force", action="store_true",
+                        help="Regenerate every doc; files without markers are replaced wholesale")
+    parser.add_argument("--jobs", type=int, default=min(8, os.cpu_count() or 4), help="Projects processed in parallel")
+    parser.add_argument("--project", action="append", help="Only process this vault folder (repeatable)")
+    args = parser.parse_args()
+
     if not VAULT_ROOT.exists():
         print(f"❌ Vault root not found: {VAULT_ROOT}")
         return
 
-    print("🚀 Starting Vault Population...")
+    print("🚀 Starting Vault Population..." + (" (dry run)" if args.dry_run else ""))
+    manifest = load_manifest()
+    projects = {v: s for v, s in PROJECTS.items() if not args.project or v in args.project}
+
+    # 1. Process Projects (I/O bound: threads; logs printed in project order)
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        results = pool.map(
+            lambda item: process_project(item[0], item[1], manifest, args.force, args.dry_run),
+            projects.items()
+        )
+        new_sources, new_docs = {}, {}
+        for log, sources, docs in results:
+            print("\n".join(log))
+            new_sources.update(sources)
+            new_docs.update(docs)
+
+    if args.dry_run:
+        print("\n✅ Dry run complete - nothing written.")
+        return
 
-    # 1. Process Projects
-    for v_name, s_name in PROJECTS.items():
-        process_project(v_name, s_name)
+    # Keep entries for projects not processed this run
+    processed = tuple(f"{v}/" for v in projects)
+    manifest["docs"] = {k: v for k, v in manifest.get("docs", {}).items() if not k.startswith(processed)}
+    manifest["docs"].update(new_docs)
+    manifest.setdefault("sources", {}).update(new_sources)
+    atomic_write_text(MANIFEST_PATH, json.dumps(manifest, indent=2, sort_keys=True) + "\n")
 
     # 2. Areas
     create_area_placeholders()
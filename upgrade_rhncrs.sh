@@ -2,9 +2,9 @@
 set -e
 
 # Configuration
-VAULT_ROOT="$HOME/Library/Mobile Documents/iCloud~md~obsidian/Documents/rhncrs-collab"
+VAULT_ROOT="${OBSIDIAN_VAULT:-$HOME/Library/Mobile Documents/iCloud~md~obsidian/Documents/rhncrs-collab}"
 SOURCE_HARDWARE="$HOME/Library/Mobile Documents/iCloud~md~obsidian/Documents/gemini-scribe/10_Projects/11_Rhinoceros/Rhinoceros_Music/Hardware"
-SOURCE_WORKSPACE="$HOME/Dev/workspace/collab"
+SOURCE_WORKSPACE="${COLLAB_DIR:-$HOME/Dev/workspace/collab}"
 BACKUP_DIR="$HOME/Desktop/rhncrs_backup_$(date +%Y%m%d_%H%M%S)"
 
 echo "🔶 Starting RHNCRS Vault Upgrade..."